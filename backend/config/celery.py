@@ -16,13 +16,35 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Auto-discover tasks from all installed apps
 app.autodiscover_tasks()
 
-# Celery Beat schedule - periodic tasks
-app.conf.beat_schedule = {
-    'sync-schedules-every-3-hours': {
-        'task': 'schedule.sync_all_schedules',
-        'schedule': crontab(minute=0, hour='*/3'),  # Every 3 hours
-    },
-}
+def beat_schedule():
+    """Periodic tasks: adaptive per-group sync with SSTU_SCHEDULE_ADAPTIVE, otherwise full sync every 3 hours."""
+    from django.conf import settings
+
+    if getattr(settings, 'SSTU_SCHEDULE_ADAPTIVE', False):
+        # Groups are synced by priority (schedule/sync_scheduler.py), main page once a day
+        return {
+            'sync-group-index-daily': {
+                'task': 'schedule.sync_group_index',
+                'schedule': crontab(minute=30, hour=4),
+            },
+            'sync-due-groups': {
+                'task': 'schedule.sync_due_groups',
+                'schedule': getattr(settings, 'SSTU_SCHEDULE_TICK_MINUTES', 10) * 60,
+            },
+        }
+    return {
+        'sync-schedules-every-3-hours': {
+            'task': 'schedule.sync_all_schedules',
+            'schedule': crontab(minute=0, hour='*/3'),  # Every 3 hours
+        },
+    }
+
+
+# Celery Beat schedule - periodic tasks (Django settings are read once the app is configured)
+@app.on_after_configure.connect
+def setup_periodic_tasks(sender, **kwargs):
+    sender.conf.beat_schedule = beat_schedule()
+
 
 # Celery configuration
 app.conf.update(
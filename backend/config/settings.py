@@ -271,6 +271,73 @@ SSTU_SCHEDULE_TIMEOUT = int(os.getenv('SSTU_SCHEDULE_TIMEOUT', '60'))  # Timeout
 # Format: https://your-worker.your-subdomain.workers.dev
 # If set, all requests will go through Cloudflare Worker instead of direct connection
 SSTU_CLOUDFLARE_WORKER_URL = os.getenv('SSTU_CLOUDFLARE_WORKER_URL', None)
+# Group pages requested from the Worker in one POST /batch round-trip (1 - one request per page, max 50)
+SSTU_SCHEDULE_WORKER_BATCH_SIZE = int(os.getenv('SSTU_SCHEDULE_WORKER_BATCH_SIZE', '20'))
+
+# HTML backend for schedule pages: 'auto' (lxml if installed), 'lxml' or 'html.parser'
+SSTU_SCHEDULE_HTML_BACKEND = os.getenv('SSTU_SCHEDULE_HTML_BACKEND', 'auto')
+
+# Number of group pages fetched in parallel during full sync,
+# and max simultaneous requests to one host (rasp.sstu.ru or the Worker)
+SSTU_SCHEDULE_CONCURRENCY = int(os.getenv('SSTU_SCHEDULE_CONCURRENCY', '4'))
+SSTU_SCHEDULE_MAX_CONNECTIONS_PER_HOST = int(os.getenv('SSTU_SCHEDULE_MAX_CONNECTIONS_PER_HOST', '4'))
+
+# Directory for page cache (ETag/Last-Modified/body hash per URL). Unchanged group pages
+# are skipped without parsing. Empty = cache disabled.
+SSTU_SCHEDULE_CACHE_DIR = os.getenv('SSTU_SCHEDULE_CACHE_DIR', '') or None
+SSTU_SCHEDULE_CACHE_MAX_AGE = int(os.getenv('SSTU_SCHEDULE_CACHE_MAX_AGE', str(24 * 60 * 60)))  # seconds
+
+# Max size of one schedule page; larger responses are aborted while downloading
+SSTU_SCHEDULE_MAX_BODY_SIZE = int(os.getenv('SSTU_SCHEDULE_MAX_BODY_SIZE', str(20 * 1024 * 1024)))  # bytes
+
+# Transport: retries with exponential backoff + jitter, per-host circuit breaker
+# (after N consecutive failures requests fail fast for RESET seconds) and
+# read timeout adapted to observed latency (never above SSTU_SCHEDULE_TIMEOUT)
+SSTU_SCHEDULE_RETRIES = int(os.getenv('SSTU_SCHEDULE_RETRIES', '3'))
+SSTU_SCHEDULE_BACKOFF_FACTOR = float(os.getenv('SSTU_SCHEDULE_BACKOFF_FACTOR', '0.5'))
+SSTU_SCHEDULE_CIRCUIT_FAILURES = int(os.getenv('SSTU_SCHEDULE_CIRCUIT_FAILURES', '5'))
+SSTU_SCHEDULE_CIRCUIT_RESET = int(os.getenv('SSTU_SCHEDULE_CIRCUIT_RESET', '60'))  # seconds
+SSTU_SCHEDULE_ADAPTIVE_TIMEOUT = os.getenv('SSTU_SCHEDULE_ADAPTIVE_TIMEOUT', 'True') == 'True'
+# Fetch teacher pages instead of group pages where that needs fewer requests
+SSTU_SCHEDULE_TEACHER_PAGES = os.getenv('SSTU_SCHEDULE_TEACHER_PAGES', 'False') == 'True'
+# Hours a teacher-covered group may go without fetching its own page (lessons of new teachers are only there)
+SSTU_SCHEDULE_GROUP_PAGE_MAX_AGE_HOURS = int(os.getenv('SSTU_SCHEDULE_GROUP_PAGE_MAX_AGE_HOURS', '24'))
+# Content-addressed archive of raw page bodies for offline re-parsing (sync_schedule --replay)
+SSTU_SCHEDULE_ARCHIVE_DIR = os.getenv('SSTU_SCHEDULE_ARCHIVE_DIR', '') or None
+# Processes parsing fetched pages per sync task (0 - parse in fetch threads,
+# empty - (CPU count - 1) / SSTU_SCHEDULE_SYNC_TASKS, at least 1)
+SSTU_SCHEDULE_PARSE_PROCESSES = int(os.getenv('SSTU_SCHEDULE_PARSE_PROCESSES')) if os.getenv('SSTU_SCHEDULE_PARSE_PROCESSES') else None
+# Fetched pages waiting for a parse process before fetching pauses
+SSTU_SCHEDULE_PIPELINE_QUEUE_SIZE = int(os.getenv('SSTU_SCHEDULE_PIPELINE_QUEUE_SIZE', '16'))
+# Celery tasks syncing group schedules in parallel (0 - whole sync in one task).
+# Each task fetches up to SSTU_SCHEDULE_CONCURRENCY pages at once
+SSTU_SCHEDULE_SYNC_TASKS = int(os.getenv('SSTU_SCHEDULE_SYNC_TASKS', '4'))
+# Sync progress is checkpointed every SSTU_SCHEDULE_CHECKPOINT_GROUPS groups (and at least every 30 s);
+# an in-progress update without checkpoint for SSTU_SCHEDULE_STALE_MINUTES is resumed by the next sync
+SSTU_SCHEDULE_CHECKPOINT_GROUPS = int(os.getenv('SSTU_SCHEDULE_CHECKPOINT_GROUPS', '20'))
+SSTU_SCHEDULE_STALE_MINUTES = int(os.getenv('SSTU_SCHEDULE_STALE_MINUTES', '15'))
+# Redis lease making full and single-group syncs single-flight (renewed every TTL/3 while the job runs)
+SSTU_SCHEDULE_LEASE_REDIS_URL = os.getenv('SSTU_SCHEDULE_LEASE_REDIS_URL', CELERY_BROKER_URL)
+SSTU_SCHEDULE_LEASE_TTL = int(os.getenv('SSTU_SCHEDULE_LEASE_TTL', '120'))  # seconds
+# Lease TTL while its job waits in the Celery queue (enqueue, hand-off to chord/resume tasks);
+# should exceed the longest expected queue delay
+SSTU_SCHEDULE_LEASE_QUEUE_TTL = int(os.getenv('SSTU_SCHEDULE_LEASE_QUEUE_TTL', '3600'))  # seconds
+# Adaptive scheduler (schedule/sync_scheduler.py): with SSTU_SCHEDULE_ADAPTIVE=True beat syncs due
+# groups by priority every SSTU_SCHEDULE_TICK_MINUTES instead of the full sync every 3 hours,
+# at most SSTU_SCHEDULE_HOURLY_BUDGET group pages per hour.
+# Group sync interval shrinks with demand and volatility from BASE towards MIN, up to MAX
+SSTU_SCHEDULE_ADAPTIVE = os.getenv('SSTU_SCHEDULE_ADAPTIVE', 'False') == 'True'
+SSTU_SCHEDULE_TICK_MINUTES = int(os.getenv('SSTU_SCHEDULE_TICK_MINUTES', '10'))
+SSTU_SCHEDULE_HOURLY_BUDGET = int(os.getenv('SSTU_SCHEDULE_HOURLY_BUDGET', '600'))
+SSTU_SCHEDULE_MIN_INTERVAL_MINUTES = int(os.getenv('SSTU_SCHEDULE_MIN_INTERVAL_MINUTES', '30'))
+SSTU_SCHEDULE_BASE_INTERVAL_HOURS = float(os.getenv('SSTU_SCHEDULE_BASE_INTERVAL_HOURS', '6'))
+SSTU_SCHEDULE_MAX_INTERVAL_HOURS = float(os.getenv('SSTU_SCHEDULE_MAX_INTERVAL_HOURS', '24'))
+# Days lesson changes (/api/schedule/lessons/changes/) are kept (0 - forever)
+SSTU_SCHEDULE_CHANGES_RETENTION_DAYS = int(os.getenv('SSTU_SCHEDULE_CHANGES_RETENTION_DAYS', '30'))
+# Parse and replace only lessons from N days ago onwards (empty - whole calendar)
+SSTU_SCHEDULE_WINDOW_PAST_DAYS = int(os.getenv('SSTU_SCHEDULE_WINDOW_PAST_DAYS')) if os.getenv('SSTU_SCHEDULE_WINDOW_PAST_DAYS') else None
+# Start of semester (YYYY-MM-DD) when no SemesterCalendar is stored in the DB
+SSTU_SEMESTER_START = os.getenv('SSTU_SEMESTER_START', '') or None
 
 # Rate Limiting
 RATELIMIT_ENABLE = True
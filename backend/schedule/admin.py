@@ -1,6 +1,6 @@
 """Admin configuration for schedule app."""
 from django.contrib import admin
-from .models import Institute, Group, Teacher, Subject, Lesson, ScheduleUpdate
+from .models import Institute, Group, GroupSyncStat, Teacher, Subject, Lesson, LessonChange, ScheduleUpdate, SemesterCalendar
 
 
 @admin.register(Institute)
@@ -12,7 +12,7 @@ class InstituteAdmin(admin.ModelAdmin):
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
-    list_display = ('name', 'institute', 'education_form', 'degree_type', 'course_number', 'sstu_id')
+    list_display = ('name', 'institute', 'education_form', 'degree_type', 'course_number', 'sstu_id', 'last_synced_at', 'next_sync_at', 'sync_priority')
     search_fields = ('name',)
     list_filter = ('institute', 'education_form', 'degree_type', 'course_number')
     ordering = ('name',)
@@ -42,7 +42,28 @@ class LessonAdmin(admin.ModelAdmin):
 
 @admin.register(ScheduleUpdate)
 class ScheduleUpdateAdmin(admin.ModelAdmin):
-    list_display = ('started_at', 'finished_at', 'status', 'groups_updated', 'lessons_added', 'lessons_removed')
+    list_display = ('started_at', 'finished_at', 'status', 'groups_updated', 'groups_skipped', 'lessons_added', 'lessons_removed', 'attempts')
     list_filter = ('status', 'started_at')
-    readonly_fields = ('started_at', 'finished_at', 'status', 'groups_updated', 'lessons_added', 'lessons_removed', 'error_message')
+    readonly_fields = ('started_at', 'finished_at', 'status', 'groups_updated', 'groups_skipped', 'lessons_added', 'lessons_removed', 'error_message', 'phase_timings', 'bytes_fetched', 'group_ids', 'heartbeat_at', 'attempts')
 
+
+@admin.register(GroupSyncStat)
+class GroupSyncStatAdmin(admin.ModelAdmin):
+    list_display = ('update', 'group', 'outcome', 'fetch_ms', 'parse_ms', 'db_ms', 'lessons')
+    list_filter = ('outcome',)
+    search_fields = ('group__name',)
+    raw_id_fields = ('update', 'group')
+
+
+@admin.register(LessonChange)
+class LessonChangeAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'group', 'action', 'natural_key', 'lesson_id', 'update')
+    list_filter = ('action', 'created_at')
+    search_fields = ('group__name', 'natural_key')
+    raw_id_fields = ('group', 'update')
+
+
+@admin.register(SemesterCalendar)
+class SemesterCalendarAdmin(admin.ModelAdmin):
+    list_display = ('name', 'start_date', 'end_date')
+    ordering = ('-start_date',)
@@ -0,0 +1,175 @@
+"""
+Crawl planner: choose which schedule pages to fetch in a full sync.
+
+A group page lists every lesson of one group, a teacher page lists every
+lesson of one teacher across all groups. When the known group -> teachers
+mapping (from stored lessons) says that all lessons of a group are taught by
+teachers whose pages are fetched anyway, the group page is redundant.
+
+The planner starts from "every teacher page" and drops teacher pages that
+cover fewer than two groups (reverse-delete greedy for this set cover), then
+keeps the plan only if it needs fewer requests than the group-only crawl.
+The mapping only knows teachers already stored, so a lesson of a new
+teacher is found on the group page alone: the caller pins groups whose own
+page has not been checked for too long. Django-free.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from .records import ParsedLesson
+
+
+class CrawlPlan(NamedTuple):
+    """Pages to fetch for one sync run."""
+
+    group_pages: List[int]  # group sstu_ids fetched from their own page
+    teacher_pages: List[int]  # teacher sstu_ids
+    teacher_groups: Dict[int, Set[int]]  # group sstu_id -> teachers whose pages cover it
+    baseline_requests: int  # group-only crawl
+
+    @property
+    def requests(self) -> int:
+        return len(self.group_pages) + len(self.teacher_pages)
+
+    @property
+    def requests_saved(self) -> int:
+        return self.baseline_requests - self.requests
+
+    def groups_depending_on(self, teacher_ids: Iterable[int]) -> List[int]:
+        """Teacher-covered groups that need any of given teacher pages."""
+        teacher_ids = set(teacher_ids)
+        return [group_id for group_id, teachers in self.teacher_groups.items() if teachers & teacher_ids]
+
+
+def group_only_plan(group_ids: Iterable[int]) -> CrawlPlan:
+    group_ids = list(group_ids)
+    return CrawlPlan(group_ids, [], {}, len(group_ids))
+
+
+def plan_crawl(group_ids: Iterable[int], group_teachers: Dict[int, Set[int]],
+               pinned_groups: Optional[Iterable[int]] = None) -> CrawlPlan:
+    """
+    Plan pages for a sync of ``group_ids``.
+
+    Args:
+        group_ids: Groups whose schedule must be covered
+        group_teachers: Known teachers of each group (from stored lessons)
+        pinned_groups: Groups that must be fetched from their own page, e.g.
+            groups with lessons without a teacher or with no stored lessons
+    """
+    group_ids = list(group_ids)
+    pinned = set(pinned_groups or ())
+
+    # Groups that teacher pages could cover, and groups each teacher covers
+    covered: Dict[int, Set[int]] = {
+        group_id: set(group_teachers[group_id])
+        for group_id in group_ids
+        if group_id not in pinned and group_teachers.get(group_id)
+    }
+    teacher_load: Dict[int, Set[int]] = {}
+    for group_id, teachers in covered.items():
+        for teacher_id in teachers:
+            teacher_load.setdefault(teacher_id, set()).add(group_id)
+
+    # Dropping a teacher page saves one request and costs one group page per
+    # group relying on it: drop while that is not a loss
+    while teacher_load:
+        teacher_id = min(teacher_load, key=lambda t: (len(teacher_load[t]), t))
+        if len(teacher_load[teacher_id]) > 1:
+            break
+        for group_id in teacher_load.pop(teacher_id):
+            for other_id in covered.pop(group_id):
+                if other_id != teacher_id:
+                    teacher_load[other_id].discard(group_id)
+        # Teachers left without groups are not needed at all
+        for other_id in [t for t, groups in teacher_load.items() if not groups]:
+            del teacher_load[other_id]
+
+    plan = CrawlPlan(
+        group_pages=[group_id for group_id in group_ids if group_id not in covered],
+        teacher_pages=sorted(teacher_load),
+        teacher_groups=covered,
+        baseline_requests=len(group_ids),
+    )
+    if plan.requests_saved <= 0:
+        return group_only_plan(group_ids)
+    return plan
+
+
+def teacher_lesson_to_group_lesson(lesson: Dict, teacher_id: int, teacher_info: Optional[Dict] = None) -> ParsedLesson:
+    """Convert lesson from teacher page to the record type of group pages."""
+    teacher_info = teacher_info or {}
+    return ParsedLesson.create(
+        subject_name=lesson['subject_name'],
+        teacher_name=teacher_info.get('teacher_name'),
+        teacher_id=teacher_id,
+        teacher_url=teacher_info.get('teacher_url'),
+        lesson_type=lesson['lesson_type'],
+        room=lesson.get('room', ''),
+        weekday=lesson['weekday'],
+        lesson_number=lesson['lesson_number'],
+        start_time=lesson['start_time'],
+        end_time=lesson['end_time'],
+        specific_date=lesson.get('specific_date'),
+        week_number=lesson.get('week_number'),
+    )
+
+
+def _lesson_key(lesson: ParsedLesson):
+    # Co-taught lessons appear on every teacher's page with the same room;
+    # subgroups in different rooms stay separate, as on the group page
+    return (
+        lesson.subject_name, lesson.lesson_type, lesson.weekday, lesson.lesson_number,
+        lesson.specific_date, lesson.week_number, lesson.room,
+    )
+
+
+def _teacher_rank(teacher_id: int, known_teachers: Set[int]):
+    # The group page shows a co-taught lesson under its first teacher, which
+    # is the one already stored for the group; otherwise the lowest ID wins
+    return teacher_id not in known_teachers, teacher_id
+
+
+def merge_teacher_lessons(plan: CrawlPlan, teacher_lessons: Dict[int, List[Dict]],
+                          group_names: Dict[str, int],
+                          teacher_info: Optional[Dict[int, Dict]] = None) -> Dict[int, List[ParsedLesson]]:
+    """
+    Build group schedules from fetched teacher pages.
+
+    Args:
+        plan: Plan the pages were fetched for
+        teacher_lessons: teacher sstu_id -> lessons from ``parse_teacher_schedule``
+        group_names: group name -> group sstu_id
+        teacher_info: teacher sstu_id -> {'teacher_name', 'teacher_url'}
+
+    Returns group sstu_id -> ParsedLesson list (as from group pages) for
+    teacher-covered groups only. Groups whose teacher pages are missing are
+    left out. A co-taught lesson is kept once, under a known teacher of the
+    group if there is one, whatever the order of teacher pages.
+    """
+    teacher_info = teacher_info or {}
+    merged: Dict[int, Dict] = {
+        group_id: {}
+        for group_id, teachers in plan.teacher_groups.items()
+        if teachers <= teacher_lessons.keys()
+    }
+
+    for teacher_id in plan.teacher_pages:
+        for lesson in teacher_lessons.get(teacher_id, ()):
+            group_id = group_names.get(lesson.get('group_name'))
+            if group_id not in merged:
+                continue
+            record = teacher_lesson_to_group_lesson(lesson, teacher_id, teacher_info.get(teacher_id))
+            key = _lesson_key(record)
+            kept = merged[group_id].get(key)
+            known = plan.teacher_groups[group_id]
+            if kept is None or _teacher_rank(teacher_id, known) < _teacher_rank(kept.teacher_id, known):
+                merged[group_id][key] = record
+
+    return {
+        group_id: sorted(
+            lessons.values(),
+            key=lambda lesson: (lesson.specific_date or date.min, lesson.weekday, lesson.lesson_number),
+        )
+        for group_id, lessons in merged.items()
+    }
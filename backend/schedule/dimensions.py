@@ -0,0 +1,136 @@
+"""
+Per-run cache of Subject and Teacher IDs.
+
+Every lesson refers to a subject by name and to a teacher by SSTU ID (or by
+name when the page gives no ID). The resolver loads all subjects and
+teachers once (one query each), creates unseen ones with ``bulk_create``
+and collects teacher name/profile URL changes into one ``bulk_update``, so
+resolving the lessons of a whole sync costs a few queries instead of two
+``get_or_create`` per lesson.
+
+Chunks of one sync run in parallel, so another process may create the same
+row between loading and ``bulk_create``: rows are inserted ignoring
+conflicts on the unique keys (subject name, teacher SSTU ID, name of a
+teacher without ID) and their IDs are read back by key.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Subject, Teacher
+
+logger = logging.getLogger(__name__)
+
+# ('id', sstu_id) or ('name', full_name)
+TeacherRef = Tuple[str, object]
+
+
+def teacher_ref(teacher_name: Optional[str], teacher_id: Optional[int] = None) -> Optional[TeacherRef]:
+    """Teacher is matched by SSTU ID, or by name when there is no ID."""
+    if not teacher_name:
+        return None
+    if teacher_id:
+        return 'id', teacher_id
+    return 'name', teacher_name
+
+
+class DimensionResolver:
+    """Resolve subject and teacher IDs, creating missing rows in bulk."""
+
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+        self._subjects: Optional[Dict[str, int]] = None
+        self._teachers: Dict[TeacherRef, int] = {}
+        # Stored name/URL of teachers with SSTU ID, to detect changes
+        self._teacher_info: Dict[int, Tuple[str, Optional[str]]] = {}
+        self.stats = {
+            'subjects_created': 0,
+            'teachers_created': 0,
+            'teachers_updated': 0,
+        }
+
+    def _load(self):
+        if self._subjects is not None:
+            return
+        self._subjects = {}
+        for subject_id, name in Subject.objects.order_by('id').values_list('id', 'name'):
+            self._subjects.setdefault(name, subject_id)
+
+        self._teachers = {}
+        self._teacher_info = {}
+        for teacher_id, sstu_id, full_name, url in Teacher.objects.order_by('id').values_list(
+                'id', 'sstu_id', 'full_name', 'sstu_profile_url'):
+            if sstu_id is not None:
+                self._teachers[('id', sstu_id)] = teacher_id
+                self._teacher_info[teacher_id] = (full_name, url)
+            self._teachers.setdefault(('name', full_name), teacher_id)
+
+    def invalidate(self):
+        """Drop cached IDs (e.g. after a rolled back transaction created some of them)."""
+        self._subjects = None
+        self._teachers = {}
+        self._teacher_info = {}
+
+    def subject_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        """Subject IDs by name, creating missing subjects."""
+        self._load()
+        names = set(names)
+        missing = [name for name in names if name not in self._subjects]
+        if missing:
+            Subject.objects.bulk_create(
+                [Subject(name=name) for name in missing], batch_size=self.batch_size, ignore_conflicts=True,
+            )
+            for subject_id, name in Subject.objects.filter(name__in=missing).values_list('id', 'name'):
+                self._subjects[name] = subject_id
+            self.stats['subjects_created'] += len(missing)
+        return {name: self._subjects[name] for name in names}
+
+    def teacher_ids(self, teachers: Iterable[Tuple[str, Optional[int], Optional[str]]]) -> Dict[TeacherRef, int]:
+        """
+        Teacher IDs by reference for ``(name, sstu_id, profile_url)`` triples.
+        Missing teachers are created; changed names/URLs of teachers with
+        SSTU ID are updated in one query.
+        """
+        self._load()
+        wanted: Dict[TeacherRef, Tuple[str, Optional[int], Optional[str]]] = {}
+        for teacher in teachers:
+            ref = teacher_ref(teacher[0], teacher[1])
+            if ref:
+                # Later data wins, as with row-by-row updates
+                wanted[ref] = teacher
+
+        missing = []
+        changed: List[Teacher] = []
+        now = timezone.now()
+        for ref, (name, sstu_id, url) in wanted.items():
+            teacher_id = self._teachers.get(ref)
+            if teacher_id is None:
+                missing.append(Teacher(full_name=name, sstu_id=sstu_id or None, sstu_profile_url=url or None))
+                continue
+            if ref[0] != 'id':
+                continue
+            stored_name, stored_url = self._teacher_info.get(teacher_id, (name, url))
+            if stored_name != name or (url and stored_url != url):
+                new_url = url or stored_url
+                changed.append(Teacher(id=teacher_id, full_name=name, sstu_profile_url=new_url, updated_at=now))
+                self._teacher_info[teacher_id] = (name, new_url)
+
+        if missing:
+            Teacher.objects.bulk_create(missing, batch_size=self.batch_size, ignore_conflicts=True)
+            created = Teacher.objects.filter(
+                Q(sstu_id__in=[teacher.sstu_id for teacher in missing if teacher.sstu_id is not None]) |
+                Q(sstu_id__isnull=True, full_name__in=[teacher.full_name for teacher in missing if teacher.sstu_id is None])
+            ).values_list('id', 'sstu_id', 'full_name', 'sstu_profile_url')
+            for teacher_id, sstu_id, full_name, url in created:
+                self._teachers[teacher_ref(full_name, sstu_id)] = teacher_id
+                self._teachers.setdefault(('name', full_name), teacher_id)
+                if sstu_id is not None:
+                    self._teacher_info[teacher_id] = (full_name, url)
+            self.stats['teachers_created'] += len(missing)
+        if changed:
+            Teacher.objects.bulk_update(changed, ['full_name', 'sstu_profile_url', 'updated_at'], batch_size=self.batch_size)
+            self.stats['teachers_updated'] += len(changed)
+
+        return {ref: self._teachers[ref] for ref in wanted}
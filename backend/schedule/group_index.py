@@ -0,0 +1,90 @@
+"""
+Name-keyed index of groups listed on the rasp.sstu.ru main page.
+
+The index of the current main page is compared with the previous snapshot
+(for the sync service it is built from the stored ``Group`` rows), so only
+groups that appeared, disappeared or changed attributes need to be written.
+Django-free: the snapshot is a plain dict.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+# Group attributes compared between snapshots
+GROUP_INDEX_FIELDS = ('sstu_id', 'institute_sstu_id', 'education_form', 'degree_type', 'course_number')
+
+
+class GroupIndexDiff(NamedTuple):
+    """Structural difference between two group indexes."""
+
+    added: Dict[str, Dict]  # name -> current entry
+    removed: Dict[str, Dict]  # name -> previous entry
+    changed: Dict[str, Dict[str, Tuple]]  # name -> {field: (old, new)}
+    unchanged: frozenset  # names
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed, {len(self.unchanged)} unchanged"
+        )
+
+
+def group_index_entry(group_data: Dict, institute_sstu_id=None) -> Dict:
+    """Index entry for group dict from main page parser."""
+    entry = {field: group_data.get(field) for field in GROUP_INDEX_FIELDS}
+    entry['name'] = group_data['name']
+    if institute_sstu_id is not None:
+        entry['institute_sstu_id'] = institute_sstu_id
+    return entry
+
+
+def build_group_index(institutes_data: Iterable[Dict]) -> Dict[str, Dict]:
+    """
+    Build name-keyed index from ``parse_main_page`` result.
+
+    A group listed under several institutes keeps its last occurrence, the
+    same one the sync service ends up storing.
+    """
+    index = {}
+    for institute_data in institutes_data:
+        for group_data in institute_data['groups']:
+            index[group_data['name']] = group_index_entry(group_data, institute_data.get('sstu_id'))
+    return index
+
+
+def diff_group_index(previous: Dict[str, Dict], current: Dict[str, Dict]) -> GroupIndexDiff:
+    """Compare previous snapshot with current index."""
+    added = {}
+    changed = {}
+    unchanged = []
+
+    for name, entry in current.items():
+        old_entry = previous.get(name)
+        if old_entry is None:
+            added[name] = entry
+            continue
+
+        changes = {
+            field: (old_entry.get(field), entry.get(field))
+            for field in GROUP_INDEX_FIELDS
+            if old_entry.get(field) != entry.get(field)
+        }
+        if changes:
+            changed[name] = changes
+        else:
+            unchanged.append(name)
+
+    removed = {name: entry for name, entry in previous.items() if name not in current}
+    return GroupIndexDiff(added, removed, changed, frozenset(unchanged))
+
+
+def describe_changes(diff: GroupIndexDiff, limit: int = 20) -> List[str]:
+    """Human-readable lines for log output."""
+    lines = [f"+ {name}" for name in list(diff.added)[:limit]]
+    lines += [f"- {name}" for name in list(diff.removed)[:limit]]
+    for name, changes in list(diff.changed.items())[:limit]:
+        fields = ', '.join(f"{field}: {old} -> {new}" for field, (old, new) in changes.items())
+        lines.append(f"~ {name} ({fields})")
+    return lines
@@ -0,0 +1,146 @@
+"""
+HTML parser backends for SSTU schedule pages.
+
+All extractors in ``parser.py`` navigate pages through the BeautifulSoup API,
+so a backend is the tree builder BeautifulSoup runs on: ``lxml`` (C-backed,
+much faster) when it is installed, pure-Python ``html.parser`` otherwise.
+"""
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+# lxml is optional: without it we fall back to the stdlib parser
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+AUTO_BACKEND = 'auto'
+FALLBACK_BACKEND = 'html.parser'
+BACKENDS = ('lxml', FALLBACK_BACKEND)
+
+
+def available_backends() -> List[str]:
+    """Return backends that can be used in the current environment."""
+    return [name for name in BACKENDS if name != 'lxml' or LXML_AVAILABLE]
+
+
+def resolve_backend(name: Optional[str] = None) -> str:
+    """Resolve configured backend name to a usable BeautifulSoup tree builder."""
+    if not name or name == AUTO_BACKEND:
+        return 'lxml' if LXML_AVAILABLE else FALLBACK_BACKEND
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML backend '{name}'. Choose one of: {', '.join(BACKENDS + (AUTO_BACKEND,))}")
+
+    if name == 'lxml' and not LXML_AVAILABLE:
+        logger.warning("HTML backend 'lxml' requested but lxml is not installed, falling back to html.parser")
+        return FALLBACK_BACKEND
+
+    return name
+
+
+def make_soup(text: str, backend: Optional[str] = None) -> BeautifulSoup:
+    """Build BeautifulSoup tree for page text using given backend."""
+    return BeautifulSoup(text, resolve_backend(backend))
+
+
+def _normalize(value):
+    """Convert parser output to plain comparable values."""
+    if hasattr(value, 'to_dict'):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def page_kind(path: Path) -> Optional[str]:
+    """Detect page kind from corpus file name (main*.html, group_<id>.html, teacher_<id>.html)."""
+    stem = path.stem
+    if stem.startswith('main'):
+        return 'main'
+    if stem.startswith('group_'):
+        return 'group'
+    if stem.startswith('teacher_'):
+        return 'teacher'
+    return None
+
+
+def _page_object_id(path: Path) -> Optional[int]:
+    """Extract SSTU ID from corpus file name."""
+    try:
+        return int(path.stem.split('_', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def parse_corpus_page(parser, path: Path, text: str):
+    """Run matching public parser entry point on recorded page text."""
+    kind = page_kind(path)
+    if kind == 'main':
+        return parser.parse_main_html(text)
+    if kind == 'group':
+        return parser.parse_group_html(text, _page_object_id(path))
+    if kind == 'teacher':
+        return parser.parse_teacher_html(text, _page_object_id(path))
+    return None
+
+
+def compare_backends(corpus_dir, backends: Optional[List[str]] = None) -> Dict:
+    """
+    Parse every recorded page of a corpus with each backend and compare results.
+
+    Corpus layout: ``main.html``, ``group_<sstu_id>.html``, ``teacher_<sstu_id>.html``.
+    Returns summary with checked page count and list of mismatches.
+    """
+    # Imported here to avoid circular import (parser imports this module)
+    from .parser import SSTUScheduleParser
+
+    backends = backends or available_backends()
+    parsers = {name: SSTUScheduleParser(html_backend=name) for name in backends}
+    reference = backends[0]
+
+    summary = {
+        'backends': [parser.html_backend for parser in parsers.values()],
+        'pages_checked': 0,
+        'mismatches': [],
+    }
+
+    for path in sorted(Path(corpus_dir).glob('*.html')):
+        if not page_kind(path):
+            continue
+
+        text = path.read_text(encoding='utf-8', errors='ignore')
+        results = {
+            name: _normalize(parse_corpus_page(parser, path, text))
+            for name, parser in parsers.items()
+        }
+        summary['pages_checked'] += 1
+
+        for name in backends[1:]:
+            if results[name] == results[reference]:
+                continue
+
+            expected, actual = results[reference], results[name]
+            mismatch = {
+                'page': path.name,
+                'backends': (reference, name),
+                'counts': (len(expected or []), len(actual or [])),
+                'first_difference': None,
+            }
+            for index, (left, right) in enumerate(zip(expected or [], actual or [])):
+                if left != right:
+                    mismatch['first_difference'] = {'index': index, reference: left, name: right}
+                    break
+            summary['mismatches'].append(mismatch)
+
+    return summary
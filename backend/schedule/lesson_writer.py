@@ -0,0 +1,200 @@
+"""
+Bulk writer of a group's lessons.
+
+Instead of marking all lessons inactive and upserting them one by one, the
+writer loads the group's current lessons once, matches them with parsed
+lessons by natural key (``Lesson.natural_key``, unique within a group) and
+applies the difference with one delete and one
+``INSERT ... ON CONFLICT (group, natural_key) DO UPDATE``. A group sync
+takes a fixed handful of queries however many lessons it has, unchanged
+rows are not written, and a lesson keeps its ID while its key is the same.
+Concurrent writers of the same group update each other's rows instead of
+failing on the constraint.
+
+Every added, removed and modified lesson is also logged as a LessonChange
+(the delta feed of ``/api/schedule/lessons/changes/``).
+"""
+import logging
+from datetime import date, time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .dimensions import DimensionResolver, teacher_ref
+from .models import Group, Lesson, LessonChange
+from .records import ParsedLesson
+
+logger = logging.getLogger(__name__)
+
+# Lesson fields taken from parsed lesson (compared to detect changes)
+LESSON_FIELDS = (
+    'lesson_type', 'room', 'weekday', 'lesson_number', 'start_time', 'end_time',
+    'specific_date', 'week_number', 'additional_info', 'is_active',
+)
+
+
+# Lesson fields kept in LessonChange.data
+CHANGE_DATA_FIELDS = ('subject_id', 'teacher_id') + tuple(field for field in LESSON_FIELDS if field != 'is_active')
+
+
+def change_value(value):
+    """JSON-friendly field value for LessonChange."""
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+class LessonWriteResult(NamedTuple):
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+def lesson_key(specific_date, weekday, lesson_number, subject_id, teacher_id) -> str:
+    """Natural key of a lesson within its group."""
+    return Lesson.build_natural_key(specific_date, weekday, lesson_number, subject_id, teacher_id)
+
+
+class GroupLessonWriter:
+    """Diff parsed lessons against stored ones and apply changes in bulk."""
+
+    def __init__(self, dimensions: Optional[DimensionResolver] = None, batch_size: int = 500,
+                 record_changes: bool = True):
+        # Shared across groups of one run: subjects/teachers are loaded once
+        self.dimensions = dimensions or DimensionResolver(batch_size=batch_size)
+        self.batch_size = batch_size
+        self.record_changes = record_changes
+
+    def write(self, group: Group, lessons: Iterable[ParsedLesson],
+              existing: Optional[QuerySet] = None, update_id: Optional[int] = None) -> LessonWriteResult:
+        """
+        Make ``existing`` lessons of group (default: all of them) equal to
+        parsed ``lessons``. Changes are logged under ScheduleUpdate ``update_id``.
+        Should run inside a transaction.
+        """
+        lessons = list(lessons)
+        subjects = self.dimensions.subject_ids(lesson.subject_name for lesson in lessons)
+        teachers = self.dimensions.teacher_ids(
+            (lesson.teacher_name, lesson.teacher_id, lesson.teacher_url) for lesson in lessons
+        )
+
+        if existing is None:
+            existing = Lesson.objects.filter(group=group)
+        stored: Dict[str, Lesson] = {
+            lesson.natural_key: lesson
+            for lesson in existing.only('id', 'natural_key', 'subject_id', 'teacher_id', *LESSON_FIELDS)
+        }
+
+        # Same key twice on the page: the later lesson wins, as with row-by-row upserts
+        parsed: Dict[str, Dict] = {}
+        names: Dict[str, Dict] = {}
+        for lesson in lessons:
+            teacher = teachers.get(teacher_ref(lesson.teacher_name, lesson.teacher_id))
+            values = {
+                'subject_id': subjects[lesson.subject_name],
+                'teacher_id': teacher,
+                'lesson_type': lesson.lesson_type,
+                'room': lesson.room or '',
+                'weekday': lesson.weekday,
+                'lesson_number': lesson.lesson_number,
+                'start_time': lesson.start_time,
+                'end_time': lesson.end_time,
+                'specific_date': lesson.specific_date,
+                'week_number': lesson.week_number,
+                'additional_info': lesson.additional_info or '',
+                'is_active': True,
+            }
+            values['natural_key'] = lesson_key(lesson.specific_date, lesson.weekday, lesson.lesson_number,
+                                               values['subject_id'], teacher)
+            parsed[values['natural_key']] = values
+            names[values['natural_key']] = {'subject_name': lesson.subject_name, 'teacher_name': lesson.teacher_name}
+
+        now = timezone.now()
+        to_create: List[Lesson] = []
+        to_update: List[Lesson] = []
+        changed_values: List[Dict] = []
+        changes: List[LessonChange] = []
+        for key, values in parsed.items():
+            current = stored.pop(key, None)
+            if current is None:
+                to_create.append(Lesson(group=group, **values))
+                changes.append(self._change(group, update_id, LessonChange.Action.ADDED, key, values, names[key]))
+                continue
+            changed_fields = {}
+            for field in LESSON_FIELDS:
+                if getattr(current, field) != values[field]:
+                    changed_fields[field] = [change_value(getattr(current, field)), change_value(values[field])]
+                    setattr(current, field, values[field])
+            if changed_fields:
+                current.updated_at = now
+                to_update.append(current)
+                changed_values.append(values)
+                changes.append(self._change(group, update_id, LessonChange.Action.MODIFIED, key, values, names[key],
+                                            lesson_id=current.pk, changed_fields=changed_fields))
+
+        stale = [lesson.pk for lesson in stored.values()]
+        for lesson in stored.values():
+            values = {field: getattr(lesson, field) for field in CHANGE_DATA_FIELDS}
+            changes.append(self._change(group, update_id, LessonChange.Action.REMOVED, lesson.natural_key, values,
+                                        lesson_id=lesson.pk))
+        removed = 0
+        for start in range(0, len(stale), self.batch_size):
+            removed += Lesson.objects.filter(pk__in=stale[start:start + self.batch_size]).delete()[0]
+        self._upsert(group, to_create, to_update, changed_values)
+        if self.record_changes and changes:
+            self._log_changes(group, changes)
+
+        return LessonWriteResult(
+            created=len(to_create),
+            updated=len(to_update),
+            unchanged=len(parsed) - len(to_create) - len(to_update),
+            removed=removed,
+        )
+
+    def _upsert(self, group: Group, to_create: List[Lesson], to_update: List[Lesson], changed_values: List[Dict]):
+        """
+        Write new and changed lessons with one ``INSERT ... ON CONFLICT DO UPDATE``
+        (PostgreSQL, SQLite). Backends without conflict target fall back to
+        ``bulk_update`` + ``bulk_create``.
+        """
+        if not connection.features.supports_update_conflicts_with_target:
+            if to_update:
+                Lesson.objects.bulk_update(to_update, LESSON_FIELDS + ('updated_at',), batch_size=self.batch_size)
+            if to_create:
+                Lesson.objects.bulk_create(to_create, batch_size=self.batch_size)
+            return
+
+        # Rows go without ID: existing ones are matched (and keep their ID) by natural key
+        rows = to_create + [Lesson(group=group, **values) for values in changed_values]
+        if rows:
+            Lesson.objects.bulk_create(
+                rows,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['group', 'natural_key'],
+                update_fields=LESSON_FIELDS + ('updated_at',),
+            )
+
+    @staticmethod
+    def _change(group: Group, update_id: Optional[int], action: str, key: str, values: Dict,
+                extra: Optional[Dict] = None, lesson_id: Optional[int] = None,
+                changed_fields: Optional[Dict] = None) -> LessonChange:
+        data = {field: change_value(values[field]) for field in CHANGE_DATA_FIELDS}
+        data.update(extra or {})
+        return LessonChange(group=group, update_id=update_id, lesson_id=lesson_id, natural_key=key,
+                            action=action, changed_fields=changed_fields or {}, data=data)
+
+    def _log_changes(self, group: Group, changes: List[LessonChange]):
+        """Fill IDs of added lessons (upsert does not return them) and save the changes."""
+        added = [change for change in changes if change.lesson_id is None]
+        for start in range(0, len(added), self.batch_size):
+            batch = added[start:start + self.batch_size]
+            ids = dict(Lesson.objects.filter(
+                group=group, natural_key__in=[change.natural_key for change in batch]
+            ).values_list('natural_key', 'id'))
+            for change in batch:
+                change.lesson_id = ids.get(change.natural_key)
+        LessonChange.objects.bulk_create(changes, batch_size=self.batch_size)
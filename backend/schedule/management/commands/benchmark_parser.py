@@ -0,0 +1,107 @@
+"""
+Management command to benchmark schedule parser on a recorded corpus of pages.
+"""
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from schedule.parser import SSTUScheduleParser
+from schedule.parser_benchmark import (
+    DEFAULT_CORPUS_DIR, compare_with_baseline, load_report, record_corpus, run_benchmark, save_report,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark parser entry points offline on recorded rasp.sstu.ru pages and compare with baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'corpus',
+            nargs='?',
+            default=str(DEFAULT_CORPUS_DIR),
+            help='Directory with main.html, group_<id>.html and teacher_<id>.html files '
+                 '(default: the committed schedule/benchmark_corpus)',
+        )
+        parser.add_argument(
+            '--record',
+            action='store_true',
+            help='Download a fresh corpus from rasp.sstu.ru into the directory before benchmarking',
+        )
+        parser.add_argument('--groups', type=int, default=20, help='Group pages to record (default 20)')
+        parser.add_argument('--teachers', type=int, default=10, help='Teacher pages to record (default 10)')
+        parser.add_argument('--backend', help='HTML backend (default: SSTU_SCHEDULE_HTML_BACKEND)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed passes over the corpus, best is reported')
+        parser.add_argument(
+            '--baseline',
+            help='Baseline report to compare with (default: <corpus>/baseline.json if it exists)',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Write this run as the baseline instead of comparing',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.3,
+            help='Allowed drop of throughput per calibration loop / allocation growth (default 0.3)',
+        )
+        parser.add_argument('--json', action='store_true', help='Print full report as JSON')
+
+    def handle(self, *args, **options):
+        corpus = Path(options['corpus'])
+        backend = options.get('backend') or getattr(settings, 'SSTU_SCHEDULE_HTML_BACKEND', None)
+
+        if options['record']:
+            self.stdout.write(f'Recording corpus into {corpus}...')
+            saved = record_corpus(
+                SSTUScheduleParser(
+                    proxy=getattr(settings, 'SSTU_SCHEDULE_PROXY', None),
+                    cloudflare_worker_url=getattr(settings, 'SSTU_CLOUDFLARE_WORKER_URL', None),
+                    html_backend=backend,
+                ),
+                corpus,
+                groups=options['groups'],
+                teachers=options['teachers'],
+            )
+            self.stdout.write(f'  Saved pages: {saved}')
+
+        report = run_benchmark(corpus, html_backend=backend, repeat=options['repeat'])
+        if not report['entry_points']:
+            raise CommandError(f'No corpus pages found in {corpus}')
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        self.stdout.write(
+            f'Backend: {report["html_backend"]}, best of {report["repeat"]} passes, '
+            f'calibration loop {report["calibration_seconds"] * 1000:.1f} ms'
+        )
+        for entry_point, result in report['entry_points'].items():
+            rss = f'{result["peak_rss_kb"] / 1024:.1f} MB' if result['peak_rss_kb'] else 'n/a'
+            self.stdout.write(
+                f'  {entry_point}: {result["pages"]} pages, {result["records"]} records, '
+                f'{result["pages_per_sec"]} pages/s ({result["pages_per_calibration"]} per calibration loop), '
+                f'{result["records_per_sec"]} records/s, '
+                f'peak traced memory {result["peak_alloc_bytes_per_page"] / 1024:.0f} KB per page, '
+                f'peak RSS {rss}'
+            )
+
+        baseline_path = Path(options['baseline']) if options.get('baseline') else corpus / 'baseline.json'
+        if options['save_baseline']:
+            save_report(report, baseline_path)
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+            return
+
+        if not baseline_path.exists():
+            if options.get('baseline'):
+                raise CommandError(f'Baseline {baseline_path} not found')
+            self.stdout.write('No baseline to compare with (use --save-baseline to create one)')
+            return
+
+        violations = compare_with_baseline(report, load_report(baseline_path), options['tolerance'])
+        if violations:
+            for violation in violations:
+                self.stdout.write(self.style.ERROR(json.dumps(violation, ensure_ascii=False)))
+            raise CommandError(f'{len(violations)} budget violations against {baseline_path}')
+
+        self.stdout.write(self.style.SUCCESS(f'Within {options["tolerance"]:.0%} of baseline {baseline_path}'))
@@ -0,0 +1,52 @@
+"""
+Management command to verify that HTML backends produce identical schedule data.
+"""
+import json
+from django.core.management.base import BaseCommand, CommandError
+from schedule.html_backends import available_backends, compare_backends
+from schedule.parser_benchmark import DEFAULT_CORPUS_DIR
+
+
+class Command(BaseCommand):
+    help = 'Compare parser output of HTML backends on a recorded corpus of rasp.sstu.ru pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'corpus',
+            nargs='?',
+            default=str(DEFAULT_CORPUS_DIR),
+            help='Directory with main.html, group_<id>.html and teacher_<id>.html files '
+                 '(default: the committed schedule/benchmark_corpus)',
+        )
+        parser.add_argument(
+            '--backend',
+            action='append',
+            dest='backends',
+            help='Backend to compare (repeatable). Defaults to all available backends',
+        )
+
+    def handle(self, *args, **options):
+        backends = options.get('backends') or available_backends()
+        if len(backends) < 2:
+            raise CommandError(
+                f'Need at least two backends to compare, available: {", ".join(available_backends())}'
+            )
+
+        summary = compare_backends(options['corpus'], backends)
+
+        if not summary['pages_checked']:
+            raise CommandError(f'No corpus pages found in {options["corpus"]}')
+
+        if summary['mismatches']:
+            for mismatch in summary['mismatches']:
+                self.stdout.write(self.style.ERROR(
+                    json.dumps(mismatch, ensure_ascii=False, default=str)
+                ))
+            raise CommandError(
+                f'{len(summary["mismatches"])} of {summary["pages_checked"]} pages differ between backends'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backends {", ".join(summary["backends"])} produce identical output '
+            f'for {summary["pages_checked"]} pages'
+        ))
@@ -1,7 +1,9 @@
 """
 Management command to sync schedule data.
 """
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from schedule.page_archive import LATEST_SNAPSHOT, list_snapshots
 from schedule.services import ScheduleSyncService
 
 
@@ -14,9 +16,39 @@ class Command(BaseCommand):
             type=int,
             help='Sync only specific group by SSTU ID',
         )
+        parser.add_argument(
+            '--replay',
+            nargs='?',
+            const=LATEST_SNAPSHOT,
+            metavar='SNAPSHOT',
+            help='Re-parse pages from SSTU_SCHEDULE_ARCHIVE_DIR (latest or given snapshot) without network access',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite lessons even if group schedule hash did not change',
+        )
+        parser.add_argument(
+            '--list-snapshots',
+            action='store_true',
+            help='List snapshots in SSTU_SCHEDULE_ARCHIVE_DIR and exit',
+        )
 
     def handle(self, *args, **options):
-        service = ScheduleSyncService()
+        if options.get('list_snapshots'):
+            archive_dir = getattr(settings, 'SSTU_SCHEDULE_ARCHIVE_DIR', None)
+            if not archive_dir:
+                raise CommandError('SSTU_SCHEDULE_ARCHIVE_DIR is not set')
+            for snapshot in list_snapshots(archive_dir):
+                self.stdout.write(snapshot)
+            return
+        
+        try:
+            service = ScheduleSyncService(replay=options.get('replay'), force=options.get('force', False))
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options.get('replay'):
+            self.stdout.write(f'Replaying archive snapshot {service.parser.replay.snapshot} (no network requests)')
         
         group_id = options.get('group')
         
@@ -38,6 +70,7 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS(
                     f'Successfully synced schedules:\n'
                     f'  Groups updated: {update.groups_updated}\n'
+                    f'  Groups skipped (unchanged): {update.groups_skipped}\n'
                     f'  Lessons added: {update.lessons_added}\n'
                     f'  Lessons removed: {update.lessons_removed}'
                 ))
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SemesterCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('start_date', models.DateField(help_text='Понедельник первой учебной недели', unique=True, verbose_name='Начало семестра')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Окончание семестра')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Семестр',
+                'verbose_name_plural': 'Семестры',
+                'ordering': ['-start_date'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0002_semestercalendar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последняя синхронизация'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='schedule_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 последнего записанного набора занятий', max_length=64, verbose_name='Хэш расписания'),
+        ),
+        migrations.AddField(
+            model_name='scheduleupdate',
+            name='groups_skipped',
+            field=models.IntegerField(default=0, verbose_name='Пропущено групп (расписание не изменилось)'),
+        ),
+    ]
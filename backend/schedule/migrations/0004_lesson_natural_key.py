@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:10
+
+from django.db import migrations, models
+
+
+def fill_natural_keys(apps, schema_editor):
+    """Fill natural_key of existing lessons and delete duplicates (the lowest ID is kept)."""
+    Lesson = apps.get_model('schedule', 'Lesson')
+    seen = set()
+    duplicates = []
+    changed = []
+    rows = Lesson.objects.order_by('id').values_list(
+        'id', 'group_id', 'specific_date', 'weekday', 'lesson_number', 'subject_id', 'teacher_id'
+    )
+    for lesson_id, group_id, *parts in rows.iterator(chunk_size=2000):
+        key = '|'.join('' if part is None else str(part) for part in parts)
+        if (group_id, key) in seen:
+            duplicates.append(lesson_id)
+            continue
+        seen.add((group_id, key))
+        changed.append(Lesson(id=lesson_id, natural_key=key))
+    for start in range(0, len(duplicates), 500):
+        Lesson.objects.filter(id__in=duplicates[start:start + 500]).delete()
+    Lesson.objects.bulk_update(changed, ['natural_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0003_group_schedule_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='natural_key',
+            field=models.CharField(default='', editable=False, help_text='Дата|день недели|номер пары|предмет|преподаватель, уникален в группе', max_length=64, verbose_name='Естественный ключ'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_natural_keys, migrations.RunPython.noop),
+    ]
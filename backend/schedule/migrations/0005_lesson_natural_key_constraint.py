@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Separate from the data migration: PostgreSQL does not alter a table
+    # with pending trigger events in the same transaction
+    dependencies = [
+        ('schedule', '0004_lesson_natural_key'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('group', 'natural_key'), name='schedule_lesson_natural_key'),
+        ),
+    ]
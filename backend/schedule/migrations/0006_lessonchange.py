@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0005_lesson_natural_key_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lesson_id', models.IntegerField(blank=True, null=True, verbose_name='ID занятия')),
+                ('natural_key', models.CharField(max_length=64, verbose_name='Естественный ключ занятия')),
+                ('action', models.CharField(choices=[('added', 'Добавлено'), ('removed', 'Удалено'), ('modified', 'Изменено')], max_length=10, verbose_name='Изменение')),
+                ('changed_fields', models.JSONField(blank=True, default=dict, help_text='{"поле": [старое, новое]} для изменённых занятий', verbose_name='Изменённые поля')),
+                ('data', models.JSONField(blank=True, default=dict, help_text='Поля занятия после изменения (для удалённых - последние сохранённые)', verbose_name='Занятие')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время изменения')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_changes', to='schedule.group', verbose_name='Группа')),
+                ('update', models.ForeignKey(blank=True, help_text='Пусто для импорта от клиента', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lesson_changes', to='schedule.scheduleupdate', verbose_name='Обновление расписания')),
+            ],
+            options={
+                'verbose_name': 'Изменение занятия',
+                'verbose_name_plural': 'Изменения занятий',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['group', 'id'], name='schedule_le_group_i_5be110_idx'), models.Index(fields=['created_at'], name='schedule_le_created_fc6448_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0006_lessonchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduleupdate',
+            name='bytes_fetched',
+            field=models.BigIntegerField(default=0, verbose_name='Загружено байт'),
+        ),
+        migrations.AddField(
+            model_name='scheduleupdate',
+            name='phase_timings',
+            field=models.JSONField(blank=True, default=dict, help_text='{"этап": {"wall": секунды, "cpu": секунды}}: index, teacher_pages, groups, fetch, parse, db', verbose_name='Время по этапам'),
+        ),
+        migrations.CreateModel(
+            name='GroupSyncStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fetch_ms', models.IntegerField(default=0, verbose_name='Загрузка, мс')),
+                ('parse_ms', models.IntegerField(default=0, verbose_name='Разбор (CPU), мс')),
+                ('db_ms', models.IntegerField(default=0, verbose_name='Запись в БД, мс')),
+                ('lessons', models.IntegerField(default=0, verbose_name='Занятий')),
+                ('outcome', models.CharField(choices=[('updated', 'Обновлено'), ('skipped', 'Расписание не изменилось'), ('unchanged', 'Страница не изменилась'), ('empty', 'Нет занятий'), ('failed', 'Ошибка')], max_length=10, verbose_name='Результат')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_stats', to='schedule.group', verbose_name='Группа')),
+                ('update', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_stats', to='schedule.scheduleupdate', verbose_name='Обновление расписания')),
+            ],
+            options={
+                'verbose_name': 'Синхронизация группы',
+                'verbose_name_plural': 'Синхронизация групп',
+                'ordering': ['id'],
+            },
+        ),
+    ]
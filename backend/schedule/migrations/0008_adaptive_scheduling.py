@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0007_sync_instrumentation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='change_rate',
+            field=models.FloatField(default=0.5, help_text='Сглаженная доля синхронизаций, изменивших расписание (0-1)', verbose_name='Частота изменений'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='next_sync_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Следующая синхронизация'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='request_count',
+            field=models.IntegerField(default=0, help_text='Запросы к API с момента последнего пересчёта приоритетов', verbose_name='Запросы расписания'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='request_rate',
+            field=models.FloatField(default=0, help_text='Сглаженное число запросов расписания группы в час', verbose_name='Запросов в час'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='sync_priority',
+            field=models.FloatField(default=0, verbose_name='Приоритет синхронизации'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0008_adaptive_scheduling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduleupdate',
+            name='attempts',
+            field=models.IntegerField(default=1, help_text='Больше 1, если прерванное обновление возобновлялось', verbose_name='Запусков'),
+        ),
+        migrations.AddField(
+            model_name='scheduleupdate',
+            name='group_ids',
+            field=models.JSONField(blank=True, default=list, help_text='SSTU ID групп, которые синхронизирует это обновление (пусто - главная страница ещё не разобрана)', verbose_name='Группы обновления'),
+        ),
+        migrations.AddField(
+            model_name='scheduleupdate',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последняя контрольная точка'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:40
+
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Merge subjects with the same name and teachers without SSTU ID with the
+    same name (the lowest ID is kept), then rebuild natural keys of affected
+    lessons and delete lessons that became duplicates.
+    """
+    Subject = apps.get_model('schedule', 'Subject')
+    Teacher = apps.get_model('schedule', 'Teacher')
+    Lesson = apps.get_model('schedule', 'Lesson')
+
+    def duplicates(rows):
+        # Replaced ID -> kept ID
+        kept = {}
+        replaced = {}
+        for row_id, name in rows:
+            if name in kept:
+                replaced[row_id] = kept[name]
+            else:
+                kept[name] = row_id
+        return replaced
+
+    subjects = duplicates(Subject.objects.order_by('id').values_list('id', 'name'))
+    teachers = duplicates(
+        Teacher.objects.filter(sstu_id__isnull=True).order_by('id').values_list('id', 'full_name')
+    )
+    if not subjects and not teachers:
+        return
+
+    by_target = defaultdict(list)
+    for old_id, new_id in subjects.items():
+        by_target[new_id].append(old_id)
+    for new_id, old_ids in by_target.items():
+        Lesson.objects.filter(subject_id__in=old_ids).update(subject_id=new_id)
+    by_target = defaultdict(list)
+    for old_id, new_id in teachers.items():
+        by_target[new_id].append(old_id)
+    for new_id, old_ids in by_target.items():
+        Lesson.objects.filter(teacher_id__in=old_ids).update(teacher_id=new_id)
+
+    affected = set(
+        Lesson.objects.filter(subject_id__in=set(subjects.values())).values_list('group_id', flat=True)
+    ) | set(
+        Lesson.objects.filter(teacher_id__in=set(teachers.values())).values_list('group_id', flat=True)
+    )
+    duplicate_lessons = []
+    changed = []
+    for group_id in affected:
+        seen = set()
+        rows = Lesson.objects.filter(group_id=group_id).order_by('id').values_list(
+            'id', 'natural_key', 'specific_date', 'weekday', 'lesson_number', 'subject_id', 'teacher_id'
+        )
+        for lesson_id, natural_key, *parts in rows:
+            key = '|'.join('' if part is None else str(part) for part in parts)
+            if key in seen:
+                duplicate_lessons.append(lesson_id)
+                continue
+            seen.add(key)
+            if key != natural_key:
+                changed.append(Lesson(id=lesson_id, natural_key=key))
+    for start in range(0, len(duplicate_lessons), 500):
+        Lesson.objects.filter(id__in=duplicate_lessons[start:start + 500]).delete()
+    # Free the keys first: two lessons may swap keys
+    for lesson in changed:
+        Lesson.objects.filter(id=lesson.id).update(natural_key=f'#{lesson.id}')
+    Lesson.objects.bulk_update(changed, ['natural_key'], batch_size=500)
+
+    Subject.objects.filter(id__in=list(subjects)).delete()
+    Teacher.objects.filter(id__in=list(teachers)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0009_checkpointed_sync'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Separate from the data migration: PostgreSQL does not alter a table
+    # with pending trigger events in the same transaction
+    dependencies = [
+        ('schedule', '0010_merge_duplicate_dimensions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='subject',
+            name='name',
+            field=models.CharField(max_length=300, unique=True, verbose_name='Название предмета'),
+        ),
+        migrations.AddConstraint(
+            model_name='teacher',
+            constraint=models.UniqueConstraint(condition=models.Q(('sstu_id__isnull', True)), fields=('full_name',), name='schedule_teacher_unique_name_without_id'),
+        ),
+    ]
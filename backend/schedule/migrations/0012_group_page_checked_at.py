@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0011_unique_dimension_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='page_checked_at',
+            field=models.DateTimeField(blank=True, help_text='Последняя загрузка собственной страницы группы (не страниц преподавателей)', null=True, verbose_name='Страница группы проверена'),
+        ),
+    ]
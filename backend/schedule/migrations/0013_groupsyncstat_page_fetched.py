@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def fill_synced_at(apps, schema_editor):
+    """Existing rows get the start time of their update."""
+    GroupSyncStat = apps.get_model('schedule', 'GroupSyncStat')
+    ScheduleUpdate = apps.get_model('schedule', 'ScheduleUpdate')
+    GroupSyncStat.objects.update(
+        synced_at=Subquery(ScheduleUpdate.objects.filter(pk=OuterRef('update_id')).values('started_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0012_group_page_checked_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupsyncstat',
+            name='page_fetched',
+            field=models.BooleanField(default=False, help_text='Загружена собственная страница группы (не страницы преподавателей, не кэш и не архив)', verbose_name='Страница загружена'),
+        ),
+        migrations.AddField(
+            model_name='groupsyncstat',
+            name='synced_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Время синхронизации'),
+        ),
+        migrations.RunPython(fill_synced_at, migrations.RunPython.noop),
+    ]
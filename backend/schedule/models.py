@@ -1,9 +1,16 @@
 """
 Schedule models for storing parsed schedule data from SSTU website.
 """
+from datetime import date, timedelta
+from typing import Optional
 from django.db import models
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.core.validators import MinLengthValidator
+from django.utils import timezone
+from .semester import Semester, parse_semester_start
 
 User = get_user_model()
 
@@ -91,6 +98,49 @@ class Group(models.Model):
         blank=True,
         verbose_name='Курс'
     )
+    schedule_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Хэш расписания',
+        help_text='SHA-256 последнего записанного набора занятий'
+    )
+    last_synced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Последняя синхронизация'
+    )
+    page_checked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Страница группы проверена',
+        help_text='Последняя загрузка собственной страницы группы (не страниц преподавателей)'
+    )
+    # Adaptive sync scheduling (schedule/sync_scheduler.py)
+    change_rate = models.FloatField(
+        default=0.5,
+        verbose_name='Частота изменений',
+        help_text='Сглаженная доля синхронизаций, изменивших расписание (0-1)'
+    )
+    request_count = models.IntegerField(
+        default=0,
+        verbose_name='Запросы расписания',
+        help_text='Запросы к API с момента последнего пересчёта приоритетов'
+    )
+    request_rate = models.FloatField(
+        default=0,
+        verbose_name='Запросов в час',
+        help_text='Сглаженное число запросов расписания группы в час'
+    )
+    sync_priority = models.FloatField(
+        default=0,
+        verbose_name='Приоритет синхронизации'
+    )
+    next_sync_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name='Следующая синхронизация'
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата создания'
@@ -147,6 +197,14 @@ class Teacher(models.Model):
         indexes = [
             models.Index(fields=['sstu_id']),
         ]
+        constraints = [
+            # Teachers without SSTU ID are matched by name
+            models.UniqueConstraint(
+                fields=['full_name'],
+                condition=models.Q(sstu_id__isnull=True),
+                name='schedule_teacher_unique_name_without_id',
+            ),
+        ]
     
     def __str__(self):
         return self.full_name
@@ -157,6 +215,7 @@ class Subject(models.Model):
     
     name = models.CharField(
         max_length=300,
+        unique=True,
         verbose_name='Название предмета'
     )
     created_at = models.DateTimeField(
@@ -259,6 +318,12 @@ class Lesson(models.Model):
         blank=True,
         verbose_name='Дополнительная информация'
     )
+    natural_key = models.CharField(
+        max_length=64,
+        editable=False,
+        verbose_name='Естественный ключ',
+        help_text='Дата|день недели|номер пары|предмет|преподаватель, уникален в группе'
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата создания'
@@ -278,9 +343,26 @@ class Lesson(models.Model):
             models.Index(fields=['specific_date']),
             models.Index(fields=['week_number', 'weekday']),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'natural_key'], name='schedule_lesson_natural_key'),
+        ]
     
     def __str__(self):
         return f"{self.group.name} - {self.subject.name} ({self.get_weekday_display()}, пара {self.lesson_number})"
+    
+    @staticmethod
+    def build_natural_key(specific_date, weekday, lesson_number, subject_id, teacher_id) -> str:
+        """Natural key of a lesson within its group (NULL date/teacher as empty parts)."""
+        return '|'.join(
+            '' if part is None else str(part)
+            for part in (specific_date, weekday, lesson_number, subject_id, teacher_id)
+        )
+    
+    def save(self, *args, **kwargs):
+        self.natural_key = self.build_natural_key(
+            self.specific_date, self.weekday, self.lesson_number, self.subject_id, self.teacher_id
+        )
+        super().save(*args, **kwargs)
 
 
 class ScheduleUpdate(models.Model):
@@ -310,6 +392,10 @@ class ScheduleUpdate(models.Model):
         default=0,
         verbose_name='Обновлено групп'
     )
+    groups_skipped = models.IntegerField(
+        default=0,
+        verbose_name='Пропущено групп (расписание не изменилось)'
+    )
     lessons_added = models.IntegerField(
         default=0,
         verbose_name='Добавлено занятий'
@@ -322,6 +408,33 @@ class ScheduleUpdate(models.Model):
         blank=True,
         verbose_name='Сообщение об ошибке'
     )
+    phase_timings = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Время по этапам',
+        help_text='{"этап": {"wall": секунды, "cpu": секунды}}: index, teacher_pages, groups, fetch, parse, db'
+    )
+    bytes_fetched = models.BigIntegerField(
+        default=0,
+        verbose_name='Загружено байт'
+    )
+    # Checkpoint: planned groups, progress is kept in group_stats
+    group_ids = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Группы обновления',
+        help_text='SSTU ID групп, которые синхронизирует это обновление (пусто - главная страница ещё не разобрана)'
+    )
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Последняя контрольная точка'
+    )
+    attempts = models.IntegerField(
+        default=1,
+        verbose_name='Запусков',
+        help_text='Больше 1, если прерванное обновление возобновлялось'
+    )
     
     class Meta:
         verbose_name = 'Обновление расписания'
@@ -330,4 +443,249 @@ class ScheduleUpdate(models.Model):
     
     def __str__(self):
         return f"Обновление от {self.started_at.strftime('%Y-%m-%d %H:%M')} - {self.get_status_display()}"
+    
+    @staticmethod
+    def stale_before():
+        """In-progress updates without a checkpoint since this time are considered interrupted."""
+        return timezone.now() - timedelta(minutes=getattr(settings, 'SSTU_SCHEDULE_STALE_MINUTES', 15))
+    
+    @classmethod
+    def running(cls):
+        """In-progress updates that are still alive."""
+        return cls.objects.filter(status=cls.Status.IN_PROGRESS).filter(
+            models.Q(heartbeat_at__gte=cls.stale_before()) |
+            models.Q(heartbeat_at__isnull=True, started_at__gte=cls.stale_before())
+        )
+    
+    @classmethod
+    def interrupted(cls):
+        """In-progress updates whose worker stopped (crash, restart, time limit), oldest first."""
+        return cls.objects.filter(status=cls.Status.IN_PROGRESS).exclude(
+            pk__in=cls.running().values('pk')
+        ).order_by('started_at')
+    
+    def remaining_group_ids(self):
+        """Planned groups (SSTU IDs) without a successful result in this update yet."""
+        done = set(
+            self.group_stats.exclude(outcome=GroupSyncStat.Outcome.FAILED).values_list('group__sstu_id', flat=True)
+        )
+        return [group_id for group_id in self.group_ids if group_id not in done]
 
+
+class GroupSyncStat(models.Model):
+    """Timings and outcome of one group in a schedule update."""
+    
+    class Outcome(models.TextChoices):
+        UPDATED = 'updated', 'Обновлено'
+        SKIPPED = 'skipped', 'Расписание не изменилось'
+        UNCHANGED = 'unchanged', 'Страница не изменилась'
+        EMPTY = 'empty', 'Нет занятий'
+        FAILED = 'failed', 'Ошибка'
+    
+    update = models.ForeignKey(
+        ScheduleUpdate,
+        on_delete=models.CASCADE,
+        related_name='group_stats',
+        verbose_name='Обновление расписания'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='sync_stats',
+        verbose_name='Группа'
+    )
+    fetch_ms = models.IntegerField(
+        default=0,
+        verbose_name='Загрузка, мс'
+    )
+    parse_ms = models.IntegerField(
+        default=0,
+        verbose_name='Разбор (CPU), мс'
+    )
+    db_ms = models.IntegerField(
+        default=0,
+        verbose_name='Запись в БД, мс'
+    )
+    lessons = models.IntegerField(
+        default=0,
+        verbose_name='Занятий'
+    )
+    outcome = models.CharField(
+        max_length=10,
+        choices=Outcome.choices,
+        verbose_name='Результат'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка'
+    )
+    page_fetched = models.BooleanField(
+        default=False,
+        verbose_name='Страница загружена',
+        help_text='Загружена собственная страница группы (не страницы преподавателей, не кэш и не архив)'
+    )
+    synced_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Время синхронизации'
+    )
+    
+    class Meta:
+        verbose_name = 'Синхронизация группы'
+        verbose_name_plural = 'Синхронизация групп'
+        ordering = ['id']
+    
+    @property
+    def total_ms(self) -> int:
+        return self.fetch_ms + self.parse_ms + self.db_ms
+    
+    def __str__(self):
+        return f"{self.group.name}: {self.get_outcome_display()} ({self.total_ms} мс)"
+
+
+class LessonChange(models.Model):
+    """Added, removed or modified lesson: delta feed for clients."""
+    
+    class Action(models.TextChoices):
+        ADDED = 'added', 'Добавлено'
+        REMOVED = 'removed', 'Удалено'
+        MODIFIED = 'modified', 'Изменено'
+    
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='lesson_changes',
+        verbose_name='Группа'
+    )
+    update = models.ForeignKey(
+        ScheduleUpdate,
+        on_delete=models.SET_NULL,
+        related_name='lesson_changes',
+        null=True,
+        blank=True,
+        verbose_name='Обновление расписания',
+        help_text='Пусто для импорта от клиента'
+    )
+    # Not a foreign key: removed lessons no longer exist
+    lesson_id = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name='ID занятия'
+    )
+    natural_key = models.CharField(
+        max_length=64,
+        verbose_name='Естественный ключ занятия'
+    )
+    action = models.CharField(
+        max_length=10,
+        choices=Action.choices,
+        verbose_name='Изменение'
+    )
+    changed_fields = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Изменённые поля',
+        help_text='{"поле": [старое, новое]} для изменённых занятий'
+    )
+    data = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Занятие',
+        help_text='Поля занятия после изменения (для удалённых - последние сохранённые)'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Время изменения'
+    )
+    
+    class Meta:
+        verbose_name = 'Изменение занятия'
+        verbose_name_plural = 'Изменения занятий'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['group', 'id']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.group.name}: {self.get_action_display()} {self.natural_key}"
+
+
+class SemesterCalendar(models.Model):
+    """Semester dates: year of day headers and week numbers of lessons."""
+    
+    CACHE_KEY = 'schedule:current_semester'
+    CACHE_TIMEOUT = 5 * 60
+    
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Название'
+    )
+    start_date = models.DateField(
+        unique=True,
+        verbose_name='Начало семестра',
+        help_text='Понедельник первой учебной недели'
+    )
+    end_date = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Окончание семестра'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата обновления'
+    )
+    
+    class Meta:
+        verbose_name = 'Семестр'
+        verbose_name_plural = 'Семестры'
+        ordering = ['-start_date']
+    
+    def __str__(self):
+        return self.name
+    
+    def clean(self):
+        try:
+            self.to_semester()
+        except ValueError as e:
+            raise ValidationError(str(e))
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(self.CACHE_KEY)
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        cache.delete(self.CACHE_KEY)
+        return result
+    
+    def to_semester(self) -> Semester:
+        return Semester(self.start_date, self.end_date)
+    
+    @classmethod
+    def current(cls, today: date = None) -> Optional[Semester]:
+        """
+        Semester containing ``today`` (or the latest started before it).
+        Without rows falls back to SSTU_SEMESTER_START; None if neither is set.
+        Cached for a few minutes.
+        """
+        today = today or date.today()
+        cached = cache.get(cls.CACHE_KEY)
+        if cached and cached[0] == today:
+            return cached[1]
+        
+        calendar = cls.objects.filter(start_date__lte=today).order_by('-start_date').first()
+        if calendar is None:
+            calendar = cls.objects.order_by('start_date').first()
+        if calendar is not None:
+            semester = calendar.to_semester()
+        else:
+            start = parse_semester_start(getattr(settings, 'SSTU_SEMESTER_START', None))
+            semester = Semester(start) if start else None
+        
+        cache.set(cls.CACHE_KEY, (today, semester), cls.CACHE_TIMEOUT)
+        return semester
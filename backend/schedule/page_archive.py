@@ -0,0 +1,171 @@
+"""
+Content-addressed archive of raw rasp.sstu.ru page bodies.
+
+Layout of the archive directory:
+
+- ``objects/ab/<sha256>.html.gz`` - gzip-compressed raw body, stored once
+  however many times and under however many URLs it was fetched
+- ``index.jsonl`` - one line per fetch: URL, snapshot, fetch time, body
+  hash and encoding
+
+A snapshot is one sync run; a ScheduleUpdate split into several tasks
+writes into one snapshot named after it. Replaying a snapshot serves every URL from the
+latest body archived in that run or before it, so pages skipped as
+unchanged (304) are still available. Django-free.
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .page_cache import body_hash
+
+logger = logging.getLogger(__name__)
+
+LATEST_SNAPSHOT = 'latest'
+
+
+def new_snapshot_id() -> str:
+    """Snapshot ID for a run started now (sortable)."""
+    return datetime.now().strftime('%Y%m%dT%H%M%S')
+
+
+def update_snapshot_id(update_id: int, started_at: datetime) -> str:
+    """Snapshot ID shared by all tasks of ScheduleUpdate ``update_id`` (sorts with new_snapshot_id)."""
+    return f"{started_at.astimezone():%Y%m%dT%H%M%S}-update-{update_id}"
+
+
+class PageArchive:
+    """Writes fetched page bodies into the archive."""
+
+    def __init__(self, directory, snapshot: Optional[str] = None):
+        self.directory = Path(directory)
+        self.objects_dir = self.directory / 'objects'
+        self.index_path = self.directory / 'index.jsonl'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshot = snapshot or new_snapshot_id()
+        self._lock = threading.Lock()
+        self.stats = {
+            'pages': 0,
+            'objects_written': 0,
+            'bytes_written': 0,
+        }
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f'{digest}.html.gz'
+
+    def store(self, url: str, content, encoding: str = 'utf-8') -> str:
+        """Archive raw page body fetched from URL, return its hash."""
+        digest = body_hash(content)
+        path = self._object_path(digest)
+        written = 0
+        try:
+            if not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+                with gzip.open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+                written = path.stat().st_size
+
+            entry = {
+                'url': url,
+                'snapshot': self.snapshot,
+                'fetched_at': time.time(),
+                'sha256': digest,
+                'encoding': encoding,
+            }
+            with self._lock:
+                with open(self.index_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + '\n')
+                self.stats['pages'] += 1
+                if written:
+                    self.stats['objects_written'] += 1
+                    self.stats['bytes_written'] += written
+        except OSError as e:
+            logger.warning(f"Could not archive page {url}: {e}")
+        return digest
+
+
+def _read_index(directory: Path) -> List[Dict]:
+    entries = []
+    try:
+        with open(directory / 'index.jsonl', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Truncated line from an interrupted run
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def list_snapshots(directory) -> List[str]:
+    """Snapshot IDs present in archive, oldest first."""
+    return sorted({entry['snapshot'] for entry in _read_index(Path(directory))})
+
+
+class ArchiveSnapshot:
+    """Read-only view of the archive as of one snapshot."""
+
+    def __init__(self, directory, snapshot: Optional[str] = LATEST_SNAPSHOT):
+        self.directory = Path(directory)
+        entries = _read_index(self.directory)
+        if not entries:
+            raise ValueError(f"Page archive {self.directory} is empty")
+
+        snapshots = sorted({entry['snapshot'] for entry in entries})
+        if not snapshot or snapshot == LATEST_SNAPSHOT:
+            snapshot = snapshots[-1]
+        elif snapshot not in snapshots:
+            raise ValueError(f"Snapshot {snapshot} not found in {self.directory}, available: {', '.join(snapshots)}")
+        self.snapshot = snapshot
+
+        # Latest body of every URL archived in this snapshot or earlier
+        self._entries: Dict[str, Dict] = {}
+        for entry in sorted(entries, key=lambda item: (item['snapshot'], item['fetched_at'])):
+            if entry['snapshot'] <= snapshot:
+                self._entries[entry['url']] = entry
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _record(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    @property
+    def urls(self) -> List[str]:
+        return list(self._entries)
+
+    def get_text(self, url: str) -> Optional[str]:
+        """Decoded page body archived for URL, None if URL was never archived."""
+        entry = self._entries.get(url)
+        if entry is None:
+            self._record('misses')
+            logger.warning(f"Page {url} is not in archive snapshot {self.snapshot}")
+            return None
+
+        path = self.directory / 'objects' / entry['sha256'][:2] / f"{entry['sha256']}.html.gz"
+        try:
+            with gzip.open(path, 'rb') as f:
+                content = f.read()
+        except OSError as e:
+            self._record('misses')
+            logger.error(f"Could not read archived page {url}: {e}")
+            return None
+
+        self._record('hits')
+        try:
+            return str(content, entry.get('encoding') or 'utf-8', 'ignore')
+        except LookupError:
+            return str(content, 'utf-8', 'ignore')
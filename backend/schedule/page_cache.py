@@ -0,0 +1,145 @@
+"""
+Persistent cache of page validators for rasp.sstu.ru fetches.
+
+For every URL the cache keeps ETag / Last-Modified and a hash of the last
+body seen, so the next fetch can be a conditional request and an identical
+body can be recognised before it is parsed. Page bodies are not stored.
+
+Validators of a fetched page are only staged in memory; the caller commits
+them once the page's data is persisted (saved to the DB, uploaded), so a
+page whose data was lost is never reported unchanged on the next run.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def body_hash(content) -> str:
+    """Hash of raw page body (bytes, bytearray or memoryview)."""
+    return hashlib.sha256(content).hexdigest()
+
+
+class PageCache:
+    """On-disk cache of per-URL ETag, Last-Modified and body hash."""
+
+    def __init__(self, directory, max_age: Optional[int] = 24 * 60 * 60):
+        """
+        Args:
+            directory: Directory for cache entries (created if missing)
+            max_age: Seconds after which an entry is ignored and the page is
+                re-fetched unconditionally. None means entries never expire.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # url -> (body hash, ETag, Last-Modified) fetched but not yet committed
+        self._pending: Dict[str, Tuple[str, Optional[str], Optional[str]]] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'not_modified': 0,
+        }
+
+    def _entry_path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Get fresh cache entry for URL."""
+        try:
+            with open(self._entry_path(url), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('url') != url:
+            return None
+        if self.max_age is not None and time.time() - entry.get('stored_at', 0) > self.max_age:
+            return None
+        return entry
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for URL."""
+        entry = self.get(url)
+        if not entry:
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_unchanged(self, url: str, digest: str) -> bool:
+        """Check whether body hash matches the cached one."""
+        entry = self.get(url)
+        return bool(entry) and entry.get('body_hash') == digest
+
+    def store(self, url: str, digest: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Save validators and body hash for URL."""
+        entry = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'body_hash': digest,
+            'stored_at': time.time(),
+        }
+        path = self._entry_path(url)
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write page cache entry for {url}: {e}")
+
+    def stage(self, url: str, digest: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Remember validators of a fetched body until commit(url)."""
+        with self._lock:
+            self._pending[url] = (digest, etag, last_modified)
+
+    def commit(self, url: str):
+        """Save staged validators of URL after its data was persisted."""
+        with self._lock:
+            pending = self._pending.pop(url, None)
+        if pending:
+            self.store(url, *pending)
+
+    def confirm(self, url: str, digest: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        Save validators of a body equal to the stored one: its data is
+        already persisted, so nothing is staged and the entry age is reset.
+        """
+        with self._lock:
+            self._pending.pop(url, None)
+        self.store(url, digest, etag, last_modified)
+
+    def touch(self, url: str):
+        """Refresh entry age after the page was confirmed unchanged."""
+        entry = self.get(url)
+        if entry:
+            self.store(url, entry['body_hash'], entry.get('etag'), entry.get('last_modified'))
+
+    def invalidate(self, url: str):
+        """Drop cache entry so the next fetch is unconditional."""
+        with self._lock:
+            self._pending.pop(url, None)
+        try:
+            self._entry_path(url).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove page cache entry for {url}: {e}")
+
+    def record(self, key: str):
+        """Increment hit/miss counter (thread-safe)."""
+        with self._lock:
+            self.stats[key] += 1
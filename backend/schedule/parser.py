@@ -3,33 +3,156 @@ Parser for SSTU schedule website.
 """
 import re
 import logging
+import threading
+import time as time_module
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, time, date, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, NamedTuple
 import requests
 from bs4 import BeautifulSoup
 
-# Try to import SOCKS support
-try:
-    import socks
-    import socket
-    from urllib3.contrib.socks import SOCKSProxyManager
-    SOCKS_AVAILABLE = True
-except ImportError:
-    SOCKS_AVAILABLE = False
+from .html_backends import make_soup, resolve_backend
+from .page_archive import ArchiveSnapshot, PageArchive
+from .page_cache import PageCache, body_hash
+from .records import ParsedLesson
+from .semester import Semester, header_date_near
+from .transport import CircuitOpenError, ScheduleTransport
+from .worker_batch import BATCH_PATH, BatchProtocolError, encode_batch_request, iter_frames
 
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns of schedule pages
+WEEK_LESSON_RE = re.compile(r'w(\d+)n\d+')  # data-lesson="w03n1" -> week 3
+LESSON_NUMBER_RE = re.compile(r'n(\d+)')  # data-lesson="w03n1" -> lesson 1
+DAY_DATE_RE = re.compile(r'(\d{2})\.(\d{2})')  # "понедельник12.01"
+EXAM_WARNING_RE = re.compile(r'(.+?)\s*\((\d{2}\.\d{2}\.\d{4})\)')  # "Предмет (12.01.2026)"
+TEACHER_ID_RE = re.compile(r'teachers/(\d+)-')
+COURSE_RE = re.compile(r'-(\d)1$')
+GROUP_LABEL_RE = re.compile(r':\s*(.+)$')
+
+
+class ScheduleFetchError(Exception):
+    """Schedule page could not be fetched."""
+
+
+class PageTooLarge(ScheduleFetchError):
+    """Response body exceeds configured maximum size."""
+
+
+class PageUnchanged(Exception):
+    """Page is identical to the cached version (raised only for conditional fetches)."""
+
+
+class BatchPage(NamedTuple):
+    """Page fetched by fetch_pages_batch."""
+    
+    url: str
+    text: Optional[str]
+    error: Optional[Exception] = None
+    unchanged: bool = False  # page matches page cache
+
+
+class GroupParseResult(NamedTuple):
+    """Result of parsing one group in a batch."""
+    
+    index: int  # position of group in the requested list
+    group_id: int
+    lessons: List[ParsedLesson]
+    error: Optional[Exception] = None
+    unchanged: bool = False  # page matches page cache, lessons were not parsed
+    fetch_seconds: float = 0.0  # wall time fetching the page
+    parse_seconds: float = 0.0  # CPU time parsing it
+
+
+class TeacherParseResult(NamedTuple):
+    """Result of parsing one teacher in a batch."""
+    
+    index: int  # position of teacher in the requested list
+    teacher_id: int
+    lessons: List[Dict]
+    error: Optional[Exception] = None
+    unchanged: bool = False
+
+
+class DateWindow(NamedTuple):
+    """Range of days to parse (inclusive, open on a side set to None)."""
+    
+    start: Optional[date] = None
+    end: Optional[date] = None
+    
+    @classmethod
+    def from_past_days(cls, past_days: int, today: Optional[date] = None) -> 'DateWindow':
+        """Window from ``past_days`` days ago to the end of the semester."""
+        return cls(start=(today or date.today()) - timedelta(days=past_days))
+    
+    def contains(self, day: date) -> bool:
+        return (self.start is None or day >= self.start) and (self.end is None or day <= self.end)
+    
+    def overlaps(self, first: date, last: date) -> bool:
+        return (self.start is None or last >= self.start) and (self.end is None or first <= self.end)
+
 
 class SSTUScheduleParser:
     """Parser for rasp.sstu.ru schedule."""
     
     BASE_URL = "https://rasp.sstu.ru"
     
-    def __init__(self, timeout: int = 30, proxy: Optional[str] = None, cloudflare_worker_url: Optional[str] = None):
-        """Initialize parser with timeout, optional proxy, and optional Cloudflare Worker URL."""
+    def __init__(self, timeout: int = 30, proxy: Optional[str] = None, cloudflare_worker_url: Optional[str] = None,
+                 html_backend: Optional[str] = None, max_connections_per_host: int = 4,
+                 page_cache: Optional[PageCache] = None, max_body_size: int = 20 * 1024 * 1024,
+                 transport: Optional[ScheduleTransport] = None, archive: Optional[PageArchive] = None,
+                 replay: Optional[ArchiveSnapshot] = None, date_window: Optional[DateWindow] = None,
+                 semester: Optional[Semester] = None, worker_batch_size: int = 20):
+        """
+        Initialize parser with timeout, optional proxy, optional Cloudflare Worker URL and HTML backend.
+        
+        ``transport`` overrides connection pooling/retry/circuit breaker settings;
+        by default one is built from ``timeout`` and ``proxy``.
+        ``archive`` stores every fetched body; with ``replay`` pages are read
+        from an archive snapshot and no requests are made.
+        ``date_window`` limits parsed lessons to days inside it; weeks outside
+        the window are skipped without walking their lessons.
+        ``semester`` resolves years of day headers and week numbers (without
+        it years are taken nearest to today and week numbers from the page).
+        ``worker_batch_size`` pages are requested from the Cloudflare Worker
+        in one round-trip by fetch_pages_batch (1 - no batching).
+        """
         self.timeout = timeout
         self.proxy = proxy
         self.cloudflare_worker_url = cloudflare_worker_url
+        # 'lxml' / 'html.parser' / 'auto' (lxml if installed)
+        self.html_backend = resolve_backend(html_backend)
+        
+        # Cap of simultaneous requests to one host (rasp.sstu.ru or the Worker)
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_slots_lock = threading.Lock()
+        # Optional on-disk cache of ETag/Last-Modified/body hash per URL
+        self.page_cache = page_cache
+        # Raw page archive (write) and archived snapshot (offline read)
+        self.archive = archive
+        self.replay = replay
+        # Days outside the window are not parsed (None - whole calendar)
+        self.date_window = date_window
+        self.semester = semester
+        
+        # Responses larger than this are aborted while streaming
+        self.max_body_size = max_body_size
+        # Body reader instrumentation (see _read_body)
+        self.fetch_stats = {
+            'pages': 0,
+            'bytes_read': 0,
+            'bytes_copied': 0,
+            'buffer_bytes_allocated': 0,
+            'buffer_resizes': 0,
+            'peak_buffer': 0,
+            'aborted': 0,
+        }
+        self._fetch_stats_lock = threading.Lock()
+        
+        # Errors of the last parse_many_groups run, in input order
+        self.last_batch_errors: List[Tuple[int, Exception]] = []
         
         # If Cloudflare Worker URL is provided, store it for routing requests
         if self.cloudflare_worker_url:
@@ -37,6 +160,7 @@ class SSTUScheduleParser:
             self._worker_base = worker_url
         else:
             self._worker_base = None
+        self.worker_batch_size = max(1, worker_batch_size)
         
         # Keep original BASE_URL for constructing target URLs
         self.BASE_URL = "https://rasp.sstu.ru"
@@ -45,7 +169,7 @@ class SSTUScheduleParser:
         self.TEACHER_PAGE = f"{self.BASE_URL}/rasp/teacher/"
         
         # Setup session
-        self._setup_session()
+        self._setup_session(transport)
     
     # Время пар
     LESSON_TIMES = {
@@ -82,83 +206,175 @@ class SSTUScheduleParser:
         'воскресенье': 7,
     }
     
-    def _setup_session(self):
-        """Setup requests session with proxy if needed."""
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        if self.proxy:
-            # Support both HTTP and SOCKS5 proxies
-            if self.proxy.startswith('socks5://') or self.proxy.startswith('socks4://'):
-                # SOCKS proxy - requires PySocks package
-                if not SOCKS_AVAILABLE:
-                    logger.error("SOCKS proxy requires 'PySocks' package. Install with: pip install PySocks")
-                    raise ImportError("PySocks is required for SOCKS proxy support")
-                
-                # requests automatically detects SOCKS proxy format when PySocks is installed
-                # Just set it in proxies dict
-                self.session.proxies = {
-                    'http': self.proxy,
-                    'https': self.proxy
-                }
-                logger.info(f"Using SOCKS proxy: {self.proxy}")
-            else:
-                # HTTP proxy
-                self.session.proxies = {
-                    'http': self.proxy,
-                    'https': self.proxy
-                }
-                logger.info(f"Using HTTP proxy: {self.proxy}")
+    def _setup_session(self, transport: Optional[ScheduleTransport] = None):
+        """Setup pooled HTTP transport (with proxy if needed)."""
+        self.transport = transport or ScheduleTransport(
+            timeout=self.timeout,
+            proxy=self.proxy,
+            pool_size=max(10, self.max_connections_per_host),
+        )
+        self.session = self.transport.session
+    
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """Get semaphore limiting concurrent requests to URL's host."""
+        host = urllib.parse.urlsplit(url).netloc
+        with self._host_slots_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_connections_per_host)
+                self._host_slots[host] = slot
+        return slot
     
-    def fetch_page(self, url: str, retries: int = 3) -> Optional[BeautifulSoup]:
+    def _record_fetch(self, **values):
+        """Add body reader counters (thread-safe)."""
+        with self._fetch_stats_lock:
+            for key, value in values.items():
+                if key == 'peak_buffer':
+                    self.fetch_stats[key] = max(self.fetch_stats[key], value)
+                else:
+                    self.fetch_stats[key] += value
+    
+    READ_CHUNK_SIZE = 64 * 1024
+    
+    def _read_body(self, response: requests.Response) -> memoryview:
+        """
+        Read streamed response body into one preallocated buffer.
+        
+        Each chunk is copied exactly once into the buffer (sized from
+        Content-Length when present, doubled when exceeded), so reading is
+        linear in body size. Aborts with PageTooLarge as soon as the body
+        exceeds ``max_body_size``. Returns a view of the filled part.
+        """
+        limit = self.max_body_size
+        declared = response.headers.get('Content-Length')
+        try:
+            declared = int(declared) if declared else None
+        except ValueError:
+            declared = None
+        
+        if limit and declared and declared > limit:
+            response.close()
+            self._record_fetch(aborted=1)
+            raise PageTooLarge(f"Response is {declared} bytes, limit is {limit}")
+        
+        capacity = declared or self.READ_CHUNK_SIZE * 4
+        buffer = bytearray(capacity)
+        view = memoryview(buffer)
+        allocated = capacity
+        copied = 0
+        resizes = 0
+        size = 0
+        
+        for chunk in response.iter_content(chunk_size=self.READ_CHUNK_SIZE):
+            if not chunk:
+                continue
+            end = size + len(chunk)
+            if limit and end > limit:
+                response.close()
+                self._record_fetch(aborted=1, bytes_read=size)
+                raise PageTooLarge(f"Response exceeds limit of {limit} bytes")
+            if end > capacity:
+                # Grow geometrically: amortized O(1) copies per byte
+                while capacity < end:
+                    capacity *= 2
+                grown = bytearray(capacity)
+                grown[:size] = view[:size]
+                view.release()
+                buffer = grown
+                view = memoryview(buffer)
+                allocated += capacity
+                copied += size
+                resizes += 1
+            view[size:end] = chunk
+            copied += len(chunk)
+            size = end
+        
+        self._record_fetch(
+            pages=1,
+            bytes_read=size,
+            bytes_copied=copied,
+            buffer_bytes_allocated=allocated,
+            buffer_resizes=resizes,
+            peak_buffer=capacity,
+        )
+        return view[:size]
+    
+    def make_soup(self, text: str) -> BeautifulSoup:
+        """Build page tree with configured HTML backend."""
+        return make_soup(text, self.html_backend)
+    
+    def fetch_page(self, url: str, retries: Optional[int] = None) -> Optional[BeautifulSoup]:
         """Fetch and parse page with retry logic."""
+        text = self.fetch_html(url, retries=retries)
+        if text is None:
+            return None
+        return self.make_soup(text)
+    
+    def fetch_html(self, url: str, retries: Optional[int] = None, conditional: bool = False) -> Optional[str]:
+        """
+        Fetch page text with retry logic.
+        
+        Network errors and 429/5xx answers are retried ``retries`` times
+        (default: the transport's) with backoff; this is the only retry
+        layer, the transport session does not retry by itself.
+        With ``conditional=True`` and a page cache configured, sends
+        If-None-Match / If-Modified-Since and raises PageUnchanged when the
+        server answers 304 or the body hash matches the cached one.
+        In replay mode the archived body is returned without network I/O.
+        """
+        if self.replay is not None:
+            return self.replay.get_text(url)
+        
         # If Cloudflare Worker URL is provided, route through it
         if self._worker_base:
             # Construct worker URL with target URL as parameter (URL encode the target)
-            import urllib.parse
             encoded_url = urllib.parse.quote(url, safe='')
             worker_url = f"{self._worker_base}?url={encoded_url}"
             fetch_url = worker_url
         else:
             fetch_url = url
         
-        for attempt in range(retries):
+        host_slot = self._host_slot(fetch_url)
+        cache = self.page_cache
+        headers = cache.conditional_headers(url) if cache and conditional else {}
+        attempts = (self.transport.retries if retries is None else retries) + 1
+        
+        for attempt in range(attempts):
             try:
-                # Use stream=True for large responses and increase timeout
-                response = self.session.get(fetch_url, timeout=self.timeout, stream=True)
-                response.raise_for_status()
-                
-                # Read response in chunks to avoid timeout on large responses
-                content = b''
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        content += chunk
-                
-                # Decode content - определяем кодировку вручную или используем указанную
-                # Проверяем Content-Type заголовок для кодировки
-                encoding = 'utf-8'  # По умолчанию
-                if response.headers.get('Content-Type'):
-                    content_type = response.headers['Content-Type'].lower()
-                    if 'charset=' in content_type:
-                        encoding = content_type.split('charset=')[1].split(';')[0].strip()
-                
-                # Пробуем декодировать
-                try:
-                    text = content.decode(encoding, errors='ignore')
-                except (UnicodeDecodeError, LookupError):
-                    # Если не получилось, пробуем utf-8
-                    text = content.decode('utf-8', errors='ignore')
+                with host_slot:
+                    # Use stream=True for large responses and increase timeout
+                    response = self.transport.get(fetch_url, stream=True, headers=headers)
+                    if response.status_code == 304 and cache:
+                        response.close()
+                        self._not_modified(url)
+                    response.raise_for_status()
+                    
+                    # Read response in chunks to avoid timeout on large responses
+                    try:
+                        content = self._read_body(response)
+                    except requests.RequestException as e:
+                        self.transport.report_failure(fetch_url, timed_out=isinstance(e, requests.Timeout))
+                        raise
                 
-                return BeautifulSoup(text, 'html.parser')
+                return self._accept_body(url, content, response.headers, conditional)
+            except PageTooLarge as e:
+                # Retrying won't make the page smaller
+                logger.error(f"Aborted fetching {fetch_url}: {e}")
+                return None
+            except CircuitOpenError as e:
+                # Origin is considered down: fail fast instead of hammering it
+                logger.warning(f"Skipping {fetch_url}: {e}")
+                return None
             except requests.Timeout as e:
-                logger.warning(f"Timeout fetching {fetch_url} (attempt {attempt + 1}/{retries}): {e}")
-                if attempt < retries - 1:
+                logger.warning(f"Timeout fetching {fetch_url} (attempt {attempt + 1}/{attempts}): {e}")
+                if attempt < attempts - 1:
+                    time_module.sleep(self.transport.backoff_delay(attempt))
                     continue
-                logger.error(f"Failed to fetch {fetch_url} after {retries} attempts")
+                logger.error(f"Failed to fetch {fetch_url} after {attempts} attempts")
             except requests.RequestException as e:
-                logger.error(f"Error fetching {fetch_url} (attempt {attempt + 1}/{retries}): {e}")
-                if attempt < retries - 1:
+                logger.error(f"Error fetching {fetch_url} (attempt {attempt + 1}/{attempts}): {e}")
+                if attempt < attempts - 1 and self.transport.retryable(e):
+                    time_module.sleep(self.transport.backoff_delay(attempt, e))
                     continue
                 if self.proxy:
                     logger.warning(f"Using proxy: {self.proxy}")
@@ -167,12 +383,163 @@ class SSTUScheduleParser:
             return None
         return None
     
+    def _not_modified(self, url: str):
+        """Record 304 answer for URL in page cache and raise PageUnchanged."""
+        cache = self.page_cache
+        cache.record('hits')
+        cache.record('not_modified')
+        cache.touch(url)
+        raise PageUnchanged(url)
+    
+    def _accept_body(self, url: str, content, headers, conditional: bool) -> str:
+        """
+        Archive fetched body, compare it with page cache and decode it.
+        Raises PageUnchanged if a conditional fetch got the cached body again.
+        """
+        # Decode content - определяем кодировку вручную или используем указанную
+        # Проверяем Content-Type заголовок для кодировки
+        encoding = 'utf-8'  # По умолчанию
+        if headers.get('Content-Type'):
+            content_type = headers['Content-Type'].lower()
+            if 'charset=' in content_type:
+                encoding = content_type.split('charset=')[1].split(';')[0].strip()
+        
+        if self.archive:
+            self.archive.store(url, content, encoding)
+        
+        # Compare body with cached hash before decoding and parsing
+        cache = self.page_cache
+        if cache:
+            digest = body_hash(content)
+            unchanged = conditional and cache.is_unchanged(url, digest)
+            if conditional:
+                cache.record('hits' if unchanged else 'misses')
+            if unchanged:
+                cache.confirm(url, digest, headers.get('ETag'), headers.get('Last-Modified'))
+                raise PageUnchanged(url)
+            # Saved by commit_page() once the page's data is persisted
+            cache.stage(url, digest, headers.get('ETag'), headers.get('Last-Modified'))
+        
+        # Пробуем декодировать
+        try:
+            text = str(content, encoding, 'ignore')
+        except (UnicodeDecodeError, LookupError):
+            # Если не получилось, пробуем utf-8
+            text = str(content, 'utf-8', 'ignore')
+        
+        return text
+    
+    @property
+    def batch_fetch_enabled(self) -> bool:
+        """Pages are fetched through the Worker batch endpoint."""
+        return bool(self._worker_base) and self.replay is None and self.worker_batch_size > 1
+    
+    def _fetch_single_page(self, url: str, conditional: bool) -> BatchPage:
+        try:
+            text = self.fetch_html(url, conditional=conditional)
+        except PageUnchanged:
+            return BatchPage(url, None, unchanged=True)
+        if text is None:
+            return BatchPage(url, None, ScheduleFetchError(f"Failed to fetch {url}"))
+        return BatchPage(url, text)
+    
+    def fetch_pages_batch(self, urls: Iterable[str], conditional: bool = False,
+                          batch_size: Optional[int] = None, retries: Optional[int] = None) -> Iterator[BatchPage]:
+        """
+        Fetch many pages through the Cloudflare Worker batch endpoint.
+        
+        URLs are split into batches of ``batch_size`` (default
+        ``worker_batch_size``), one Worker round-trip each; pages are yielded
+        as their frames arrive. Pages the Worker failed to deliver are
+        fetched one by one with ``fetch_html``. Without a Worker (or in
+        replay mode) every page is fetched with ``fetch_html``.
+        """
+        urls = list(dict.fromkeys(urls))
+        batch_size = batch_size or self.worker_batch_size
+        if not self._worker_base or self.replay is not None or batch_size <= 1:
+            for url in urls:
+                yield self._fetch_single_page(url, conditional)
+            return
+        
+        for start in range(0, len(urls), batch_size):
+            yield from self._fetch_batch(urls[start:start + batch_size], conditional, retries)
+    
+    def _fetch_batch(self, urls: List[str], conditional: bool, retries: Optional[int]) -> Iterator[BatchPage]:
+        """Fetch one batch in a single Worker request."""
+        cache = self.page_cache
+        headers = {url: cache.conditional_headers(url) for url in urls} if cache and conditional else {}
+        batch_url = f"{self._worker_base}{BATCH_PATH}"
+        pending = dict.fromkeys(urls)
+        attempts = (self.transport.retries if retries is None else retries) + 1
+        
+        for attempt in range(attempts):
+            try:
+                with self._host_slot(batch_url):
+                    # Headers come before any page is fetched: the full timeout
+                    # applies between frames, and the latency is not sampled
+                    response = self.transport.post(
+                        batch_url, json=encode_batch_request(pending, headers), stream=True,
+                        timeout=(self.transport.timeouts.connect_timeout, self.timeout), sample_latency=False,
+                    )
+                    response.raise_for_status()
+                    for meta, body in iter_frames(response.iter_content(chunk_size=self.READ_CHUNK_SIZE)):
+                        url = meta.get('url')
+                        if url not in pending:
+                            continue
+                        page = self._batch_frame_page(url, meta, body, conditional)
+                        if page is not None:
+                            del pending[url]
+                            yield page
+                break
+            except CircuitOpenError as e:
+                logger.warning(f"Skipping batch of {len(pending)} pages: {e}")
+                break
+            except (requests.RequestException, BatchProtocolError) as e:
+                logger.warning(f"Batch of {len(pending)} pages failed (attempt {attempt + 1}/{attempts}): {e}")
+                if isinstance(e, requests.RequestException) and not self.transport.retryable(e):
+                    # e.g. 404 from a Worker without the batch endpoint
+                    break
+                if attempt < attempts - 1:
+                    time_module.sleep(self.transport.backoff_delay(attempt, e))
+        
+        if pending:
+            logger.warning(f"Worker did not deliver {len(pending)} of {len(urls)} pages, fetching them one by one")
+            for url in pending:
+                yield self._fetch_single_page(url, conditional)
+    
+    def _batch_frame_page(self, url: str, meta: Dict, body: bytes, conditional: bool) -> Optional[BatchPage]:
+        """Page of one batch frame, None if it should be fetched again on its own."""
+        status = meta.get('status') or 0
+        headers = requests.structures.CaseInsensitiveDict(meta.get('headers') or {})
+        if status == 0 or status >= 500 or status == 429:
+            logger.debug(f"Worker could not fetch {url}: {meta.get('error') or status}")
+            return None
+        try:
+            if status == 304 and self.page_cache:
+                self._not_modified(url)
+            if status != 200:
+                return BatchPage(url, None, ScheduleFetchError(f"HTTP {status} for {url}"))
+            if self.max_body_size and len(body) > self.max_body_size:
+                self._record_fetch(aborted=1)
+                return BatchPage(url, None, PageTooLarge(f"Response is {len(body)} bytes, limit is {self.max_body_size}"))
+            self._record_fetch(pages=1, bytes_read=len(body))
+            return BatchPage(url, self._accept_body(url, body, headers, conditional))
+        except PageUnchanged:
+            return BatchPage(url, None, unchanged=True)
+    
     def parse_main_page(self) -> List[Dict]:
         """Parse main page to get all institutes and groups."""
         soup = self.fetch_page(self.MAIN_PAGE)
         if not soup:
             return []
-        
+        return self.parse_main_soup(soup)
+    
+    def parse_main_html(self, html: str) -> List[Dict]:
+        """Parse institutes and groups from main page text."""
+        return self.parse_main_soup(self.make_soup(html))
+    
+    def parse_main_soup(self, soup: BeautifulSoup) -> List[Dict]:
+        """Parse institutes and groups from main page tree."""
         institutes_data = []
         accordion = soup.find('div', {'id': 'raspStructure'})
         if not accordion:
@@ -224,20 +591,23 @@ class SSTUScheduleParser:
             logger.error(f"Error parsing institute card: {e}")
             return None
     
+    # Classes of main page elements that matter for group list
+    GROUP_MARKER_CLASSES = ['edu-form', 'group-type', 'groups']
+    
     def _parse_groups_from_body(self, body) -> List[Dict]:
         """Parse groups from institute card body."""
-        groups = []
+        # Name-keyed index: keeps first occurrence and page order
+        groups: Dict[str, Dict] = {}
         
         current_edu_form = 'full_time'  # default
         current_degree = 'bachelor'  # default
         
-        # Use descendants to get all elements in document order
-        for element in body.descendants:
-            if not hasattr(element, 'get'):
-                continue
+        # Only marker elements, in document order
+        for element in body.find_all(class_=self.GROUP_MARKER_CLASSES):
+            classes = element.get('class', [])
             
             # Check for education form
-            if element.has_attr('class') and 'edu-form' in element.get('class', []):
+            if 'edu-form' in classes:
                 form_text = element.get_text(strip=True).lower()
                 # Be more precise with detection
                 if 'очно-заочн' in form_text or 'заочн' in form_text and 'сокращ' in form_text:
@@ -248,7 +618,7 @@ class SSTUScheduleParser:
                     current_edu_form = 'full_time'
             
             # Check for degree type
-            if element.has_attr('class') and 'group-type' in element.get('class', []):
+            if 'group-type' in classes:
                 degree_text = element.get_text(strip=True).lower()
                 if 'бакалавриат' in degree_text:
                     current_degree = 'bachelor'
@@ -260,14 +630,14 @@ class SSTUScheduleParser:
                     current_degree = 'postgraduate'
             
             # Parse groups - look for div.groups class
-            if element.has_attr('class') and 'groups' in element.get('class', []):
+            if 'groups' in classes:
                 # Find all group links within this groups div
-                group_links = element.find_all('a')
-                for link in group_links:
+                for link in element.find_all('a'):
                     group_name = link.get_text(strip=True)
-                    if not group_name:  # Skip empty links
+                    # Skip empty links and duplicates
+                    if not group_name or group_name in groups:
                         continue
-                        
+                    
                     group_url = link.get('href', '')
                     
                     # Extract group ID from URL
@@ -279,44 +649,187 @@ class SSTUScheduleParser:
                             pass
                     
                     # Extract course number from group name
-                    course_match = re.search(r'-(\d)1$', group_name)
+                    course_match = COURSE_RE.search(group_name)
                     course_number = int(course_match.group(1)) if course_match else None
                     
-                    # Avoid duplicates
-                    if not any(g['name'] == group_name for g in groups):
-                        groups.append({
-                            'name': group_name,
-                            'sstu_id': group_id,
-                            'education_form': current_edu_form,
-                            'degree_type': current_degree,
-                            'course_number': course_number,
-                        })
-        
-        return groups
-    
-    def parse_group_schedule(self, group_id: int) -> List[Dict]:
+                    groups[group_name] = {
+                        'name': group_name,
+                        'sstu_id': group_id,
+                        'education_form': current_edu_form,
+                        'degree_type': current_degree,
+                        'course_number': course_number,
+                    }
+        
+        return list(groups.values())
+    
+    def parse_group_schedule(self, group_id: int) -> List[ParsedLesson]:
         """Parse schedule for specific group."""
-        url = f"{self.GROUP_PAGE}{group_id}"
-        soup = self.fetch_page(url)
+        return list(self.parse_group_schedule_iter(group_id))
+    
+    def parse_group_schedule_iter(self, group_id: int) -> Iterator[ParsedLesson]:
+        """
+        Fetch group page and return iterator over its lessons.
+        
+        The page is fetched immediately; lessons are extracted lazily and the
+        page tree is released week by week as the iterator is consumed.
+        """
+        soup = self.fetch_page(self.group_page_url(group_id))
         if not soup:
-            return []
+            return iter(())
+        return self.iter_group_soup(soup, group_id, release=True)
+    
+    def group_page_url(self, group_id: int) -> str:
+        """URL of group schedule page."""
+        return f"{self.GROUP_PAGE}{group_id}"
+    
+    def commit_group_page(self, group_id: int):
+        """Save page cache entry of group page after its lessons were persisted."""
+        if self.page_cache:
+            self.page_cache.commit(self.group_page_url(group_id))
+    
+    def invalidate_group_page(self, group_id: int):
+        """Forget cached state of group page so next fetch is parsed in full."""
+        if self.page_cache:
+            self.page_cache.invalidate(self.group_page_url(group_id))
+    
+    def fetch_group_html(self, group_id: int) -> str:
+        """
+        Fetch group page text, raising ScheduleFetchError if it could not be fetched.
+        Raises PageUnchanged if the page matches the page cache.
+        """
+        html = self.fetch_html(self.group_page_url(group_id), conditional=True)
+        if html is None:
+            raise ScheduleFetchError(f"Failed to fetch schedule page for group {group_id}")
+        return html
+    
+    def _fetch_and_parse_group(self, group_id: int) -> Tuple[List[ParsedLesson], Dict[str, float]]:
+        """
+        Parse schedule for group, raising if the page could not be fetched.
+        Raises PageUnchanged if the page matches the page cache.
+        Returns lessons and fetch/parse timings.
+        """
+        started = time_module.monotonic()
+        html = self.fetch_group_html(group_id)
+        fetch_seconds = time_module.monotonic() - started
+        parse_started = time_module.thread_time()
+        try:
+            lessons = self.parse_group_html(html, group_id)
+        except Exception:
+            self.invalidate_group_page(group_id)
+            raise
+        return lessons, {'fetch_seconds': fetch_seconds, 'parse_seconds': time_module.thread_time() - parse_started}
+    
+    def parse_many_groups(self, group_ids: Iterable[int], concurrency: int = 4) -> Iterator[GroupParseResult]:
+        """
+        Parse schedules for many groups concurrently.
         
-        lessons = []
+        Yields GroupParseResult as soon as each group is done (completion order).
+        With a page cache, groups whose page did not change are yielded with
+        ``unchanged=True`` and no lessons.
+        Failed groups are yielded with ``error`` set; after the run they are also
+        logged and stored in ``last_batch_errors`` in input order.
+        Requests to one host never exceed ``max_connections_per_host``.
+        """
+        return self._parse_many(self._fetch_and_parse_group, group_ids, concurrency, GroupParseResult, 'groups')
+    
+    def _fetch_and_parse_teacher(self, teacher_id: int) -> Tuple[List[Dict], Dict[str, float]]:
+        """Parse schedule for teacher, raising if the page could not be fetched."""
+        html = self.fetch_html(f"{self.TEACHER_PAGE}{teacher_id}")
+        if html is None:
+            raise ScheduleFetchError(f"Failed to fetch schedule page for teacher {teacher_id}")
+        return self.parse_teacher_html(html, teacher_id), {}
+    
+    def parse_many_teachers(self, teacher_ids: Iterable[int], concurrency: int = 4) -> Iterator[TeacherParseResult]:
+        """
+        Parse schedules for many teachers concurrently, same contract as parse_many_groups.
+        
+        Teacher pages are always fetched in full (not conditionally): their
+        lessons are merged into group schedules and are needed every run.
+        """
+        return self._parse_many(self._fetch_and_parse_teacher, teacher_ids, concurrency, TeacherParseResult, 'teachers')
+    
+    def _parse_many(self, worker, object_ids: Iterable[int], concurrency: int, result_class, label: str) -> Iterator:
+        """
+        Run ``worker`` for every ID in a thread pool and yield ``result_class``
+        tuples. ``worker`` returns records and extra result fields (timings).
+        """
+        object_ids = list(object_ids)
+        self.last_batch_errors = []
+        if not object_ids:
+            return
+        
+        errors = []
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='sstu-parse')
+        try:
+            futures = {
+                executor.submit(worker, object_id): (index, object_id)
+                for index, object_id in enumerate(object_ids)
+            }
+            for future in as_completed(futures):
+                index, object_id = futures[future]
+                try:
+                    records, extra = future.result()
+                    yield result_class(index, object_id, records, **extra)
+                except PageUnchanged:
+                    yield result_class(index, object_id, [], unchanged=True)
+                except Exception as e:
+                    errors.append((index, object_id, e))
+                    yield result_class(index, object_id, [], e)
+        finally:
+            # Stop queued work if the caller stopped iterating early
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        errors.sort(key=lambda item: item[0])
+        self.last_batch_errors = [(object_id, error) for _, object_id, error in errors]
+        if errors:
+            logger.warning(f"Failed to parse {len(errors)} of {len(object_ids)} {label}")
+            for _, object_id, error in errors:
+                logger.warning(f"  {label[:-1]} {object_id}: {error}")
+    
+    def parse_group_html(self, html: str, group_id: Optional[int] = None) -> List[ParsedLesson]:
+        """Parse group schedule from page text."""
+        return list(self.iter_group_soup(self.make_soup(html), group_id, release=True))
+    
+    def parse_group_soup(self, soup: BeautifulSoup, group_id: Optional[int] = None) -> List[ParsedLesson]:
+        """Parse group schedule from page tree."""
+        return list(self.iter_group_soup(soup, group_id))
+    
+    def iter_group_soup(self, soup: BeautifulSoup, group_id: Optional[int] = None,
+                        release: bool = False) -> Iterator[ParsedLesson]:
+        """
+        Yield lessons of group schedule page in one pass over the calendar.
+        
+        With ``release=True`` each week subtree is decomposed once its lessons
+        are yielded, so the tree shrinks while the caller consumes lessons.
+        """
         calendar = soup.find('div', class_='calendar')
         if not calendar:
             logger.warning(f"No calendar found for group {group_id}")
-            return []
+            return
         
         # Parse exam warnings
         exam_dates = self._parse_exam_warnings(calendar)
+        # Год для дат из заголовков дней определяем один раз на страницу
+        now = datetime.now()
         
-        # Parse weekly schedule
+        count = 0
+        skipped_weeks = 0
         for week_div in calendar.find_all('div', class_='week'):
-            week_lessons = self._parse_week(week_div, exam_dates)
-            lessons.extend(week_lessons)
+            if self._week_outside_window(week_div, now):
+                skipped_weeks += 1
+            else:
+                for lesson in self._iter_week(week_div, exam_dates, now):
+                    count += 1
+                    yield lesson
+            if release:
+                week_div.decompose()
         
-        logger.info(f"Parsed {len(lessons)} lessons for group {group_id}")
-        return lessons
+        if release:
+            calendar.decompose()
+        if skipped_weeks:
+            logger.info(f"Parsed {count} lessons for group {group_id} ({skipped_weeks} weeks outside date window skipped)")
+        else:
+            logger.info(f"Parsed {count} lessons for group {group_id}")
     
     def _parse_exam_warnings(self, calendar) -> Dict[str, datetime]:
         """Parse exam dates from warnings."""
@@ -329,7 +842,7 @@ class SSTUScheduleParser:
         for text in warning_texts:
             content = text.get_text(strip=True)
             # Extract subject and date: "Предмет (12.01.2026)"
-            match = re.match(r'(.+?)\s*\((\d{2}\.\d{2}\.\d{4})\)', content)
+            match = EXAM_WARNING_RE.match(content)
             if match:
                 subject_name = match.group(1).strip()
                 date_str = match.group(2)
@@ -341,43 +854,42 @@ class SSTUScheduleParser:
         
         return exam_dates
     
-    def _parse_week(self, week_div, exam_dates: Dict) -> List[Dict]:
-        """Parse single week schedule."""
-        lessons = []
+    def _week_outside_window(self, week_div, now: datetime) -> bool:
+        """Check by day headers only whether the whole week is outside date window."""
+        if self.date_window is None:
+            return False
         
-        # Get week number from data-lesson attribute (e.g., "w03n1" -> week 3)
-        week_number = None
-        first_lesson_div = week_div.find('div', class_='day-lesson', attrs={'data-lesson': re.compile(r'w(\d+)n\d+')})
-        if first_lesson_div:
-            data_lesson = first_lesson_div.get('data-lesson', '')
-            match = re.search(r'w(\d+)n\d+', data_lesson)
-            if match:
-                try:
-                    week_number = int(match.group(1))
-                except ValueError:
-                    pass
+        dates = []
+        for day_div in week_div.find_all('div', class_='day', recursive=False):
+            if 'day-header-color-blue' in day_div.get('class', []):
+                continue
+            header = day_div.find('div', class_='day-header')
+            if not header:
+                continue
+            header_text = self._day_header_text(header)
+            if DAY_DATE_RE.search(header_text):
+                day_date = self._header_date(header_text, now)
+                if day_date:
+                    dates.append(day_date)
         
-        days = week_div.find_all('div', class_='day', recursive=False)
+        # Week without dates cannot be placed, parse it
+        if not dates:
+            return False
+        return not self.date_window.overlaps(min(dates), max(dates))
+    
+    def _iter_week(self, week_div, exam_dates: Dict, now: datetime) -> Iterator[ParsedLesson]:
+        """Yield lessons of single week."""
+        week_number = self._week_number_from_cells(week_div)
         
-        for day_div in days:
+        for day_div in week_div.find_all('div', class_='day', recursive=False):
             # Skip hour column
             if 'day-header-color-blue' in day_div.get('class', []):
                 continue
             
-            day_data = self._parse_day(day_div, exam_dates, week_number)
-            lessons.extend(day_data)
-        
-        return lessons
+            yield from self._iter_day(day_div, exam_dates, week_number, now)
     
-    def _parse_day(self, day_div, exam_dates: Dict, week_number: Optional[int]) -> List[Dict]:
-        """Parse single day schedule."""
-        lessons = []
-        
-        # Get day name and date
-        header = day_div.find('div', class_='day-header')
-        if not header:
-            return lessons
-        
+    def _day_header_text(self, header) -> str:
+        """Get lowercased day header text ("понедельник12.01")."""
         # Get text from header - может быть вложенный div
         # Структура: <div class="day-header"><div><span>Понедельник</span>12.01</div></div>
         header_inner = header.find('div')
@@ -389,7 +901,7 @@ class SSTUScheduleParser:
             header_text = header.get_text(strip=True).lower()
         
         # Если текст пустой, пробуем найти span и текст после него
-        if not header_text or not re.search(r'\d{2}\.\d{2}', header_text):
+        if not header_text or not DAY_DATE_RE.search(header_text):
             span = header.find('span')
             if span:
                 # Берем текст после span
@@ -399,6 +911,65 @@ class SSTUScheduleParser:
                 if parent_text and parent_text != span_text:
                     header_text = parent_text.lower()
         
+        return header_text
+    
+    def _header_date(self, header_text: str, now: datetime) -> Optional[date]:
+        """Extract date from day header (e.g., "Понедельник 12.01" -> date(2026, 1, 12))."""
+        date_match = DAY_DATE_RE.search(header_text)
+        if not date_match:
+            logger.warning(f"Could not find date in header text: '{header_text}'")
+            return None
+        
+        try:
+            day, month = int(date_match.group(1)), int(date_match.group(2))
+            if self.semester:
+                day_date = self.semester.header_date(day, month, now.date())
+            else:
+                day_date = header_date_near(day, month, now.date())
+            logger.debug(f"Parsed date from header '{header_text}': {day_date}")
+            return day_date
+        except ValueError as e:
+            # Не пропускаем день, просто не устанавливаем дату
+            logger.error(f"Error parsing date from header '{header_text}': {e}")
+            return None
+    
+    def _day_week_number(self, day_date: Optional[date], week_number: Optional[int]) -> Optional[int]:
+        """week_number по календарю семестра, если дата дня в семестре, иначе номер из ячеек."""
+        if not self.semester:
+            return week_number
+        return self.semester.week_number(day_date) or week_number
+    
+    def _week_number_from_cells(self, week_div) -> Optional[int]:
+        """Get week number from data-lesson attribute (e.g., "w03n1" -> week 3)."""
+        first_lesson_div = week_div.find('div', class_='day-lesson', attrs={'data-lesson': WEEK_LESSON_RE})
+        if first_lesson_div:
+            match = WEEK_LESSON_RE.search(first_lesson_div.get('data-lesson', ''))
+            if match:
+                return int(match.group(1))
+        return None
+    
+    def _iter_day(self, day_div, exam_dates: Dict, week_number: Optional[int], now: datetime) -> Iterator[ParsedLesson]:
+        """Yield lessons of single day."""
+        # Один проход по дочерним элементам дня: заголовок и ячейки пар
+        header = None
+        lesson_divs = []
+        for child in day_div.children:
+            if getattr(child, 'name', None) != 'div':
+                continue
+            classes = child.get('class', [])
+            if 'day-lesson' in classes:
+                # Skip empty lessons
+                if 'day-lesson-empty' not in classes:
+                    lesson_divs.append(child)
+            elif header is None and 'day-header' in classes:
+                header = child
+        if header is None:
+            header = day_div.find('div', class_='day-header')
+            if not header:
+                return
+        
+        header_text = self._day_header_text(header)
+        
         # Extract weekday
         weekday = None
         for day_name, day_num in self.WEEKDAY_MAP.items():
@@ -407,72 +978,33 @@ class SSTUScheduleParser:
                 break
         
         if not weekday:
-            return lessons
+            return
         
-        # Extract date from header (e.g., "Понедельник 12.01" -> date(2026, 1, 12))
-        day_date = None
-        date_match = re.search(r'(\d{2})\.(\d{2})', header_text)
-        if date_match:
-            day_str = date_match.group(1)
-            month_str = date_match.group(2)
-            try:
-                # Определяем год: если месяц январь-февраль и сейчас конец года, то это следующий год
-                # Иначе используем текущий год
-                current_year = datetime.now().year
-                current_month = datetime.now().month
-                parsed_month = int(month_str)
-                parsed_day = int(day_str)
-                
-                # Если парсим январь-февраль, а сейчас ноябрь-декабрь, то это следующий год
-                if parsed_month <= 2 and current_month >= 11:
-                    year = current_year + 1
-                # Если парсим ноябрь-декабрь, а сейчас январь-февраль, то это прошлый год
-                elif parsed_month >= 11 and current_month <= 2:
-                    year = current_year - 1
-                else:
-                    year = current_year
-                
-                day_date = date(year, parsed_month, parsed_day)
-                logger.debug(f"Parsed date from header '{header_text}': {day_date}")
-            except ValueError as e:
-                logger.error(f"Error parsing date from header '{header_text}': {e}")
-                # Не пропускаем день, просто не устанавливаем дату
-                pass
-        else:
-            logger.warning(f"Could not find date in header text: '{header_text}'")
+        day_date = self._header_date(header_text, now)
+        if day_date and self.date_window and not self.date_window.contains(day_date):
+            return
         
-        # Parse lessons
-        lesson_divs = day_div.find_all('div', class_='day-lesson', recursive=False)
+        day_week_number = self._day_week_number(day_date, week_number)
+        
+        count = 0
         for lesson_div in lesson_divs:
-            # Skip empty lessons
-            if 'day-lesson-empty' in lesson_div.get('class', []):
-                continue
-            
-            lesson_data = self._parse_lesson(lesson_div, weekday, week_number, exam_dates, day_date)
+            lesson_data = self._parse_lesson(lesson_div, weekday, day_week_number, exam_dates, day_date)
             if lesson_data:
-                # Убеждаемся, что дата установлена
-                if not lesson_data.get('specific_date') and day_date:
-                    lesson_data['specific_date'] = day_date
-                    logger.debug(f"Set specific_date from day_date: {day_date} for lesson {lesson_data.get('subject_name')}")
-                lessons.append(lesson_data)
+                count += 1
+                yield lesson_data
         
         # Логируем, если день не имеет даты, но есть занятия
-        if lessons and not day_date:
-            logger.warning(f"Day with {len(lessons)} lessons has no date! Header text was: '{header_text}'")
-        
-        return lessons
+        if count and not day_date:
+            logger.warning(f"Day with {count} lessons has no date! Header text was: '{header_text}'")
     
-    def _parse_lesson(self, lesson_div, weekday: int, week_number: Optional[int], exam_dates: Dict, day_date: Optional[date] = None) -> Optional[Dict]:
-        """Parse single lesson."""
+    def _parse_lesson(self, lesson_div, weekday: int, week_number: Optional[int], exam_dates: Dict,
+                      day_date: Optional[date] = None) -> Optional[ParsedLesson]:
+        """Parse single lesson (``week_number`` is already adjusted to ``day_date``)."""
         try:
             # Get lesson number from data attribute
-            data_lesson = lesson_div.get('data-lesson', '')
-            lesson_number = None
-            if data_lesson:
-                # Format: w03n1 -> lesson 1
-                match = re.search(r'n(\d+)', data_lesson)
-                if match:
-                    lesson_number = int(match.group(1))
+            # Format: w03n1 -> lesson 1
+            match = LESSON_NUMBER_RE.search(lesson_div.get('data-lesson', ''))
+            lesson_number = int(match.group(1)) if match else None
             
             if not lesson_number or lesson_number not in self.LESSON_TIMES:
                 return None
@@ -485,25 +1017,32 @@ class SSTUScheduleParser:
             if not inner_div:
                 return None
             
-            # Extract room
-            room_div = inner_div.find('div', class_='lesson-room')
-            room = room_div.get_text(strip=True) if room_div else ''
+            # Room, name, type and teacher link in one walk over lesson cell
+            room_div = name_div = type_div = teacher_link = None
+            for element in inner_div.descendants:
+                name = getattr(element, 'name', None)
+                if name == 'div':
+                    classes = element.get('class', [])
+                    if room_div is None and 'lesson-room' in classes:
+                        room_div = element
+                    if name_div is None and 'lesson-name' in classes:
+                        name_div = element
+                    if type_div is None and 'lesson-type' in classes:
+                        type_div = element
+                elif name == 'a' and teacher_link is None:
+                    teacher_link = element
             
-            # Extract subject name
-            name_div = inner_div.find('div', class_='lesson-name')
+            room = room_div.get_text(strip=True) if room_div else ''
             subject_name = name_div.get_text(strip=True) if name_div else ''
             
             if not subject_name:
                 return None
             
-            # Extract lesson type
-            type_div = inner_div.find('div', class_='lesson-type')
             lesson_type_raw = type_div.get_text(strip=True) if type_div else ''
             lesson_type_raw = lesson_type_raw.strip('()')
             lesson_type = self.LESSON_TYPE_MAP.get(lesson_type_raw.lower(), 'other')
             
             # Extract teacher
-            teacher_link = inner_div.find('a')
             teacher_name = None
             teacher_id = None
             teacher_url = None
@@ -512,12 +1051,9 @@ class SSTUScheduleParser:
                 teacher_name = teacher_link.get_text(strip=True)
                 teacher_url = teacher_link.get('href', '')
                 # Extract teacher ID from URL
-                teacher_id_match = re.search(r'teachers/(\d+)-', teacher_url)
+                teacher_id_match = TEACHER_ID_RE.search(teacher_url)
                 if teacher_id_match:
-                    try:
-                        teacher_id = int(teacher_id_match.group(1))
-                    except ValueError:
-                        pass
+                    teacher_id = int(teacher_id_match.group(1))
             
             # Определяем specific_date:
             # 1. Для экзаменов - из exam_dates
@@ -526,32 +1062,22 @@ class SSTUScheduleParser:
             if lesson_type == 'экз' and subject_name in exam_dates:
                 specific_date = exam_dates[subject_name].date()
             elif day_date:
-                # Для обычных занятий используем дату из заголовка дня
                 specific_date = day_date
             
-            # Вычисляем week_number на основе даты дня, если она есть (для обратной совместимости)
-            final_week_number = week_number
-            if day_date:
-                semester_start = date(2026, 1, 12)  # Понедельник, начало семестра
-                days_diff = (day_date - semester_start).days
-                calculated_week = (days_diff // 7) + 1
-                if calculated_week > 0:
-                    final_week_number = calculated_week
-            
-            return {
-                'subject_name': subject_name,
-                'teacher_name': teacher_name,
-                'teacher_id': teacher_id,
-                'teacher_url': teacher_url if teacher_url and not teacher_url.startswith('http') else f"{self.BASE_URL}{teacher_url}" if teacher_url else None,
-                'lesson_type': lesson_type,
-                'room': room,
-                'weekday': weekday,
-                'lesson_number': lesson_number,
-                'start_time': start_time,
-                'end_time': end_time,
-                'specific_date': specific_date,
-                'week_number': final_week_number,
-            }
+            return ParsedLesson.create(
+                subject_name=subject_name,
+                teacher_name=teacher_name,
+                teacher_id=teacher_id,
+                teacher_url=teacher_url if teacher_url and not teacher_url.startswith('http') else f"{self.BASE_URL}{teacher_url}" if teacher_url else None,
+                lesson_type=lesson_type,
+                room=room,
+                weekday=weekday,
+                lesson_number=lesson_number,
+                start_time=start_time,
+                end_time=end_time,
+                specific_date=specific_date,
+                week_number=week_number,
+            )
         except Exception as e:
             logger.error(f"Error parsing lesson: {e}")
             return None
@@ -562,7 +1088,14 @@ class SSTUScheduleParser:
         soup = self.fetch_page(url)
         if not soup:
             return []
-        
+        return self.parse_teacher_soup(soup, teacher_id)
+    
+    def parse_teacher_html(self, html: str, teacher_id: Optional[int] = None) -> List[Dict]:
+        """Parse teacher schedule from page text."""
+        return self.parse_teacher_soup(self.make_soup(html), teacher_id)
+    
+    def parse_teacher_soup(self, soup: BeautifulSoup, teacher_id: Optional[int] = None) -> List[Dict]:
+        """Parse teacher schedule from page tree."""
         lessons = []
         calendar = soup.find('div', class_='calendar')
         if not calendar:
@@ -571,18 +1104,22 @@ class SSTUScheduleParser:
         
         # Parse exam/test warnings
         exam_dates = self._parse_exam_warnings(calendar)
+        now = datetime.now()
         
         # Parse weekly schedule
         for week_div in calendar.find_all('div', class_='week'):
-            week_lessons = self._parse_week_teacher(week_div, exam_dates)
+            if self._week_outside_window(week_div, now):
+                continue
+            week_lessons = self._parse_week_teacher(week_div, exam_dates, now)
             lessons.extend(week_lessons)
         
         logger.info(f"Parsed {len(lessons)} lessons for teacher {teacher_id}")
         return lessons
     
-    def _parse_week_teacher(self, week_div, exam_dates: Dict) -> List[Dict]:
+    def _parse_week_teacher(self, week_div, exam_dates: Dict, now: datetime) -> List[Dict]:
         """Parse single week schedule for teacher."""
         lessons = []
+        week_number = self._week_number_from_cells(week_div)
         
         days = week_div.find_all('div', class_='day', recursive=False)
         
@@ -591,12 +1128,12 @@ class SSTUScheduleParser:
             if 'day-header-color-blue' in day_div.get('class', []):
                 continue
             
-            day_data = self._parse_day_teacher(day_div, exam_dates)
+            day_data = self._parse_day_teacher(day_div, exam_dates, week_number, now)
             lessons.extend(day_data)
         
         return lessons
     
-    def _parse_day_teacher(self, day_div, exam_dates: Dict) -> List[Dict]:
+    def _parse_day_teacher(self, day_div, exam_dates: Dict, week_number: Optional[int], now: datetime) -> List[Dict]:
         """Parse single day schedule for teacher."""
         lessons = []
         
@@ -605,7 +1142,7 @@ class SSTUScheduleParser:
         if not header:
             return lessons
         
-        header_text = header.get_text(strip=True).lower()
+        header_text = self._day_header_text(header)
         
         # Extract weekday
         weekday = None
@@ -617,6 +1154,13 @@ class SSTUScheduleParser:
         if not weekday:
             return lessons
         
+        # Дата и неделя считаются так же, как на странице группы,
+        # чтобы занятия со страницы преподавателя совпадали с занятиями группы
+        day_date = self._header_date(header_text, now)
+        if day_date and self.date_window and not self.date_window.contains(day_date):
+            return lessons
+        day_week_number = self._day_week_number(day_date, week_number)
+        
         # Parse lessons
         lesson_divs = day_div.find_all('div', class_='day-lesson', recursive=False)
         for lesson_div in lesson_divs:
@@ -624,7 +1168,7 @@ class SSTUScheduleParser:
             if 'day-lesson-empty' in lesson_div.get('class', []):
                 continue
             
-            lesson_data = self._parse_lesson_teacher(lesson_div, weekday, exam_dates)
+            lesson_data = self._parse_lesson_teacher(lesson_div, weekday, exam_dates, day_date, day_week_number)
             if lesson_data:
                 # For teacher schedule, one lesson div may contain multiple groups
                 # We need to create separate lesson for each group
@@ -635,14 +1179,15 @@ class SSTUScheduleParser:
         
         return lessons
     
-    def _parse_lesson_teacher(self, lesson_div, weekday: int, exam_dates: Dict):
+    def _parse_lesson_teacher(self, lesson_div, weekday: int, exam_dates: Dict,
+                              day_date: Optional[date] = None, week_number: Optional[int] = None):
         """Parse single lesson for teacher (may have multiple groups)."""
         try:
             # Get lesson number
             data_lesson = lesson_div.get('data-lesson', '')
             lesson_number = None
             if data_lesson:
-                match = re.search(r'n(\d+)', data_lesson)
+                match = LESSON_NUMBER_RE.search(data_lesson)
                 if match:
                     lesson_number = int(match.group(1))
             
@@ -681,16 +1226,18 @@ class SSTUScheduleParser:
                     group_text = group_div.get_text(strip=True)
                     # Extract group name from "Подгр. 1: б-ЗМКДз-11" or just "б-ЗМКДз-11"
                     if 'Подгр.' in group_text or 'подгр.' in group_text.lower():
-                        match = re.search(r':\s*(.+)$', group_text)
+                        match = GROUP_LABEL_RE.search(group_text)
                         if match:
                             groups.append(match.group(1).strip())
                     elif group_text and not any(x in group_text.lower() for x in ['аудитория', 'корпус']):
                         groups.append(group_text)
             
-            # Determine specific_date for exams
+            # Determine specific_date: exams from warnings, others from day header
             specific_date = None
             if lesson_type == 'экз' and subject_name in exam_dates:
                 specific_date = exam_dates[subject_name].date()
+            elif day_date:
+                specific_date = day_date
             
             # Create lesson data for each group (or one if no groups found)
             if groups:
@@ -706,7 +1253,7 @@ class SSTUScheduleParser:
                         'start_time': start_time,
                         'end_time': end_time,
                         'specific_date': specific_date,
-                        'week_number': None,
+                        'week_number': week_number,
                     })
                 return result
             else:
@@ -721,7 +1268,7 @@ class SSTUScheduleParser:
                     'start_time': start_time,
                     'end_time': end_time,
                     'specific_date': specific_date,
-                    'week_number': None,
+                    'week_number': week_number,
                 }
         except Exception as e:
             logger.error(f"Error parsing teacher lesson: {e}")
@@ -0,0 +1,292 @@
+"""
+Offline benchmark of SSTUScheduleParser on a recorded corpus of pages.
+
+Corpus layout is the one of ``check_parser_backends``: ``main.html``,
+``group_<sstu_id>.html``, ``teacher_<sstu_id>.html``. Every public entry
+point (parse_main_html, parse_group_html, parse_teacher_html) is run on its
+pages and reported as pages/sec, records/sec, peak RSS and peak traced
+memory per page (tracemalloc, bytes). Results can be saved as a baseline
+and compared with it later. Django-free.
+
+Throughput is compared with the baseline relative to a calibration loop
+(stdlib ``html.parser`` on a fixed document) timed in the same run, so the
+budget holds across CI hosts of different speed.
+
+``benchmark_corpus/`` next to this module holds a small committed corpus in
+the markup of rasp.sstu.ru with its ``baseline.json``, so the benchmark runs
+offline out of the box; the pages are synthetic, ``benchmark_parser --record``
+replaces them with live ones.
+"""
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .html_backends import page_kind, parse_corpus_page
+
+# resource is POSIX-only: without it peak RSS is not reported
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+ENTRY_POINTS = {
+    'main': 'parse_main_html',
+    'group': 'parse_group_html',
+    'teacher': 'parse_teacher_html',
+}
+
+# Metrics compared with baseline: name -> True if higher is better.
+# Throughput is counted per calibration loop, absolute per-second numbers
+# depend on the host.
+BUDGET_METRICS = {
+    'pages_per_calibration': True,
+    'records_per_calibration': True,
+    'peak_alloc_bytes_per_page': False,
+}
+
+DEFAULT_CORPUS_DIR = Path(__file__).resolve().parent / 'benchmark_corpus'
+
+# Fixed document for the calibration loop, roughly one group page of markup
+CALIBRATION_HTML = ''.join(
+    f'<div class="day"><div class="lesson" data-id="{i}"><span class="time">08:00</span>'
+    f'<a href="/rasp/teacher/{i}">Иванов И.И.</a><span class="room">1/{i}</span></div></div>'
+    for i in range(1000)
+)
+
+
+def calibration_seconds(repeat: int = 5) -> float:
+    """Best time of stdlib html.parser on CALIBRATION_HTML, the unit of host speed."""
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        HTMLParser().feed(CALIBRATION_HTML)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in KB."""
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, KB on Linux
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def load_corpus(corpus_dir) -> Dict[str, List[Path]]:
+    """Group corpus page paths by page kind."""
+    pages = {kind: [] for kind in ENTRY_POINTS}
+    for path in sorted(Path(corpus_dir).glob('*.html')):
+        kind = page_kind(path)
+        if kind:
+            pages[kind].append(path)
+    return pages
+
+
+def _count_records(result) -> int:
+    if not result:
+        return 0
+    if isinstance(result[0], dict) and 'groups' in result[0]:
+        # Main page: institutes with groups
+        return sum(len(institute['groups']) for institute in result)
+    return len(result)
+
+
+def benchmark_entry_point(parser, paths: List[Path], repeat: int = 5,
+                          calibration: Optional[float] = None) -> Dict:
+    """
+    Benchmark one entry point on its pages.
+
+    With ``calibration`` (seconds of the calibration loop) throughput is also
+    reported as pages and records parsed per calibration loop.
+
+    Timing is the best of ``repeat`` passes over all pages; peak traced
+    memory (bytes allocated at once while parsing a page, not a count of
+    allocations) is measured in a separate pass so tracing does not skew
+    timing.
+    """
+    texts = [(path, path.read_text(encoding='utf-8', errors='ignore')) for path in paths]
+    records = sum(_count_records(parse_corpus_page(parser, path, text)) for path, text in texts)
+
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        for path, text in texts:
+            parse_corpus_page(parser, path, text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    alloc_peaks = []
+    tracemalloc.start()
+    try:
+        for path, text in texts:
+            tracemalloc.reset_peak()
+            baseline_size, _ = tracemalloc.get_traced_memory()
+            parse_corpus_page(parser, path, text)
+            _, peak = tracemalloc.get_traced_memory()
+            alloc_peaks.append(peak - baseline_size)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'pages': len(texts),
+        'bytes': sum(len(text.encode('utf-8')) for _, text in texts),
+        'records': records,
+        'seconds': round(best, 6),
+        'pages_per_sec': round(len(texts) / best, 2) if best else None,
+        'records_per_sec': round(records / best, 2) if best else None,
+        'pages_per_calibration': round(len(texts) * calibration / best, 4) if best and calibration else None,
+        'records_per_calibration': round(records * calibration / best, 3) if best and calibration else None,
+        'peak_alloc_bytes_per_page': int(sum(alloc_peaks) / len(alloc_peaks)),
+        'peak_alloc_bytes_max': max(alloc_peaks),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def run_benchmark(corpus_dir, html_backend: Optional[str] = None, repeat: int = 5,
+                  entry_points: Optional[Iterable[str]] = None) -> Dict:
+    """Benchmark parser entry points on corpus, return report dict."""
+    # Imported here to avoid circular import (parser imports html_backends)
+    from .parser import SSTUScheduleParser
+
+    parser = SSTUScheduleParser(html_backend=html_backend)
+    pages = load_corpus(corpus_dir)
+    kinds = list(entry_points or ENTRY_POINTS)
+
+    # Parser logs every page at INFO level, that would dominate timing
+    parser_logger = logging.getLogger(SSTUScheduleParser.__module__)
+    previous_level = parser_logger.level
+    parser_logger.setLevel(logging.WARNING)
+    try:
+        calibration = calibration_seconds(repeat)
+        results = {
+            ENTRY_POINTS[kind]: benchmark_entry_point(parser, pages[kind], repeat, calibration)
+            for kind in kinds
+            if pages.get(kind)
+        }
+    finally:
+        parser_logger.setLevel(previous_level)
+
+    return {
+        'html_backend': parser.html_backend,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'calibration_seconds': round(calibration, 6),
+        'entry_points': results,
+    }
+
+
+def compare_with_baseline(report: Dict, baseline: Dict, tolerance: float = 0.3) -> List[Dict]:
+    """
+    Compare report with baseline report, return list of budget violations.
+
+    Throughput relative to the calibration loop may drop and allocations may
+    grow by at most ``tolerance``;
+    record counts must match exactly (a different count means parser output
+    changed, not its speed). Reports of different HTML backends are never
+    compared.
+    """
+    violations = []
+    if baseline.get('html_backend') and baseline['html_backend'] != report['html_backend']:
+        # Numbers of different backends are not comparable
+        return [{
+            'entry_point': None,
+            'metric': 'html_backend',
+            'baseline': baseline['html_backend'],
+            'current': report['html_backend'],
+        }]
+
+    for entry_point, current in report['entry_points'].items():
+        expected = baseline.get('entry_points', {}).get(entry_point)
+        if not expected:
+            continue
+
+        if current['records'] != expected['records'] or current['pages'] != expected['pages']:
+            violations.append({
+                'entry_point': entry_point,
+                'metric': 'records',
+                'baseline': expected['records'],
+                'current': current['records'],
+            })
+
+        for metric, higher_is_better in BUDGET_METRICS.items():
+            old, new = expected.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            if higher_is_better:
+                failed = new < old * (1 - tolerance)
+            else:
+                failed = new > old * (1 + tolerance)
+            if failed:
+                violations.append({
+                    'entry_point': entry_point,
+                    'metric': metric,
+                    'baseline': old,
+                    'current': new,
+                    'change': round(new / old - 1, 3),
+                })
+    return violations
+
+
+def load_report(path) -> Dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_report(report: Dict, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def record_corpus(parser, corpus_dir, groups: int = 20, teachers: int = 10) -> Dict[str, int]:
+    """
+    Download main page, ``groups`` group pages and ``teachers`` teacher pages
+    into corpus directory. Groups are spread evenly over the main page list,
+    teachers are taken from the recorded group pages.
+    """
+    corpus_dir = Path(corpus_dir)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    saved = {'main': 0, 'group': 0, 'teacher': 0}
+
+    main_html = parser.fetch_html(parser.MAIN_PAGE)
+    if main_html is None:
+        raise RuntimeError('Failed to fetch main page')
+    (corpus_dir / 'main.html').write_text(main_html, encoding='utf-8')
+    saved['main'] = 1
+
+    group_ids = [
+        group['sstu_id']
+        for institute in parser.parse_main_html(main_html)
+        for group in institute['groups']
+        if group.get('sstu_id')
+    ]
+    step = max(1, len(group_ids) // max(1, groups))
+    teacher_ids = []
+    for group_id in group_ids[::step][:groups]:
+        html = parser.fetch_html(parser.group_page_url(group_id))
+        if html is None:
+            continue
+        (corpus_dir / f'group_{group_id}.html').write_text(html, encoding='utf-8')
+        saved['group'] += 1
+        for lesson in parser.parse_group_html(html, group_id):
+            if lesson.get('teacher_id') and lesson['teacher_id'] not in teacher_ids:
+                teacher_ids.append(lesson['teacher_id'])
+
+    for teacher_id in teacher_ids[:teachers]:
+        html = parser.fetch_html(f"{parser.TEACHER_PAGE}{teacher_id}")
+        if html is None:
+            continue
+        (corpus_dir / f'teacher_{teacher_id}.html').write_text(html, encoding='utf-8')
+        saved['teacher'] += 1
+
+    return saved
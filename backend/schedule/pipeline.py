@@ -0,0 +1,295 @@
+"""
+Two-stage fetch/parse pipeline for group schedule pages.
+
+Fetching is I/O-bound and runs in threads; building the BeautifulSoup tree
+and extracting lessons is CPU-bound and holds the GIL, so it runs in a
+process pool. Fetch threads put page texts into a bounded queue: when
+parsing falls behind, the queue fills up and fetchers wait (backpressure)
+instead of piling pages up in memory. Django-free.
+
+Forking a process with running threads can leave a lock (logging, the
+connection pool) held forever in the child, so pool processes come from a
+``forkserver`` (``spawn`` where there is none) and are started before the
+fetch threads. Celery prefork workers are daemonic and ``multiprocessing``
+refuses to start children there, so inside them the pool is a ``billiard``
+pool (Celery's fork of multiprocessing, which allows it), forked eagerly
+before any fetch thread exists.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .parser import DateWindow, GroupParseResult, PageUnchanged, ScheduleFetchError, SSTUScheduleParser
+from .records import ParsedLesson
+from .semester import Semester
+
+logger = logging.getLogger(__name__)
+
+# Parser of a pool worker process (tree building only, no network)
+_worker_parser: Optional[SSTUScheduleParser] = None
+
+
+def _init_worker(html_backend: str, date_window: Optional[DateWindow], semester: Optional[Semester]):
+    global _worker_parser
+    _worker_parser = SSTUScheduleParser(html_backend=html_backend, date_window=date_window, semester=semester)
+    # Per-page INFO logs from every worker would interleave on stderr
+    logging.getLogger(SSTUScheduleParser.__module__).setLevel(logging.WARNING)
+
+
+def _timed_parse(parser: SSTUScheduleParser, html: str, group_id: int) -> Tuple[List[ParsedLesson], float]:
+    """Parse group page, return lessons and CPU time spent."""
+    started = time.thread_time()
+    lessons = parser.parse_group_html(html, group_id)
+    return lessons, time.thread_time() - started
+
+
+def _parse_group_page(html: str, group_id: int) -> Tuple[List[ParsedLesson], float]:
+    """Parse group page in a pool worker process."""
+    return _timed_parse(_worker_parser, html, group_id)
+
+
+def default_parse_workers(parallel_runs: int = 1) -> int:
+    """Parse processes of one pipeline when ``parallel_runs`` pipelines share the host."""
+    return max(1, ((os.cpu_count() or 2) - 1) // max(1, parallel_runs))
+
+
+def _process_context():
+    """Start method that does not fork the (threaded) parent."""
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+class BilliardPoolExecutor:
+    """Minimal ``concurrent.futures`` executor over a billiard pool (usable from daemonic processes)."""
+
+    def __init__(self, max_workers: int, initializer=None, initargs=()):
+        from billiard.pool import Pool
+        self._pool = Pool(processes=max_workers, initializer=initializer, initargs=initargs)
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+
+        def resolve(setter, value):
+            # Future may have been cancelled by shutdown(cancel_futures=True)
+            if future.set_running_or_notify_cancel():
+                setter(value)
+
+        self._pool.apply_async(fn, args, callback=lambda result: resolve(future.set_result, result),
+                               error_callback=lambda error: resolve(future.set_exception, error))
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        if cancel_futures:
+            self._pool.terminate()
+        else:
+            self._pool.close()
+        if wait:
+            self._pool.join()
+
+
+class FetchParsePipeline:
+    """Fetch group pages in threads and parse them in a process pool."""
+
+    def __init__(self, parser: SSTUScheduleParser, fetch_workers: int = 4,
+                 parse_workers: Optional[int] = None, queue_size: int = 16, parallel_runs: int = 1):
+        """
+        Args:
+            parser: Parser used for fetching (transport, page cache, archive)
+            fetch_workers: Threads fetching pages
+            parse_workers: Parsing processes (default: CPU count - 1 shared
+                by ``parallel_runs`` pipelines, e.g. chunk tasks of one sync)
+            queue_size: Fetched pages waiting for a parser before fetchers block
+            parallel_runs: Pipelines expected to run at once on the host
+        """
+        self.parser = parser
+        self.fetch_workers = max(1, fetch_workers)
+        self.parse_workers = parse_workers or default_parse_workers(parallel_runs)
+        self.queue_size = max(1, queue_size)
+        self.stats = {}
+
+    def _reset_stats(self):
+        self.stats = {
+            'pages': 0,
+            'wall_seconds': 0.0,
+            'fetch_seconds': 0.0,  # summed over fetch threads
+            'fetch_blocked_seconds': 0.0,  # fetchers waiting for free queue slot
+            'parse_seconds': 0.0,  # CPU time summed over parse workers
+            'wait_fetch_seconds': 0.0,  # dispatcher waiting for fetched pages
+            'peak_queue': 0,
+            'parse_mode': '',
+        }
+
+    def _make_parse_stage(self):
+        """
+        Return (executor, parse function): process pool (billiard pool in
+        daemonic processes), or threads if billiard is not installed there.
+        """
+        initargs = (self.parser.html_backend, self.parser.date_window, self.parser.semester)
+        if multiprocessing.current_process().daemon:
+            # e.g. inside a Celery prefork worker: multiprocessing cannot start children here
+            try:
+                executor = BilliardPoolExecutor(self.parse_workers, initializer=_init_worker, initargs=initargs)
+            except ImportError:
+                logger.warning("Running in a daemonic process without billiard, parsing in threads")
+                self.stats['parse_mode'] = f'{self.parse_workers} threads'
+                executor = ThreadPoolExecutor(max_workers=self.parse_workers, thread_name_prefix='sstu-parse')
+                return executor, lambda html, group_id: _timed_parse(self.parser, html, group_id)
+            self.stats['parse_mode'] = f'{self.parse_workers} billiard processes'
+            return executor, _parse_group_page
+        context = _process_context()
+        self.stats['parse_mode'] = f'{self.parse_workers} {context.get_start_method()} processes'
+        executor = ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=context,
+                                       initializer=_init_worker, initargs=initargs)
+        # Start every process now rather than on demand while pages are fetched
+        wait([executor.submit(os.getpid) for _ in range(self.parse_workers)])
+        return executor, _parse_group_page
+
+    def run_groups(self, group_ids: Iterable[int]) -> Iterator[GroupParseResult]:
+        """
+        Fetch and parse group pages, yield results in completion order.
+
+        Same contract as SSTUScheduleParser.parse_many_groups: unchanged pages
+        are yielded with ``unchanged=True``, failures with ``error`` and are
+        stored in ``parser.last_batch_errors``.
+        """
+        group_ids = list(group_ids)
+        self._reset_stats()
+        self.parser.last_batch_errors = []
+        if not group_ids:
+            return
+
+        started = time.monotonic()
+        pages: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        stats_lock = threading.Lock()
+        errors = []
+
+        def put(index: int, group_id: int, item, fetch_started: float):
+            fetched = time.monotonic()
+            # Blocks while the queue is full: backpressure from the parse stage
+            while not stop.is_set():
+                try:
+                    pages.put((index, group_id, item, fetched - fetch_started), timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            with stats_lock:
+                self.stats['fetch_seconds'] += fetched - fetch_started
+                self.stats['fetch_blocked_seconds'] += time.monotonic() - fetched
+        
+        def fetch(index: int, group_id: int):
+            fetch_started = time.monotonic()
+            try:
+                item = self.parser.fetch_group_html(group_id)
+            except Exception as e:
+                # PageUnchanged / ScheduleFetchError are passed on to the dispatcher
+                item = e
+            put(index, group_id, item, fetch_started)
+        
+        def fetch_batch(batch: List[Tuple[int, int]]):
+            # One Worker round-trip per batch, pages are queued as their frames arrive
+            groups = {self.parser.group_page_url(group_id): (index, group_id) for index, group_id in batch}
+            fetch_started = time.monotonic()
+            try:
+                for page in self.parser.fetch_pages_batch(groups, conditional=True):
+                    index, group_id = groups.pop(page.url)
+                    if page.unchanged:
+                        item = PageUnchanged(page.url)
+                    elif page.error:
+                        item = ScheduleFetchError(f"Failed to fetch schedule page for group {group_id}: {page.error}")
+                    else:
+                        item = page.text
+                    put(index, group_id, item, fetch_started)
+                    fetch_started = time.monotonic()
+            except Exception as e:
+                # Dispatcher waits for every group: report the undelivered ones as failed
+                for index, group_id in groups.values():
+                    put(index, group_id, e, fetch_started)
+
+        # Parse processes first: none is started after the fetch threads
+        parse_executor, parse_page = self._make_parse_stage()
+        fetch_executor = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='sstu-fetch')
+        # Parse tasks in flight: enough to keep every process busy
+        max_pending = self.parse_workers * 2
+        pending: Dict[Future, Tuple[int, int, float]] = {}
+        received = 0
+
+        def harvest(timeout: Optional[float]) -> Iterator[GroupParseResult]:
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, group_id, fetch_seconds = pending.pop(future)
+                try:
+                    lessons, parse_seconds = future.result()
+                except Exception as e:
+                    # Make sure the page is re-parsed next run
+                    self.parser.invalidate_group_page(group_id)
+                    errors.append((index, group_id, e))
+                    yield GroupParseResult(index, group_id, [], e, fetch_seconds=fetch_seconds)
+                    continue
+                self.stats['parse_seconds'] += parse_seconds
+                # Strings lose their identity when pickled between processes
+                yield GroupParseResult(index, group_id, [ParsedLesson.create(*lesson) for lesson in lessons],
+                                       fetch_seconds=fetch_seconds, parse_seconds=parse_seconds)
+
+        try:
+            if self.parser.batch_fetch_enabled:
+                batch_size = self.parser.worker_batch_size
+                indexed = list(enumerate(group_ids))
+                for start in range(0, len(indexed), batch_size):
+                    fetch_executor.submit(fetch_batch, indexed[start:start + batch_size])
+            else:
+                for index, group_id in enumerate(group_ids):
+                    fetch_executor.submit(fetch, index, group_id)
+
+            while received < len(group_ids) or pending:
+                if len(pending) >= max_pending or received == len(group_ids):
+                    yield from harvest(None)
+                    continue
+
+                self.stats['peak_queue'] = max(self.stats['peak_queue'], pages.qsize())
+                wait_started = time.monotonic()
+                try:
+                    index, group_id, item, fetch_seconds = pages.get(timeout=0.05 if pending else 1)
+                except queue.Empty:
+                    self.stats['wait_fetch_seconds'] += time.monotonic() - wait_started
+                    if pending:
+                        yield from harvest(0)
+                    continue
+                self.stats['wait_fetch_seconds'] += time.monotonic() - wait_started
+                received += 1
+                self.stats['pages'] += 1
+
+                if isinstance(item, PageUnchanged):
+                    yield GroupParseResult(index, group_id, [], unchanged=True, fetch_seconds=fetch_seconds)
+                elif isinstance(item, Exception):
+                    errors.append((index, group_id, item))
+                    yield GroupParseResult(index, group_id, [], item, fetch_seconds=fetch_seconds)
+                else:
+                    pending[parse_executor.submit(parse_page, item, group_id)] = (index, group_id, fetch_seconds)
+        finally:
+            # Caller may stop iterating early: release blocked fetchers and drop queued work
+            stop.set()
+            fetch_executor.shutdown(wait=True, cancel_futures=True)
+            parse_executor.shutdown(wait=True, cancel_futures=True)
+            self.stats['wall_seconds'] = time.monotonic() - started
+
+        errors.sort(key=lambda item: item[0])
+        self.parser.last_batch_errors = [(group_id, error) for _, group_id, error in errors]
+        if errors:
+            logger.warning(f"Failed to parse {len(errors)} of {len(group_ids)} groups")
+            for _, group_id, error in errors:
+                logger.warning(f"  group {group_id}: {error}")
+
+    def format_stats(self) -> str:
+        stats = self.stats
+        return (
+            f"{stats.get('pages', 0)} pages in {stats.get('wall_seconds', 0):.1f}s: "
+            f"fetch {stats.get('fetch_seconds', 0):.1f}s (blocked on full queue {stats.get('fetch_blocked_seconds', 0):.1f}s), "
+            f"parse {stats.get('parse_seconds', 0):.1f}s CPU in {stats.get('parse_mode')}, "
+            f"waiting for pages {stats.get('wait_fetch_seconds', 0):.1f}s, peak queue {stats.get('peak_queue', 0)}"
+        )
@@ -0,0 +1,95 @@
+"""
+Compact record for a parsed lesson.
+
+A whole-university parse holds tens of thousands of lessons; as dicts each
+one carried its own hash table and its own copies of subject, teacher, room
+and URL strings. ParsedLesson is a tuple with interned strings, and the
+``time``/``date`` objects are the shared ones from the parser.
+
+For code written against the old ``List[Dict]`` output it also supports
+``lesson['subject_name']`` and ``lesson.get('room', '')``; ``to_dict`` /
+``from_dict`` convert explicitly. Django-free.
+"""
+import hashlib
+import json
+import sys
+from datetime import date, time
+from typing import Dict, Iterable, NamedTuple, Optional
+
+
+def intern_text(value: Optional[str]) -> Optional[str]:
+    """Intern non-empty string so equal strings share one object."""
+    return sys.intern(value) if value else value
+
+
+class ParsedLesson(NamedTuple):
+    """Lesson of a group schedule page (fields in the order of the old dict keys)."""
+
+    subject_name: str
+    teacher_name: Optional[str]
+    teacher_id: Optional[int]
+    teacher_url: Optional[str]
+    lesson_type: str
+    room: str
+    weekday: int
+    lesson_number: int
+    start_time: time
+    end_time: time
+    specific_date: Optional[date]
+    week_number: Optional[int]
+    # Not on rasp.sstu.ru pages; sent by clients of import_group
+    additional_info: str = ''
+
+    @classmethod
+    def create(cls, subject_name, teacher_name, teacher_id, teacher_url, lesson_type, room,
+               weekday, lesson_number, start_time, end_time, specific_date, week_number,
+               additional_info=None) -> 'ParsedLesson':
+        """Build record interning its strings."""
+        return cls(
+            intern_text(subject_name), intern_text(teacher_name), teacher_id, intern_text(teacher_url),
+            intern_text(lesson_type), intern_text(room), weekday, lesson_number,
+            start_time, end_time, specific_date, week_number, additional_info or '',
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ParsedLesson':
+        return cls.create(*(data.get(field) for field in cls._fields))
+
+    def to_dict(self) -> Dict:
+        return dict(zip(self._fields, self))
+
+    def to_payload(self) -> Dict:
+        """JSON-ready dict in the import_group API format."""
+        payload = self.to_dict()
+        payload['start_time'] = self.start_time.strftime('%H:%M:%S') if self.start_time else None
+        payload['end_time'] = self.end_time.strftime('%H:%M:%S') if self.end_time else None
+        payload['specific_date'] = self.specific_date.isoformat() if self.specific_date else None
+        return payload
+
+    # Dict adapter: lesson['room'], lesson.get('room', '')
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in self._fields else default
+
+    def keys(self):
+        return self._fields
+
+
+def lesson_set_hash(lessons: Iterable[ParsedLesson]) -> str:
+    """Canonical SHA-256 of a lesson set: independent of order, duplicates count once."""
+    rows = sorted({
+        json.dumps(lesson.to_payload(), sort_keys=True, ensure_ascii=False)
+        for lesson in lessons
+    })
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(row.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
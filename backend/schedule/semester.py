@@ -0,0 +1,110 @@
+"""
+Semester calendar: year of day headers and week numbers.
+
+Day headers on rasp.sstu.ru carry only day and month ("Понедельник 12.01").
+Semester precomputes, once per run, the date of every day/month pair around
+the semester and the week number of every semester day, so the parser
+resolves a header with one dictionary lookup. Django-free (the
+``SemesterCalendar`` model builds it from the database).
+"""
+from datetime import date, timedelta
+from typing import Dict, Optional, Tuple
+
+# Length of semester whose end is not set
+DEFAULT_SEMESTER_WEEKS = 26
+# Headers this far outside semester are still resolved to its year
+HEADER_DATE_MARGIN = 31
+
+
+def parse_semester_start(value: Optional[str]) -> Optional[date]:
+    """Semester start from ISO string (e.g. env variable), None if empty."""
+    if not value or not value.strip():
+        return None
+    return date.fromisoformat(value.strip())
+
+
+def header_date_near(day: int, month: int, today: Optional[date] = None) -> date:
+    """
+    Date of a day header placed in the year nearest to ``today``
+    (used when no semester covers ``today``).
+    Raises ValueError for impossible dates (e.g. 31.02).
+    """
+    today = today or date.today()
+    # Если парсим январь-февраль, а сейчас ноябрь-декабрь, то это следующий год
+    if month <= 2 and today.month >= 11:
+        year = today.year + 1
+    # Если парсим ноябрь-декабрь, а сейчас январь-февраль, то это прошлый год
+    elif month >= 11 and today.month <= 2:
+        year = today.year - 1
+    else:
+        year = today.year
+    return date(year, month, day)
+
+
+class Semester:
+    """Dates of one semester with precomputed lookups."""
+
+    def __init__(self, start: date, end: Optional[date] = None):
+        # Weeks are counted from Monday of the first week
+        self.start = start - timedelta(days=start.weekday())
+        self.end = end or self.start + timedelta(weeks=DEFAULT_SEMESTER_WEEKS, days=-1)
+        span = (self.end - self.start).days
+        if span < 0:
+            raise ValueError(f"Semester end {self.end} is before its start {self.start}")
+        if span >= 365:
+            raise ValueError(f"Semester {self.start} - {self.end} is longer than a year")
+        # Keep day/month pairs unique: the whole range must stay under a year
+        margin = min(HEADER_DATE_MARGIN, (364 - span) // 2)
+        self._first_header_date = self.start - timedelta(days=margin)
+        self._last_header_date = self.end + timedelta(days=margin)
+
+        # (day, month) -> date
+        self._header_dates: Dict[Tuple[int, int], date] = {}
+        day = self._first_header_date
+        while day <= self._last_header_date:
+            self._header_dates[(day.day, day.month)] = day
+            day += timedelta(days=1)
+
+        # date -> week number (1-based)
+        self._week_numbers: Dict[date, int] = {
+            self.start + timedelta(days=offset): offset // 7 + 1
+            for offset in range(span + 1)
+        }
+
+    def __repr__(self):
+        return f"Semester({self.start}, {self.end})"
+
+    def __eq__(self, other):
+        return isinstance(other, Semester) and (self.start, self.end) == (other.start, other.end)
+
+    def contains(self, day: date) -> bool:
+        return self.start <= day <= self.end
+
+    @property
+    def weeks(self) -> int:
+        return (self.end - self.start).days // 7 + 1
+
+    def header_date(self, day: int, month: int, today: Optional[date] = None) -> date:
+        """
+        Date of a day header. While ``today`` is around the semester, pairs
+        around it map to the semester's year; otherwise (e.g. a stale
+        semester) headers are placed in the year nearest to ``today``.
+        Raises ValueError for impossible dates (e.g. 31.02).
+        """
+        today = today or date.today()
+        if self._first_header_date <= today <= self._last_header_date:
+            resolved = self._header_dates.get((day, month))
+            if resolved:
+                return resolved
+        return header_date_near(day, month, today)
+
+    def week_number(self, day: Optional[date]) -> Optional[int]:
+        """Week number of a semester day, None outside semester."""
+        if day is None:
+            return None
+        return self._week_numbers.get(day)
+
+    def week_dates(self, week_number: int) -> Tuple[date, date]:
+        """Monday and Sunday of a semester week."""
+        monday = self.start + timedelta(weeks=week_number - 1)
+        return monday, monday + timedelta(days=6)
@@ -1,6 +1,6 @@
 """Serializers for schedule app."""
 from rest_framework import serializers
-from .models import Institute, Group, Teacher, Subject, Lesson, ScheduleUpdate
+from .models import Institute, Group, GroupSyncStat, Teacher, Subject, Lesson, LessonChange, ScheduleUpdate
 
 
 class InstituteSerializer(serializers.ModelSerializer):
@@ -54,9 +54,9 @@ class GroupDetailSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'sstu_id', 'institute',
             'education_form', 'degree_type', 'course_number',
-            'created_at', 'updated_at'
+            'last_synced_at', 'next_sync_at', 'sync_priority', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'last_synced_at', 'next_sync_at', 'sync_priority', 'created_at', 'updated_at']
 
 
 class LessonSerializer(serializers.ModelSerializer):
@@ -109,8 +109,37 @@ class ScheduleUpdateSerializer(serializers.ModelSerializer):
         model = ScheduleUpdate
         fields = [
             'id', 'started_at', 'finished_at', 'status', 'status_display',
-            'groups_updated', 'lessons_added', 'lessons_removed', 'error_message'
+            'groups_updated', 'groups_skipped', 'lessons_added', 'lessons_removed', 'error_message',
+            'phase_timings', 'bytes_fetched', 'heartbeat_at', 'attempts'
         ]
         read_only_fields = ['id', 'started_at', 'finished_at', 'status', 
-                           'groups_updated', 'lessons_added', 'lessons_removed', 'error_message']
+                           'groups_updated', 'groups_skipped', 'lessons_added', 'lessons_removed', 'error_message',
+                           'phase_timings', 'bytes_fetched', 'heartbeat_at', 'attempts']
+
+
+class GroupSyncStatSerializer(serializers.ModelSerializer):
+    """Per-group sync timings serializer."""
+    
+    group_name = serializers.CharField(source='group.name', read_only=True)
+    outcome_display = serializers.CharField(source='get_outcome_display', read_only=True)
+    total_ms = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = GroupSyncStat
+        fields = [
+            'group', 'group_name', 'fetch_ms', 'parse_ms', 'db_ms', 'total_ms',
+            'lessons', 'outcome', 'outcome_display', 'error'
+        ]
+        read_only_fields = fields
 
+
+class LessonChangeSerializer(serializers.ModelSerializer):
+    """Lesson change (delta feed) serializer."""
+    
+    class Meta:
+        model = LessonChange
+        fields = [
+            'id', 'group', 'update', 'lesson_id', 'natural_key', 'action',
+            'changed_fields', 'data', 'created_at'
+        ]
+        read_only_fields = fields
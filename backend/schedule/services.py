@@ -3,20 +3,88 @@ Service for synchronizing schedule data from SSTU website.
 """
 import logging
 import os
-from typing import List, Dict, Optional
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import List, Dict, Iterable, Optional
+from celery.exceptions import SoftTimeLimitExceeded
 from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
 from django.conf import settings
-from .models import Institute, Group, Teacher, Subject, Lesson, ScheduleUpdate
-from .parser import SSTUScheduleParser
+from .crawl_planner import CrawlPlan, merge_teacher_lessons, plan_crawl
+from .dimensions import DimensionResolver
+from .group_index import GroupIndexDiff, build_group_index, describe_changes, diff_group_index, group_index_entry
+from .lesson_writer import GroupLessonWriter
+from .models import Institute, Group, GroupSyncStat, Teacher, Lesson, LessonChange, ScheduleUpdate, SemesterCalendar
+from .page_archive import ArchiveSnapshot, PageArchive, update_snapshot_id
+from .page_cache import PageCache
+from .parser import DateWindow, SSTUScheduleParser
+from .pipeline import FetchParsePipeline
+from .records import ParsedLesson, lesson_set_hash
+from .sync_scheduler import reschedule_groups
+from .transport import ScheduleTransport
 
 logger = logging.getLogger(__name__)
 
+# ScheduleUpdate counter -> service stats added to it at every checkpoint
+CHECKPOINT_COUNTERS = {
+    'groups_updated': ('groups_updated',),
+    # Unchanged pages and unchanged parsed schedules alike
+    'groups_skipped': ('groups_unchanged', 'groups_skipped'),
+    'lessons_added': ('lessons_added',),
+    'lessons_removed': ('lessons_removed',),
+    'bytes_fetched': ('bytes_fetched',),
+}
+# Checkpoint at least this often (seconds) while groups are being synced
+CHECKPOINT_SECONDS = 30
+
+
+def finish_update(update: ScheduleUpdate, error: Optional[str] = None, timings: Optional[Dict] = None):
+    """
+    Close a sync with its status and phase ``timings`` (of one or more service
+    runs). Counters were already added to the row by service checkpoints.
+    """
+    update.refresh_from_db(fields=list(CHECKPOINT_COUNTERS))
+    update.status = ScheduleUpdate.Status.FAILED if error else ScheduleUpdate.Status.SUCCESS
+    update.finished_at = timezone.now()
+    update.phase_timings = {
+        phase: {key: round(value, 3) for key, value in seconds.items()}
+        for phase, seconds in (timings or {}).items()
+    }
+    if error:
+        update.error_message = error
+    update.save(update_fields=['status', 'finished_at', 'phase_timings', 'error_message'])
+    # Next sync time of every group synced in this update
+    reschedule_groups(update.id)
+    if not error:
+        prune_lesson_changes()
+
+
+def prune_lesson_changes():
+    """
+    Delete lesson changes older than SSTU_SCHEDULE_CHANGES_RETENTION_DAYS,
+    by age so client imports (no update) are pruned as well as sync changes.
+    """
+    days = getattr(settings, 'SSTU_SCHEDULE_CHANGES_RETENTION_DAYS', 30)
+    if not days:
+        return
+    deleted, _ = LessonChange.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).delete()
+    if deleted:
+        logger.info(f"Deleted {deleted} lesson changes older than {days} days")
+
 
 class ScheduleSyncService:
     """Service for synchronizing schedule data."""
     
-    def __init__(self):
+    def __init__(self, replay: Optional[str] = None, force: bool = False):
+        """
+        Args:
+            replay: Archive snapshot ID (or 'latest') to re-parse from
+                SSTU_SCHEDULE_ARCHIVE_DIR instead of fetching rasp.sstu.ru
+            force: Rewrite lessons even if group's schedule hash did not change
+        """
+        self.force = force
         # Get proxy from settings if available
         proxy = getattr(settings, 'SSTU_SCHEDULE_PROXY', None) or os.getenv('SSTU_SCHEDULE_PROXY')
         # Get Cloudflare Worker URL from settings if available
@@ -25,52 +93,308 @@ class ScheduleSyncService:
         # If using Cloudflare Worker, increase timeout as it may be slower
         if cloudflare_worker_url:
             timeout = max(timeout, 120)  # At least 120 seconds for Worker (it's slow)
-        self.parser = SSTUScheduleParser(timeout=timeout, proxy=proxy, cloudflare_worker_url=cloudflare_worker_url)
+        html_backend = getattr(settings, 'SSTU_SCHEDULE_HTML_BACKEND', None)
+        # Number of group pages fetched in parallel and cap per host
+        self.concurrency = getattr(settings, 'SSTU_SCHEDULE_CONCURRENCY', 4)
+        # Cover groups through teacher pages when that saves requests
+        self.use_teacher_pages = getattr(settings, 'SSTU_SCHEDULE_TEACHER_PAGES', False)
+        # Conditional requests / body hashes for group pages (disabled if no directory set)
+        cache_dir = getattr(settings, 'SSTU_SCHEDULE_CACHE_DIR', None)
+        page_cache = None
+        if cache_dir:
+            page_cache = PageCache(cache_dir, max_age=getattr(settings, 'SSTU_SCHEDULE_CACHE_MAX_AGE', 24 * 60 * 60))
+        max_connections_per_host = getattr(settings, 'SSTU_SCHEDULE_MAX_CONNECTIONS_PER_HOST', self.concurrency)
+        # Raw page archive: written on every fetch, read in replay mode
+        archive_dir = getattr(settings, 'SSTU_SCHEDULE_ARCHIVE_DIR', None)
+        archive = None
+        replay_snapshot = None
+        if replay:
+            if not archive_dir:
+                raise ValueError('Replay requires SSTU_SCHEDULE_ARCHIVE_DIR')
+            replay_snapshot = ArchiveSnapshot(archive_dir, replay)
+            # Every page is re-parsed: nothing is "unchanged" offline
+            page_cache = None
+        elif archive_dir:
+            archive = PageArchive(archive_dir)
+        # Past weeks are neither parsed nor rewritten (disabled if not set)
+        past_days = getattr(settings, 'SSTU_SCHEDULE_WINDOW_PAST_DAYS', None)
+        date_window = DateWindow.from_past_days(past_days) if past_days is not None else None
+        transport = ScheduleTransport(
+            timeout=timeout,
+            proxy=proxy,
+            pool_size=max(10, self.concurrency, max_connections_per_host),
+            retries=getattr(settings, 'SSTU_SCHEDULE_RETRIES', 3),
+            backoff_factor=getattr(settings, 'SSTU_SCHEDULE_BACKOFF_FACTOR', 0.5),
+            failure_threshold=getattr(settings, 'SSTU_SCHEDULE_CIRCUIT_FAILURES', 5),
+            reset_timeout=getattr(settings, 'SSTU_SCHEDULE_CIRCUIT_RESET', 60),
+            adaptive_timeout=getattr(settings, 'SSTU_SCHEDULE_ADAPTIVE_TIMEOUT', True),
+        )
+        self.parser = SSTUScheduleParser(
+            timeout=timeout,
+            proxy=proxy,
+            cloudflare_worker_url=cloudflare_worker_url,
+            html_backend=html_backend,
+            max_connections_per_host=max_connections_per_host,
+            page_cache=page_cache,
+            max_body_size=getattr(settings, 'SSTU_SCHEDULE_MAX_BODY_SIZE', 20 * 1024 * 1024),
+            transport=transport,
+            archive=archive,
+            replay=replay_snapshot,
+            date_window=date_window,
+            # Calendar is resolved once per run
+            semester=SemesterCalendar.current(),
+            worker_batch_size=getattr(settings, 'SSTU_SCHEDULE_WORKER_BATCH_SIZE', 20),
+        )
+        # Fetch in threads, parse in processes (unless disabled with 0)
+        parse_processes = getattr(settings, 'SSTU_SCHEDULE_PARSE_PROCESSES', None)
+        self.pipeline = None
+        if parse_processes != 0:
+            self.pipeline = FetchParsePipeline(
+                self.parser,
+                fetch_workers=self.concurrency,
+                parse_workers=parse_processes,
+                # Chunk tasks of a full sync share the host's cores
+                parallel_runs=getattr(settings, 'SSTU_SCHEDULE_SYNC_TASKS', 4) or 1,
+                queue_size=getattr(settings, 'SSTU_SCHEDULE_PIPELINE_QUEUE_SIZE', 16),
+            )
+        # Subjects/teachers are loaded once and shared by all groups of the run
+        self.dimensions = DimensionResolver()
+        self.lesson_writer = GroupLessonWriter(self.dimensions)
+        # ScheduleUpdate that lesson changes of this run are logged under
+        self.update_id: Optional[int] = None
         self.stats = {
+            'groups_added': 0,
+            'groups_changed': 0,
+            'groups_removed': 0,
             'groups_updated': 0,
+            'groups_unchanged': 0,  # page unchanged (page cache)
+            'groups_skipped': 0,  # parsed lessons match stored schedule hash
+            'groups_failed': 0,
             'lessons_added': 0,
+            'lessons_updated': 0,
+            'lessons_unchanged': 0,
             'lessons_removed': 0,
+            'teacher_pages': 0,
+            'requests_saved': 0,
+            'bytes_fetched': 0,
         }
+        # Phase -> {'wall': seconds, 'cpu': seconds}, see timed_phase
+        self.timings: Dict[str, Dict[str, float]] = {}
+        # Per-group timings, saved at checkpoints (only with update_id)
+        self.group_stats: List[GroupSyncStat] = []
+        # Checkpoint every N groups: results so far are saved, so an interrupted
+        # update can be resumed without syncing those groups again
+        self.checkpoint_every = getattr(settings, 'SSTU_SCHEDULE_CHECKPOINT_GROUPS', 20)
+        self._checkpointed: Dict[str, int] = {}
+        self._checkpoint_at = time.monotonic()
     
     def sync_all(self) -> ScheduleUpdate:
         """Sync all schedule data."""
         update = ScheduleUpdate.objects.create(
             status=ScheduleUpdate.Status.IN_PROGRESS
         )
+        self.bind_update(update.id)
         
         try:
             logger.info("Starting schedule synchronization")
+            with self.timed_phase('index'):
+                groups = self.sync_group_index()
+            self.checkpoint(group_ids=[group.sstu_id for group in groups if group.sstu_id])
             
-            # Parse main page
-            institutes_data = self.parser.parse_main_page()
-            if not institutes_data:
-                raise Exception("Failed to parse main page")
-            
-            # Process each institute
-            for institute_data in institutes_data:
-                self._process_institute(institute_data)
-            
-            # Mark update as successful
-            update.status = ScheduleUpdate.Status.SUCCESS
-            update.finished_at = timezone.now()
-            update.groups_updated = self.stats['groups_updated']
-            update.lessons_added = self.stats['lessons_added']
-            update.lessons_removed = self.stats['lessons_removed']
-            update.save()
+            # Fetch and save group schedules
+            with self.timed_phase('groups'):
+                self._sync_groups(groups)
             
+            finish_update(update, timings=self.timings)
             logger.info(f"Schedule synchronization completed: {self.stats}")
+            self.log_fetch_stats()
             
+        except SoftTimeLimitExceeded:
+            # Progress is checkpointed: the update stays in progress and is resumed
+            logger.warning(f"Schedule synchronization {update.id} hit the time limit")
+            raise
         except Exception as e:
             logger.error(f"Schedule synchronization failed: {e}")
-            update.status = ScheduleUpdate.Status.FAILED
-            update.finished_at = timezone.now()
-            update.error_message = str(e)
-            update.save()
+            finish_update(update, error=str(e), timings=self.timings)
         
         return update
     
-    def _process_institute(self, institute_data: Dict):
-        """Process single institute and its groups."""
+    def sync_group_index(self) -> List[Group]:
+        """Parse main page, save institutes and changed groups, return groups to sync."""
+        institutes_data = self.parser.parse_main_page()
+        if not institutes_data:
+            raise Exception("Failed to parse main page")
+        
+        # Compare main page with stored groups, write only what changed
+        existing_groups = {group.name: group for group in Group.objects.select_related('institute')}
+        diff = self._diff_groups(institutes_data, existing_groups)
+        
+        # Process each institute
+        groups = []
+        for institute_data in institutes_data:
+            groups.extend(self._process_institute(institute_data, diff, existing_groups))
+        self.stats['bytes_fetched'] = self.parser.fetch_stats['bytes_read']
+        return groups
+    
+    def sync_groups(self, group_ids: List[int], update_id: Optional[int] = None) -> Dict:
+        """Sync schedules of given groups (SSTU IDs) as part of ScheduleUpdate ``update_id``, return stats of this run."""
+        self.bind_update(update_id)
+        groups = list(Group.objects.filter(sstu_id__in=group_ids))
+        missing = len(set(group_ids)) - len(groups)
+        if missing:
+            logger.warning(f"{missing} groups to sync not found")
+        with self.timed_phase('groups'):
+            self._sync_groups(groups)
+        return dict(self.stats)
+    
+    def bind_update(self, update_id: Optional[int]):
+        """
+        Run as part of ScheduleUpdate ``update_id``: log changes and group
+        results under it and archive pages into its snapshot, shared by every
+        chunk and resume task of the update.
+        """
+        self.update_id = update_id
+        archive = self.parser.archive
+        if archive is None or update_id is None:
+            return
+        started_at = ScheduleUpdate.objects.filter(pk=update_id).values_list('started_at', flat=True).first()
+        if started_at:
+            archive.snapshot = update_snapshot_id(update_id, started_at)
+    
+    @contextmanager
+    def timed_phase(self, name: str):
+        """Add wall and process CPU time of the block to phase ``name``."""
+        wall, cpu = time.monotonic(), time.process_time()
+        try:
+            yield
+        finally:
+            self._add_timing(name, wall=time.monotonic() - wall, cpu=time.process_time() - cpu)
+    
+    def _add_timing(self, name: str, **seconds: float):
+        phase = self.timings.setdefault(name, {})
+        for key, value in seconds.items():
+            phase[key] = phase.get(key, 0.0) + value
+    
+    def _record_group(self, group: Group, outcome: str, fetch_seconds: float = 0.0, parse_seconds: float = 0.0,
+                      db_seconds: float = 0.0, lessons: int = 0, error: str = '', page_fetched: bool = False):
+        """
+        Collect per-group timings of a run tied to a ScheduleUpdate, checkpoint
+        every N groups. ``page_fetched``: the group's own page was downloaded
+        from the site (counted against SSTU_SCHEDULE_HOURLY_BUDGET).
+        """
+        if self.update_id is None:
+            return
+        self.group_stats.append(GroupSyncStat(
+            update_id=self.update_id,
+            group=group,
+            fetch_ms=round(fetch_seconds * 1000),
+            parse_ms=round(parse_seconds * 1000),
+            db_ms=round(db_seconds * 1000),
+            lessons=lessons,
+            outcome=outcome,
+            error=error,
+            page_fetched=page_fetched and self.parser.replay is None,
+            synced_at=timezone.now(),
+        ))
+        if (len(self.group_stats) >= self.checkpoint_every
+                or time.monotonic() - self._checkpoint_at >= CHECKPOINT_SECONDS):
+            self.checkpoint()
+    
+    def _save_timed(self, group: Group, lessons_data: List[ParsedLesson], page_fetched: bool = False,
+                    **timings: float) -> bool:
+        """Save group lessons, record DB time and the group's outcome. Raises like _save_group_lessons."""
+        wall, cpu = time.monotonic(), time.process_time()
+        outcome, error = GroupSyncStat.Outcome.FAILED, ''
+        try:
+            saved = self._save_group_lessons(group, lessons_data)
+            self.parser.commit_group_page(group.sstu_id)
+            if saved:
+                outcome = GroupSyncStat.Outcome.UPDATED
+            elif lessons_data:
+                outcome = GroupSyncStat.Outcome.SKIPPED
+            else:
+                outcome = GroupSyncStat.Outcome.EMPTY
+            return saved
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            db_seconds = time.monotonic() - wall
+            self._add_timing('db', wall=db_seconds, cpu=time.process_time() - cpu)
+            self._record_group(group, outcome, db_seconds=db_seconds, lessons=len(lessons_data),
+                               error=error, page_fetched=page_fetched, **timings)
+    
+    def checkpoint(self, group_ids: Optional[List[int]] = None):
+        """
+        Save group results and counter increments since the last checkpoint to
+        the update and refresh its heartbeat; ``group_ids`` (SSTU IDs) sets the
+        groups the update has to sync.
+        """
+        self.stats['bytes_fetched'] = self.parser.fetch_stats['bytes_read']
+        if self.update_id is None:
+            return
+        self._checkpoint_at = time.monotonic()
+        if self.group_stats:
+            GroupSyncStat.objects.bulk_create(self.group_stats, batch_size=500)
+            self.group_stats = []
+        values = {'heartbeat_at': timezone.now()}
+        for field, keys in CHECKPOINT_COUNTERS.items():
+            total = sum(self.stats.get(key, 0) for key in keys)
+            if total != self._checkpointed.get(field, 0):
+                values[field] = F(field) + (total - self._checkpointed.get(field, 0))
+                self._checkpointed[field] = total
+        if group_ids is not None:
+            values['group_ids'] = sorted(set(group_ids))
+        ScheduleUpdate.objects.filter(pk=self.update_id).update(**values)
+    
+    def log_fetch_stats(self):
+        """Log page fetching, cache and archive stats of this run."""
+        logger.info(f"Page fetching: {self.parser.fetch_stats}")
+        logger.info(f"Subjects/teachers: {self.dimensions.stats}")
+        if self.pipeline and self.pipeline.stats:
+            logger.info(f"Fetch/parse pipeline: {self.pipeline.format_stats()}")
+        if self.parser.page_cache:
+            logger.info(f"Page cache: {self.parser.page_cache.stats}")
+        if self.parser.archive:
+            logger.info(f"Page archive snapshot {self.parser.archive.snapshot}: {self.parser.archive.stats}")
+        if self.parser.replay:
+            logger.info(f"Replayed archive snapshot {self.parser.replay.snapshot}: {self.parser.replay.stats}")
+    
+    def _diff_groups(self, institutes_data: List[Dict], existing_groups: Dict[str, Group]) -> GroupIndexDiff:
+        """Diff main page group index against stored groups (the previous snapshot)."""
+        snapshot = {
+            name: group_index_entry(
+                {
+                    'name': group.name,
+                    'sstu_id': group.sstu_id,
+                    'education_form': group.education_form,
+                    'degree_type': group.degree_type,
+                    'course_number': group.course_number,
+                },
+                group.institute.sstu_id if group.institute else None,
+            )
+            for name, group in existing_groups.items()
+        }
+        diff = diff_group_index(snapshot, build_group_index(institutes_data))
+        
+        self.stats['groups_added'] = len(diff.added)
+        self.stats['groups_changed'] = len(diff.changed)
+        # Groups missing from main page are kept (pages disappear temporarily between semesters)
+        self.stats['groups_removed'] = len(diff.removed)
+        
+        logger.info(f"Main page groups: {diff.summary()}")
+        for line in describe_changes(diff):
+            logger.debug(f"  {line}")
+        return diff
+    
+    def _process_institute(self, institute_data: Dict, diff: Optional[GroupIndexDiff] = None,
+                           existing_groups: Optional[Dict[str, Group]] = None) -> List[Group]:
+        """
+        Process single institute and its groups, return groups to sync.
+        
+        With ``diff``, groups that did not change since the last run are taken
+        from ``existing_groups`` without touching the DB.
+        """
         # Get or create institute
         institute, _ = Institute.objects.get_or_create(
             sstu_id=institute_data.get('sstu_id'),
@@ -83,11 +407,18 @@ class ScheduleSyncService:
             institute.save()
         
         # Process groups
+        groups = []
         for group_data in institute_data['groups']:
-            self._process_group(group_data, institute)
+            if diff is not None and group_data['name'] in diff.unchanged:
+                groups.append(existing_groups[group_data['name']])
+                continue
+            group = self._process_group(group_data, institute)
+            if group:
+                groups.append(group)
+        return groups
     
-    def _process_group(self, group_data: Dict, institute: Institute):
-        """Process single group and its schedule."""
+    def _process_group(self, group_data: Dict, institute: Institute) -> Optional[Group]:
+        """Create or update single group."""
         try:
             # Get or create group
             defaults = {
@@ -114,118 +445,211 @@ class ScheduleSyncService:
                     defaults=defaults
                 )
             
-            # Parse group schedule
-            if group.sstu_id:
-                self._sync_group_schedule(group)
-                self.stats['groups_updated'] += 1
+            return group
             
         except Exception as e:
             logger.error(f"Error processing group {group_data.get('name')}: {e}")
+            return None
+    
+    def _sync_groups(self, groups: List[Group]):
+        """Fetch group schedules concurrently and save each one as it arrives."""
+        groups_by_sstu_id = {group.sstu_id: group for group in groups if group.sstu_id}
+        
+        try:
+            group_ids = list(groups_by_sstu_id)
+            if self.use_teacher_pages:
+                with self.timed_phase('teacher_pages'):
+                    group_ids = self._sync_from_teacher_pages(groups_by_sstu_id)
+            
+            if self.pipeline:
+                results = self.pipeline.run_groups(group_ids)
+            else:
+                results = self.parser.parse_many_groups(group_ids, concurrency=self.concurrency)
+            for result in results:
+                group = groups_by_sstu_id[result.group_id]
+                # Summed over fetch threads / parse workers, so may exceed the phase wall time
+                self._add_timing('fetch', wall=result.fetch_seconds)
+                self._add_timing('parse', cpu=result.parse_seconds)
+                timings = {'fetch_seconds': result.fetch_seconds, 'parse_seconds': result.parse_seconds}
+                if result.error:
+                    logger.error(f"Error parsing schedule for group {group.name}: {result.error}")
+                    self.stats['groups_failed'] += 1
+                    self._record_group(group, GroupSyncStat.Outcome.FAILED, error=str(result.error),
+                                       page_fetched=True, **timings)
+                    continue
+                if result.unchanged:
+                    logger.debug(f"Schedule page of group {group.name} unchanged, skipping")
+                    self.stats['groups_unchanged'] += 1
+                    self._record_group(group, GroupSyncStat.Outcome.UNCHANGED, **timings)
+                    self._page_checked(group)
+                    continue
+                try:
+                    if self._save_timed(group, result.lessons, page_fetched=True, **timings):
+                        self.stats['groups_updated'] += 1
+                    self._page_checked(group)
+                except SoftTimeLimitExceeded:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error processing group {group.name}: {e}")
+                    self.stats['groups_failed'] += 1
+                    # Make sure the page is re-parsed next run
+                    self.parser.invalidate_group_page(group.sstu_id)
+        finally:
+            self.checkpoint()
+    
+    def _plan_crawl(self, groups_by_sstu_id: Dict[int, Group]) -> CrawlPlan:
+        """
+        Plan teacher/group pages from group-teacher pairs of stored lessons.
+        Groups whose own page was not checked within
+        SSTU_SCHEDULE_GROUP_PAGE_MAX_AGE_HOURS are fetched from it: only
+        there lessons of teachers not yet stored show up.
+        """
+        pairs = Lesson.objects.filter(
+            group__sstu_id__in=groups_by_sstu_id.keys(),
+            is_active=True,
+        ).values_list('group__sstu_id', 'teacher__sstu_id').distinct()
+        
+        checked_after = timezone.now() - timedelta(hours=getattr(settings, 'SSTU_SCHEDULE_GROUP_PAGE_MAX_AGE_HOURS', 24))
+        group_teachers = {}
+        pinned = {
+            sstu_id for sstu_id, group in groups_by_sstu_id.items()
+            if group.page_checked_at is None or group.page_checked_at < checked_after
+        }
+        for group_id, teacher_id in pairs:
+            if teacher_id is None:
+                # Lessons without teacher are only on the group page
+                pinned.add(group_id)
+            else:
+                group_teachers.setdefault(group_id, set()).add(teacher_id)
+        
+        return plan_crawl(groups_by_sstu_id.keys(), group_teachers, pinned)
+    
+    def _sync_from_teacher_pages(self, groups_by_sstu_id: Dict[int, Group]) -> List[int]:
+        """
+        Save schedules of groups covered by teacher pages, return group IDs
+        that still have to be fetched from their own pages.
+        """
+        plan = self._plan_crawl(groups_by_sstu_id)
+        logger.info(
+            f"Crawl plan: {len(plan.teacher_pages)} teacher pages + {len(plan.group_pages)} group pages "
+            f"instead of {plan.baseline_requests} group pages"
+        )
+        if not plan.teacher_pages:
+            return plan.group_pages
+        
+        teacher_lessons = {}
+        failed_teachers = []
+        for result in self.parser.parse_many_teachers(plan.teacher_pages, concurrency=self.concurrency):
+            if result.error:
+                failed_teachers.append(result.teacher_id)
+            else:
+                teacher_lessons[result.teacher_id] = result.lessons
+        
+        teacher_info = {
+            teacher.sstu_id: {'teacher_name': teacher.full_name, 'teacher_url': teacher.sstu_profile_url or None}
+            for teacher in Teacher.objects.filter(sstu_id__in=plan.teacher_pages)
+        }
+        group_names = {group.name: sstu_id for sstu_id, group in groups_by_sstu_id.items()}
+        merged = merge_teacher_lessons(plan, teacher_lessons, group_names, teacher_info)
+        
+        # Groups whose teacher pages failed or gave nothing fall back to group pages
+        fallback = set(plan.groups_depending_on(failed_teachers))
+        for group_id, lessons_data in merged.items():
+            group = groups_by_sstu_id[group_id]
+            if not lessons_data:
+                fallback.add(group_id)
+                continue
+            try:
+                if self._save_timed(group, lessons_data):
+                    self.stats['groups_updated'] += 1
+            except SoftTimeLimitExceeded:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing group {group.name}: {e}")
+                self.stats['groups_failed'] += 1
+        
+        self.stats['teacher_pages'] = len(plan.teacher_pages)
+        self.stats['requests_saved'] = plan.requests_saved - len(fallback)
+        if fallback:
+            logger.warning(f"{len(fallback)} groups not covered by teacher pages, fetching their group pages")
+        return plan.group_pages + sorted(fallback)
     
-    @transaction.atomic
     def _sync_group_schedule(self, group: Group):
         """Sync schedule for specific group."""
+        # Page tree is released week by week while lessons are collected for the diff
+        lessons_data = self.parser.parse_group_schedule_iter(group.sstu_id)
+        self._save_group_lessons(group, lessons_data)
+        self.parser.commit_group_page(group.sstu_id)
+        self._page_checked(group)
+    
+    @staticmethod
+    def _page_checked(group: Group):
+        """Record that the group's own page was fetched (see _plan_crawl)."""
+        now = timezone.now()
+        Group.objects.filter(pk=group.pk).update(page_checked_at=now)
+        group.page_checked_at = now
+    
+    @transaction.atomic
+    def _save_group_lessons(self, group: Group, lessons_data: Iterable[ParsedLesson]) -> bool:
+        """
+        Replace group's lessons with parsed ones (list or lazy iterator).
+        
+        If the hash of parsed lessons equals the group's stored schedule hash,
+        nothing is written and False is returned. Otherwise stored lessons are
+        diffed with parsed ones by natural key and only the difference is
+        written. With a date window only lessons inside it (and lessons
+        without date) are replaced, earlier lessons are kept as they are.
+        """
         try:
-            # Parse schedule
-            lessons_data = self.parser.parse_group_schedule(group.sstu_id)
-            
+            lessons_data = list(lessons_data)
             if not lessons_data:
                 logger.warning(f"No lessons found for group {group.name}")
-                return
+                return False
             
-            # Mark all existing lessons as inactive
-            old_lessons = Lesson.objects.filter(group=group, is_active=True)
-            old_count = old_lessons.count()
-            old_lessons.update(is_active=False)
+            now = timezone.now()
+            schedule_hash = lesson_set_hash(lessons_data)
+            if schedule_hash == group.schedule_hash and not self.force:
+                Group.objects.filter(pk=group.pk).update(last_synced_at=now)
+                group.last_synced_at = now
+                self.stats['groups_skipped'] += 1
+                logger.debug(f"Schedule of group {group.name} unchanged, skipping")
+                return False
             
-            # Create or update lessons
-            for lesson_data in lessons_data:
-                self._create_or_update_lesson(lesson_data, group)
+            existing = self._window_lessons(Lesson.objects.filter(group=group))
+            result = self.lesson_writer.write(group, lessons_data, existing, update_id=self.update_id)
             
-            # Remove old inactive lessons
-            removed = Lesson.objects.filter(group=group, is_active=False).delete()[0]
+            self.stats['lessons_added'] += result.created
+            self.stats['lessons_updated'] += result.updated
+            self.stats['lessons_unchanged'] += result.unchanged
+            self.stats['lessons_removed'] += result.removed
             
-            self.stats['lessons_added'] += len(lessons_data)
-            self.stats['lessons_removed'] += removed
+            Group.objects.filter(pk=group.pk).update(schedule_hash=schedule_hash, last_synced_at=now)
+            group.schedule_hash = schedule_hash
+            group.last_synced_at = now
             
-            logger.info(f"Synced {len(lessons_data)} lessons for group {group.name}")
+            logger.info(
+                f"Synced {len(lessons_data)} lessons for group {group.name}: "
+                f"{result.created} added, {result.updated} updated, {result.removed} removed"
+            )
+            return True
             
         except Exception as e:
             logger.error(f"Error syncing schedule for group {group.name}: {e}")
+            # IDs created in the rolled back transaction must not be reused
+            self.dimensions.invalidate()
             raise
     
-    def _create_or_update_lesson(self, lesson_data: Dict, group: Group):
-        """Create or update single lesson."""
-        # Get or create subject
-        subject, _ = Subject.objects.get_or_create(
-            name=lesson_data['subject_name']
-        )
-        
-        # Get or create teacher
-        teacher = None
-        if lesson_data.get('teacher_name'):
-            teacher_defaults = {
-                'full_name': lesson_data['teacher_name'],
-            }
-            if lesson_data.get('teacher_url'):
-                teacher_defaults['sstu_profile_url'] = lesson_data['teacher_url']
-            
-            if lesson_data.get('teacher_id'):
-                teacher, _ = Teacher.objects.get_or_create(
-                    sstu_id=lesson_data['teacher_id'],
-                    defaults=teacher_defaults
-                )
-            else:
-                teacher, _ = Teacher.objects.get_or_create(
-                    full_name=lesson_data['teacher_name'],
-                    defaults=teacher_defaults
-                )
-        
-        # Create lesson
-        lesson_defaults = {
-            'group': group,
-            'subject': subject,
-            'teacher': teacher,
-            'lesson_type': lesson_data['lesson_type'],
-            'room': lesson_data.get('room', ''),
-            'weekday': lesson_data['weekday'],
-            'lesson_number': lesson_data['lesson_number'],
-            'start_time': lesson_data['start_time'],
-            'end_time': lesson_data['end_time'],
-            'specific_date': lesson_data.get('specific_date'),
-            'week_number': lesson_data.get('week_number'),
-            'is_active': True,
-        }
-        
-        # Try to find existing lesson
-        # Теперь все занятия имеют specific_date (дату из заголовка дня)
-        # Ищем по группе, дате, дню недели, номеру пары, предмету и преподавателю
-        lookup_fields = {
-            'group': group,
-            'weekday': lesson_data['weekday'],
-            'lesson_number': lesson_data['lesson_number'],
-            'subject': subject,
-        }
-        
-        if lesson_data.get('specific_date'):
-            lookup_fields['specific_date'] = lesson_data['specific_date']
-        else:
-            lookup_fields['specific_date__isnull'] = True
-        
-        # Если есть преподаватель, добавляем его в поиск для более точного совпадения
-        if teacher:
-            lookup_fields['teacher'] = teacher
-        
-        existing = Lesson.objects.filter(**lookup_fields).first()
-        
-        if existing:
-            # Update existing lesson
-            for key, value in lesson_defaults.items():
-                setattr(existing, key, value)
-            existing.save()
-        else:
-            # Create new lesson
-            Lesson.objects.create(**lesson_defaults)
+    def _window_lessons(self, lessons):
+        """Narrow lesson queryset to the parser's date window."""
+        window = self.parser.date_window
+        if window is None:
+            return lessons
+        in_window = Q()
+        if window.start:
+            in_window &= Q(specific_date__gte=window.start)
+        if window.end:
+            in_window &= Q(specific_date__lte=window.end)
+        return lessons.filter(in_window | Q(specific_date__isnull=True))
     
     def sync_single_group(self, group_id: int) -> bool:
         """Sync schedule for single group by SSTU ID."""
@@ -0,0 +1,162 @@
+"""
+Single-flight sync jobs: a Redis lease per job name (full sync, one group).
+
+The API acquires the lease for a new Celery task ID before enqueuing the
+task (``SET NX``), so concurrent requests collapse into one job and get its
+ID back instead of enqueuing duplicates. A queued job cannot renew its
+lease, so it is taken with SSTU_SCHEDULE_LEASE_QUEUE_TTL (longer than the
+queue delay); the same TTL is set when a task hands the lease on to
+follow-up tasks. The task adopts the lease when it starts, shortening it to
+SSTU_SCHEDULE_LEASE_TTL, and a background thread renews it every TTL/3
+while it runs; the lease expires by itself if the worker dies. Renew and
+release only touch a lease still held by the same job (compare-and-set in
+Lua).
+
+If Redis is unreachable, jobs run without coalescing rather than failing.
+"""
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'sstu:schedule:lease:'
+FULL_SYNC = 'full-sync'
+
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_client = None
+
+
+def get_client() -> redis.Redis:
+    global _client
+    if _client is None:
+        url = getattr(settings, 'SSTU_SCHEDULE_LEASE_REDIS_URL', None) or settings.CELERY_BROKER_URL
+        _client = redis.Redis.from_url(url, socket_timeout=5, socket_connect_timeout=5, decode_responses=True)
+    return _client
+
+
+def queue_ttl() -> int:
+    """Lease TTL (seconds) while its job waits in the Celery queue."""
+    return getattr(settings, 'SSTU_SCHEDULE_LEASE_QUEUE_TTL', 3600)
+
+
+def group_lease_name(group_id: int) -> str:
+    """Lease name of a single group sync (SSTU group ID)."""
+    return f'group:{group_id}'
+
+
+class Lease:
+    """Lease ``name`` held by job ``job_id`` (Celery task ID) for ``ttl`` seconds unless renewed."""
+
+    def __init__(self, name: str, job_id: str, ttl: Optional[int] = None, client=None):
+        self.name = name
+        self.key = KEY_PREFIX + name
+        self.job_id = job_id
+        self.ttl = ttl or getattr(settings, 'SSTU_SCHEDULE_LEASE_TTL', 120)
+        self.client = client or get_client()
+
+    def acquire(self) -> Optional[str]:
+        """Take the lease if free (or keep it if already ours); return the job holding it."""
+        try:
+            for _ in range(2):
+                if self.client.set(self.key, self.job_id, nx=True, px=self.ttl * 1000):
+                    return self.job_id
+                holder = self.client.get(self.key)
+                if holder == self.job_id:
+                    self.renew()
+                    return holder
+                if holder is not None:
+                    return holder
+                # Expired between SET and GET: try once more
+            return self.client.get(self.key)
+        except redis.RedisError as e:
+            logger.warning(f"Sync lease {self.name} unavailable, running without it: {e}")
+            return self.job_id
+
+    def renew(self, ttl: Optional[int] = None) -> bool:
+        """Extend the lease to ``ttl`` seconds (default: own TTL) if still held by this job."""
+        try:
+            return bool(self.client.eval(RENEW_SCRIPT, 1, self.key, self.job_id, (ttl or self.ttl) * 1000))
+        except redis.RedisError as e:
+            logger.warning(f"Failed to renew sync lease {self.name}: {e}")
+            return False
+
+    def release(self):
+        try:
+            self.client.eval(RELEASE_SCRIPT, 1, self.key, self.job_id)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release sync lease {self.name}: {e}")
+
+    @contextmanager
+    def hold(self, release: bool = True):
+        """
+        Acquire the lease and renew it in the background until the block
+        exits; yields False if another job holds it. With ``release=False``
+        the lease is left to a follow-up task for the queue TTL (it expires
+        if none takes it over).
+        """
+        held = self.acquire() == self.job_id
+        stop = threading.Event()
+        renewer = threading.Thread(target=self._renew_until, args=(stop,), daemon=True)
+        if held:
+            renewer.start()
+        try:
+            yield held
+        finally:
+            stop.set()
+            if held:
+                # A renewal in flight must not shorten the hand-off TTL
+                renewer.join()
+                if release:
+                    self.release()
+                else:
+                    self.renew(queue_ttl())
+
+    def _renew_until(self, stop: threading.Event):
+        while not stop.wait(self.ttl / 3):
+            if not self.renew():
+                logger.warning(f"Sync lease {self.name} of job {self.job_id} was lost")
+                return
+
+
+def current_holder(name: str) -> Optional[str]:
+    """Job currently holding lease ``name`` (None if free or Redis is unreachable)."""
+    try:
+        return get_client().get(KEY_PREFIX + name)
+    except redis.RedisError:
+        return None
+
+
+def single_flight(name: str, task, args=()) -> Tuple[str, bool]:
+    """
+    Enqueue ``task`` with ``args`` unless a job holding lease ``name`` is in
+    flight; return (job ID, whether a new job was enqueued).
+    """
+    # The task renews the lease only once it starts: cover its wait in the queue
+    lease = Lease(name, str(uuid.uuid4()), ttl=queue_ttl())
+    holder = lease.acquire()
+    if holder != lease.job_id:
+        return holder, False
+    try:
+        task.apply_async(args=args, task_id=lease.job_id)
+    except Exception:
+        lease.release()
+        raise
+    return lease.job_id, True
@@ -0,0 +1,168 @@
+"""
+Demand-aware sync scheduling: refresh hot or volatile groups often, dormant ones rarely.
+
+Each group gets a priority from
+  - students: users with ``User.group`` set to it,
+  - request_rate: smoothed schedule API requests per hour for it,
+  - change_rate: smoothed share of its syncs whose lessons (schedule hash)
+    actually changed,
+and is synced again ``base interval / priority`` after its last sync,
+clamped to [SSTU_SCHEDULE_MIN_INTERVAL_MINUTES, SSTU_SCHEDULE_MAX_INTERVAL_HOURS].
+A beat tick (``schedule.sync_due_groups``) syncs due groups by descending
+priority, fetching at most SSTU_SCHEDULE_HOURLY_BUDGET group pages per hour
+(GroupSyncStat rows of every sync, full syncs included, whose group page
+was downloaded within the last hour). Ticks are skipped while a full sync
+is queued or running.
+
+API requests are counted in process memory and added to Group.request_count
+about once a minute (the cache is per-process, so it cannot hold counters);
+every tick folds request_count into request_rate.
+"""
+import logging
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Group, GroupSyncStat
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest sync outcome in change_rate
+CHANGE_RATE_ALPHA = 0.3
+# request_rate averages over about this many hours
+REQUEST_RATE_WINDOW_HOURS = 6
+# Seconds API request counts are kept in memory before being written
+REQUEST_FLUSH_SECONDS = 60
+
+
+def group_priority(students: int, request_rate: float, change_rate: float) -> float:
+    """Sync priority: demand (students, requests per hour) times volatility."""
+    demand = 1 + math.log1p(students) + math.log1p(request_rate)
+    return demand * (0.1 + change_rate)
+
+
+def sync_interval(priority: float) -> timedelta:
+    """Time until the next sync of a group with given priority."""
+    base = getattr(settings, 'SSTU_SCHEDULE_BASE_INTERVAL_HOURS', 6) * 3600
+    minimum = getattr(settings, 'SSTU_SCHEDULE_MIN_INTERVAL_MINUTES', 30) * 60
+    maximum = getattr(settings, 'SSTU_SCHEDULE_MAX_INTERVAL_HOURS', 24) * 3600
+    seconds = base / priority if priority > 0 else maximum
+    return timedelta(seconds=min(max(seconds, minimum), maximum))
+
+
+class RequestCounter:
+    """Per-process schedule request counts, added to Group.request_count every REQUEST_FLUSH_SECONDS."""
+
+    def __init__(self, flush_interval: float = REQUEST_FLUSH_SECONDS):
+        self.flush_interval = flush_interval
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def record(self, group_id: int):
+        with self._lock:
+            self._counts[group_id] += 1
+            if time.monotonic() - self._flushed_at < self.flush_interval:
+                return
+            counts, self._counts = self._counts, Counter()
+            self._flushed_at = time.monotonic()
+        self.flush(counts)
+
+    @staticmethod
+    def flush(counts: Dict[int, int]):
+        # One UPDATE per distinct count, not per group
+        by_count = defaultdict(list)
+        for group_id, count in counts.items():
+            by_count[count].append(group_id)
+        try:
+            for count, group_ids in by_count.items():
+                Group.objects.filter(pk__in=group_ids).update(request_count=F('request_count') + count)
+        except Exception as e:
+            logger.warning(f"Failed to save schedule request counts: {e}")
+
+
+request_counter = RequestCounter()
+
+
+def record_group_request(group_id: Optional[int]):
+    """Count a schedule API request for group ``group_id`` (Group.pk)."""
+    if group_id:
+        request_counter.record(group_id)
+
+
+def fold_request_counts(tick_minutes: float):
+    """Fold requests counted since the previous tick into request_rate and reset the counts."""
+    alpha = min(1.0, tick_minutes / (REQUEST_RATE_WINDOW_HOURS * 60))
+    # Single UPDATE: both columns are computed from the same row values,
+    # so requests counted concurrently are not lost
+    Group.objects.filter(Q(request_count__gt=0) | Q(request_rate__gt=0.01)).update(
+        request_rate=F('request_rate') * (1 - alpha) + F('request_count') * (alpha * 60 / tick_minutes),
+        request_count=0,
+    )
+
+
+def hourly_budget_left(now=None) -> int:
+    """Group pages that may still be fetched within the current rolling hour."""
+    now = now or timezone.now()
+    budget = getattr(settings, 'SSTU_SCHEDULE_HOURLY_BUDGET', 600)
+    # By the time of each group, not of its update: a long full sync counts
+    # only its last hour; teacher-page, cached and replayed groups cost no page
+    used = GroupSyncStat.objects.filter(synced_at__gte=now - timedelta(hours=1), page_fetched=True).count()
+    return max(0, budget - used)
+
+
+def due_groups(limit: int, now=None) -> List[Group]:
+    """Up to ``limit`` groups whose next sync is due (never synced first, then by priority)."""
+    if limit <= 0:
+        return []
+    now = now or timezone.now()
+    groups = list(
+        Group.objects.filter(sstu_id__isnull=False)
+        .filter(Q(next_sync_at__isnull=True) | Q(next_sync_at__lte=now))
+        .annotate(students_count=Count('students'))
+    )
+    for group in groups:
+        group.sync_priority = group_priority(group.students_count, group.request_rate, group.change_rate)
+    groups.sort(key=lambda group: (group.next_sync_at is not None, -group.sync_priority))
+    return groups[:limit]
+
+
+def plan_tick(now=None) -> List[int]:
+    """Fold request counts and return SSTU IDs of groups to sync in this tick."""
+    now = now or timezone.now()
+    tick_minutes = getattr(settings, 'SSTU_SCHEDULE_TICK_MINUTES', 10)
+    fold_request_counts(tick_minutes)
+    # Spread the hourly budget evenly over ticks
+    per_tick = math.ceil(getattr(settings, 'SSTU_SCHEDULE_HOURLY_BUDGET', 600) * tick_minutes / 60)
+    limit = min(per_tick, hourly_budget_left(now))
+    groups = due_groups(limit, now)
+    logger.info(f"Sync tick: {len(groups)} due groups (budget {limit})")
+    return [group.sstu_id for group in groups]
+
+
+def reschedule_groups(update_id: int, now=None):
+    """Update change_rate, priority and next sync time of groups synced in ScheduleUpdate ``update_id``."""
+    now = now or timezone.now()
+    outcomes = dict(GroupSyncStat.objects.filter(update_id=update_id).values_list('group_id', 'outcome'))
+    if not outcomes:
+        return
+    retry = timedelta(minutes=getattr(settings, 'SSTU_SCHEDULE_MIN_INTERVAL_MINUTES', 30))
+    groups = list(Group.objects.filter(pk__in=outcomes).annotate(students_count=Count('students')))
+    for group in groups:
+        outcome = outcomes[group.pk]
+        if outcome != GroupSyncStat.Outcome.FAILED:
+            changed = 1.0 if outcome == GroupSyncStat.Outcome.UPDATED else 0.0
+            group.change_rate = (1 - CHANGE_RATE_ALPHA) * group.change_rate + CHANGE_RATE_ALPHA * changed
+        group.sync_priority = group_priority(group.students_count, group.request_rate, group.change_rate)
+        if outcome == GroupSyncStat.Outcome.FAILED:
+            group.next_sync_at = now + retry
+        else:
+            group.next_sync_at = now + sync_interval(group.sync_priority)
+    Group.objects.bulk_update(groups, ['change_rate', 'sync_priority', 'next_sync_at'], batch_size=500)
@@ -1,22 +1,120 @@
 """
 Celery tasks for schedule synchronization.
+
+Full sync is split into a coordinator (``sync_all_schedules``: main page,
+institutes and groups) and ``sync_group_chunk`` tasks run as a chord, so
+group schedules are synced by several workers in parallel. The chord
+callback ``finish_schedule_sync`` closes the ScheduleUpdate with summed
+phase timings.
+
+Progress is checkpointed to the ScheduleUpdate (planned groups, per-group
+results, counters, heartbeat). An update whose heartbeat stopped (worker
+crash or restart) or that hit the soft time limit is resumed by
+``resume_schedule_sync``: only groups without a result are synced again.
+
+Full and single-group syncs are single-flight (see sync_lease): the full
+sync lease is taken by ``sync_all_schedules`` (or the API before enqueuing
+it), passed along the chain as ``lease_id`` and released by the task that
+finishes the update.
+
+With SSTU_SCHEDULE_ADAPTIVE beat runs ``sync_group_index`` daily and
+``sync_due_groups`` every SSTU_SCHEDULE_TICK_MINUTES instead: each tick
+syncs only groups that are due by priority (see sync_scheduler).
 """
-from celery import shared_task
+import uuid
+from contextlib import nullcontext
+from celery import chord, shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
 import logging
-from .services import ScheduleSyncService
+from .models import ScheduleUpdate
+from .services import ScheduleSyncService, finish_update
+from .sync_lease import FULL_SYNC, Lease, current_holder, group_lease_name
+from .sync_scheduler import plan_tick
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(name='schedule.sync_all_schedules')
-def sync_all_schedules():
+def split_chunks(group_ids, chunks: int):
+    """Split group IDs into at most ``chunks`` non-empty lists of similar size."""
+    chunks = max(1, min(chunks, len(group_ids)))
+    return [group_ids[start::chunks] for start in range(chunks)]
+
+
+def keep_lease(lease_id):
+    """Renew the full sync lease passed along the task chain while the block runs."""
+    return Lease(FULL_SYNC, lease_id).hold(release=False) if lease_id else nullcontext()
+
+
+def pass_on_lease(lease_id, result):
+    """Release the full sync lease unless the result hands the sync on to other tasks (chord, resume)."""
+    if lease_id and result.get('status') not in ('dispatched', 'interrupted'):
+        Lease(FULL_SYNC, lease_id).release()
+    return result
+
+
+def sum_stats(results):
+    """Sum numeric stats of chunk results."""
+    total = {}
+    for result in results:
+        for key, value in (result.get('stats') or {}).items():
+            if isinstance(value, int):
+                total[key] = total.get(key, 0) + value
+    return total
+
+
+def sum_timings(results):
+    """Sum phase timings of chunk results (phase wall times become task time)."""
+    total = {}
+    for result in results:
+        for phase, seconds in (result.get('timings') or {}).items():
+            phase_total = total.setdefault(phase, {})
+            for key, value in seconds.items():
+                phase_total[key] = phase_total.get(key, 0.0) + value
+    return total
+
+
+@shared_task(bind=True, name='schedule.sync_all_schedules')
+def sync_all_schedules(self):
     """
     Sync all schedules from SSTU website.
     This task should be run periodically (every 3 hours).
+    
+    Groups are split into SSTU_SCHEDULE_SYNC_TASKS chunk tasks (at most that
+    many run at once, whatever the number of workers); with 0 the whole sync
+    runs inside this task. An interrupted sync is resumed instead of
+    starting a new one. Skipped if another full sync job holds the lease.
     """
+    lease = Lease(FULL_SYNC, self.request.id or str(uuid.uuid4()))
+    with lease.hold(release=False) as held:
+        if not held:
+            logger.info(f"Schedule synchronization already in flight as job {current_holder(FULL_SYNC)}")
+            return {'status': 'skipped'}
+        return pass_on_lease(lease.job_id, start_full_sync(lease.job_id))
+
+
+def start_full_sync(lease_id: str):
+    """Resume an interrupted update or start a new full sync, holding the full sync lease ``lease_id``."""
+    if ScheduleUpdate.running().exists():
+        logger.info("Schedule synchronization already in progress")
+        return {'status': 'skipped'}
+    interrupted = claim_interrupted_update()
+    if interrupted:
+        return resume_update(interrupted.id, lease_id)
+    
+    fanout = getattr(settings, 'SSTU_SCHEDULE_SYNC_TASKS', 4)
+    if fanout:
+        return dispatch_schedule_sync(fanout, lease_id)
+    
     logger.info("Starting schedule synchronization task")
     service = ScheduleSyncService()
-    update = service.sync_all()
+    try:
+        update = service.sync_all()
+    except SoftTimeLimitExceeded:
+        resume_schedule_sync.delay(service.update_id, lease_id=lease_id)
+        return {'status': 'interrupted', 'update_id': service.update_id}
     
     if update.status == 'success':
         logger.info(f"Schedule sync completed successfully: {update.groups_updated} groups updated")
@@ -34,17 +132,242 @@ def sync_all_schedules():
         }
 
 
-@shared_task(name='schedule.sync_single_group')
-def sync_single_group(group_id: int):
+def claim_interrupted_update():
+    """
+    Latest interrupted update to resume; older interrupted ones are closed as
+    failed, so only one of them is continued.
+    """
+    interrupted = list(ScheduleUpdate.interrupted())
+    if not interrupted:
+        return None
+    latest = interrupted.pop()
+    for update in interrupted:
+        finish_update(update, error=f'Interrupted, superseded by update {latest.id}')
+    return latest
+
+
+def sync_index(update: ScheduleUpdate, service: ScheduleSyncService):
+    """Sync main page and groups for ``update`` and checkpoint its group list; False if it failed."""
+    service.bind_update(update.id)
+    try:
+        with service.timed_phase('index'):
+            groups = service.sync_group_index()
+    except Exception as e:
+        logger.error(f"Schedule synchronization failed: {e}")
+        finish_update(update, error=str(e), timings=service.timings)
+        return False
+    service.checkpoint(group_ids=[group.sstu_id for group in groups if group.sstu_id])
+    update.refresh_from_db(fields=['group_ids'])
+    return True
+
+
+def sync_update_groups(update: ScheduleUpdate, service: ScheduleSyncService, group_ids, chunks: int,
+                       lease_id: str = None):
+    """Sync ``group_ids`` of in-progress ``update``: as a chord of ``chunks`` tasks, or here if 0."""
+    if not group_ids:
+        finish_update(update, timings=service.timings)
+        return {'status': 'success', 'update_id': update.id, 'groups': 0}
+    
+    if chunks:
+        parts = split_chunks(group_ids, chunks)
+        chord(
+            [sync_group_chunk.s(part, update.id, lease_id=lease_id) for part in parts]
+        )(finish_schedule_sync.s(update.id, {'stats': service.stats, 'timings': service.timings}, lease_id=lease_id))
+        logger.info(f"Dispatched {len(group_ids)} groups in {len(parts)} tasks (update {update.id})")
+        return {
+            'status': 'dispatched',
+            'update_id': update.id,
+            'groups': len(group_ids),
+            'tasks': len(parts),
+        }
+    
+    try:
+        service.sync_groups(group_ids, update.id)
+    except SoftTimeLimitExceeded:
+        logger.warning(f"Schedule synchronization {update.id} hit the time limit, continuing in a new task")
+        resume_schedule_sync.delay(update.id, lease_id=lease_id)
+        return {'status': 'interrupted', 'update_id': update.id}
+    except Exception as e:
+        logger.error(f"Schedule synchronization {update.id} failed: {e}")
+        finish_update(update, error=str(e), timings=service.timings)
+        return {'status': 'failed', 'update_id': update.id, 'error': str(e)}
+    finish_update(update, timings=service.timings)
+    service.log_fetch_stats()
+    update.refresh_from_db()
+    return {
+        'status': update.status,
+        'update_id': update.id,
+        'groups': len(group_ids),
+        'groups_updated': update.groups_updated,
+        'groups_skipped': update.groups_skipped,
+    }
+
+
+def dispatch_schedule_sync(chunks: int, lease_id: str = None):
+    """Sync main page and groups here, dispatch group schedules as a chord of chunk tasks."""
+    logger.info(f"Starting schedule synchronization in up to {chunks} tasks")
+    update = ScheduleUpdate.objects.create(status=ScheduleUpdate.Status.IN_PROGRESS)
+    service = ScheduleSyncService()
+    if not sync_index(update, service):
+        return {
+            'status': 'failed',
+            'error': update.error_message,
+        }
+    return sync_update_groups(update, service, update.group_ids, chunks, lease_id)
+
+
+@shared_task(name='schedule.resume_schedule_sync')
+def resume_schedule_sync(update_id: int, lease_id: str = None):
+    """Continue an interrupted update from its checkpoint: groups with a result are not synced again."""
+    with keep_lease(lease_id):
+        return pass_on_lease(lease_id, resume_update(update_id, lease_id))
+
+
+def resume_update(update_id: int, lease_id: str = None):
+    update = ScheduleUpdate.objects.get(pk=update_id)
+    if update.status != ScheduleUpdate.Status.IN_PROGRESS:
+        logger.info(f"Schedule update {update_id} is already {update.status}, nothing to resume")
+        return {'status': update.status, 'update_id': update_id}
+    
+    ScheduleUpdate.objects.filter(pk=update_id).update(attempts=F('attempts') + 1, heartbeat_at=timezone.now())
+    service = ScheduleSyncService()
+    # Interrupted before the main page was parsed
+    if not update.group_ids and not sync_index(update, service):
+        return {'status': 'failed', 'update_id': update_id, 'error': update.error_message}
+    
+    remaining = update.remaining_group_ids()
+    logger.info(f"Resuming schedule update {update_id}: {len(remaining)} of {len(update.group_ids)} groups left")
+    return sync_update_groups(update, service, remaining, getattr(settings, 'SSTU_SCHEDULE_SYNC_TASKS', 4), lease_id)
+
+
+@shared_task(name='schedule.sync_group_chunk')
+def sync_group_chunk(group_ids, update_id=None, lease_id=None):
+    """
+    Sync schedules of a chunk of groups (SSTU IDs) with one service, so page
+    cache, subjects/teachers cache and fetch pipeline are shared within it.
+    Never raises: the chord callback must run even if a chunk fails.
+    """
+    with keep_lease(lease_id):
+        return sync_chunk(group_ids, update_id)
+
+
+def sync_chunk(group_ids, update_id=None):
+    if update_id:
+        # Groups already done by another attempt of the same update
+        remaining = set(ScheduleUpdate.objects.get(pk=update_id).remaining_group_ids())
+        group_ids = [group_id for group_id in group_ids if group_id in remaining]
+    logger.info(f"Syncing schedules of {len(group_ids)} groups")
+    try:
+        service = ScheduleSyncService()
+        stats = service.sync_groups(group_ids, update_id)
+        service.log_fetch_stats()
+        return {'status': 'success', 'groups': len(group_ids), 'stats': stats, 'timings': service.timings}
+    except SoftTimeLimitExceeded:
+        # Results so far are checkpointed, the callback resumes the rest
+        logger.warning(f"Chunk of {len(group_ids)} groups hit the time limit")
+        return {'status': 'interrupted', 'groups': len(group_ids)}
+    except Exception as e:
+        logger.error(f"Error syncing chunk of {len(group_ids)} groups: {e}")
+        return {'status': 'failed', 'groups': len(group_ids), 'error': str(e)}
+
+
+@shared_task(name='schedule.finish_schedule_sync')
+def finish_schedule_sync(results, update_id: int, index_result=None, lease_id=None):
+    """Chord callback: close the ScheduleUpdate with summed phase timings of the coordinator and chunks."""
+    with keep_lease(lease_id):
+        return pass_on_lease(lease_id, close_update(results, update_id, index_result, lease_id))
+
+
+def close_update(results, update_id: int, index_result=None, lease_id=None):
+    update = ScheduleUpdate.objects.get(pk=update_id)
+    if update.status != ScheduleUpdate.Status.IN_PROGRESS:
+        logger.info(f"Schedule update {update_id} was already finished by another attempt")
+        return {'status': update.status, 'update_id': update_id}
+    if any(result.get('status') == 'interrupted' for result in results):
+        resume_schedule_sync.delay(update_id, lease_id=lease_id)
+        return {'status': 'interrupted', 'update_id': update_id}
+    
+    stats = sum_stats([index_result or {}] + list(results))
+    timings = sum_timings([index_result or {}] + list(results))
+    failed = [result for result in results if result.get('status') != 'success']
+    error = None
+    if failed and len(failed) == len(results):
+        error = '; '.join(result.get('error', '') for result in failed)
+    elif failed:
+        logger.error(f"{len(failed)} of {len(results)} sync tasks failed: {[result.get('error') for result in failed]}")
+    
+    finish_update(update, error=error, timings=timings)
+    if failed and not error:
+        update.error_message = f"{len(failed)} of {len(results)} sync tasks failed"
+        update.save(update_fields=['error_message'])
+    
+    logger.info(f"Schedule synchronization {update_id} completed: {stats}")
+    return {
+        'status': update.status,
+        'update_id': update_id,
+        'groups_updated': update.groups_updated,
+        'groups_skipped': update.groups_skipped,
+        'lessons_added': update.lessons_added,
+        'lessons_removed': update.lessons_removed,
+    }
+
+
+@shared_task(name='schedule.sync_group_index')
+def sync_group_index():
+    """Sync institutes and groups from the main page only (new groups are due at the next tick)."""
+    service = ScheduleSyncService()
+    try:
+        groups = service.sync_group_index()
+    except Exception as e:
+        logger.error(f"Group index sync failed: {e}")
+        return {'status': 'failed', 'error': str(e)}
+    logger.info(f"Group index synced: {len(groups)} groups")
+    return {'status': 'success', 'groups': len(groups)}
+
+
+@shared_task(name='schedule.sync_due_groups')
+def sync_due_groups():
+    """
+    Adaptive sync tick: sync groups whose next sync is due, by priority,
+    within SSTU_SCHEDULE_HOURLY_BUDGET group pages per hour.
+    """
+    # Full sync (queued or running) or a previous tick still running
+    if current_holder(FULL_SYNC) or ScheduleUpdate.running().exists():
+        logger.info("Schedule synchronization in progress, skipping sync tick")
+        return {'status': 'skipped'}
+    interrupted = claim_interrupted_update()
+    if interrupted:
+        return resume_schedule_sync(interrupted.id)
+    
+    group_ids = plan_tick()
+    if not group_ids:
+        return {'status': 'success', 'groups': 0}
+    
+    update = ScheduleUpdate.objects.create(
+        status=ScheduleUpdate.Status.IN_PROGRESS,
+        group_ids=sorted(group_ids),
+        heartbeat_at=timezone.now(),
+    )
+    return sync_update_groups(update, ScheduleSyncService(), update.group_ids, chunks=0)
+
+
+@shared_task(bind=True, name='schedule.sync_single_group')
+def sync_single_group(self, group_id: int):
     """
-    Sync schedule for single group.
+    Sync schedule for single group (skipped if another job holds the group's lease).
     
     Args:
         group_id: SSTU group ID
     """
-    logger.info(f"Syncing schedule for group {group_id}")
-    service = ScheduleSyncService()
-    success = service.sync_single_group(group_id)
+    lease = Lease(group_lease_name(group_id), self.request.id or str(uuid.uuid4()))
+    with lease.hold() as held:
+        if not held:
+            job_id = current_holder(group_lease_name(group_id))
+            logger.info(f"Group {group_id} is already being synced by job {job_id}")
+            return {'status': 'skipped', 'group_id': group_id, 'job_id': job_id}
+        logger.info(f"Syncing schedule for group {group_id}")
+        service = ScheduleSyncService()
+        success = service.sync_single_group(group_id)
     
     if success:
         logger.info(f"Group {group_id} synced successfully")
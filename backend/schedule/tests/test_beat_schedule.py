@@ -0,0 +1,15 @@
+from django.test import SimpleTestCase, override_settings
+
+from config.celery import app, beat_schedule
+
+
+class BeatScheduleTests(SimpleTestCase):
+    def test_full_sync_by_default(self):
+        self.assertEqual(set(beat_schedule()), {'sync-schedules-every-3-hours'})
+        self.assertEqual(set(app.conf.beat_schedule), {'sync-schedules-every-3-hours'})
+
+    @override_settings(SSTU_SCHEDULE_ADAPTIVE=True, SSTU_SCHEDULE_TICK_MINUTES=5)
+    def test_adaptive(self):
+        schedule = beat_schedule()
+        self.assertEqual(set(schedule), {'sync-group-index-daily', 'sync-due-groups'})
+        self.assertEqual(schedule['sync-due-groups']['schedule'], 300)
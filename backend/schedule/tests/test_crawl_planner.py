@@ -0,0 +1,65 @@
+from datetime import date, time, timedelta
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from schedule.crawl_planner import CrawlPlan, merge_teacher_lessons
+from schedule.lesson_writer import GroupLessonWriter
+from schedule.models import Group
+from schedule.records import ParsedLesson
+from schedule.services import ScheduleSyncService
+
+
+def teacher_lesson(group_name='б-ПИНЖ-11', room='1/101'):
+    return {
+        'subject_name': 'Математика', 'lesson_type': 'лек', 'room': room, 'group_name': group_name,
+        'weekday': 0, 'lesson_number': 1, 'start_time': time(8), 'end_time': time(9, 30),
+        'specific_date': date(2026, 9, 7), 'week_number': 2,
+    }
+
+
+class MergeTeacherLessonsTests(SimpleTestCase):
+    def merge(self, teacher_pages, known_teachers):
+        plan = CrawlPlan(group_pages=[], teacher_pages=teacher_pages, teacher_groups={1: known_teachers},
+                         baseline_requests=3)
+        teacher_lessons = {teacher_id: [teacher_lesson()] for teacher_id in teacher_pages}
+        return merge_teacher_lessons(plan, teacher_lessons, {'б-ПИНЖ-11': 1})[1]
+
+    def test_co_taught_lesson_kept_under_known_teacher(self):
+        for pages in ([100, 200], [200, 100]):
+            lessons = self.merge(pages, {200})
+            self.assertEqual([lesson.teacher_id for lesson in lessons], [200])
+
+    def test_co_taught_lesson_of_two_known_teachers(self):
+        for pages in ([100, 200], [200, 100]):
+            lessons = self.merge(pages, {100, 200})
+            self.assertEqual([lesson.teacher_id for lesson in lessons], [100])
+
+
+@override_settings(SSTU_SCHEDULE_GROUP_PAGE_MAX_AGE_HOURS=24, SSTU_SCHEDULE_PARSE_PROCESSES=0)
+class PlanCrawlPinningTests(TestCase):
+    def setUp(self):
+        writer = GroupLessonWriter()
+        self.groups = {}
+        for sstu_id in (1, 2, 3, 4):
+            group = Group.objects.create(name=f'б-ПИНЖ-1{sstu_id}', sstu_id=sstu_id, page_checked_at=timezone.now())
+            writer.write(group, [ParsedLesson.create(
+                'Математика', 'Иванов И.И.', 100, None, 'лек', '1/101', 0, sstu_id,
+                time(8), time(9, 30), date(2026, 9, 7), 2,
+            )])
+            self.groups[sstu_id] = group
+
+    def test_recently_checked_groups_use_teacher_pages(self):
+        plan = ScheduleSyncService()._plan_crawl(self.groups)
+
+        self.assertEqual(plan.group_pages, [])
+        self.assertEqual(plan.teacher_pages, [100])
+
+    def test_stale_group_fetches_own_page(self):
+        self.groups[2].page_checked_at = timezone.now() - timedelta(hours=25)
+        self.groups[3].page_checked_at = None
+
+        plan = ScheduleSyncService()._plan_crawl(self.groups)
+
+        self.assertEqual(sorted(plan.group_pages), [2, 3])
+        self.assertEqual(set(plan.teacher_groups), {1, 4})
@@ -0,0 +1,40 @@
+from django.test import TestCase
+
+from schedule.dimensions import DimensionResolver
+from schedule.models import Subject, Teacher
+
+
+class DimensionResolverTests(TestCase):
+    def test_creates_missing_rows(self):
+        resolver = DimensionResolver()
+        subjects = resolver.subject_ids(['Математика', 'Физика'])
+        teachers = resolver.teacher_ids([('Иванов И.И.', 100, None), ('Петров П.П.', None, None)])
+
+        self.assertEqual(subjects, dict(Subject.objects.values_list('name', 'id')))
+        self.assertEqual(teachers[('id', 100)], Teacher.objects.get(sstu_id=100).pk)
+        self.assertEqual(teachers[('name', 'Петров П.П.')], Teacher.objects.get(full_name='Петров П.П.').pk)
+
+    def test_rows_created_by_concurrent_chunk(self):
+        # Both resolvers load before either creates anything, like two parallel chunks
+        first, second = DimensionResolver(), DimensionResolver()
+        first.subject_ids([])
+        second.subject_ids([])
+        second_subjects = second.subject_ids(['Математика'])
+        second_teachers = second.teacher_ids([('Иванов И.И.', 100, None), ('Петров П.П.', None, None)])
+
+        first_subjects = first.subject_ids(['Математика'])
+        first_teachers = first.teacher_ids([('Иванов И.И.', 100, None), ('Петров П.П.', None, None)])
+
+        self.assertEqual(first_subjects, second_subjects)
+        self.assertEqual(first_teachers, second_teachers)
+        self.assertEqual(Subject.objects.count(), 1)
+        self.assertEqual(Teacher.objects.count(), 2)
+
+    def test_updates_changed_teacher_name(self):
+        teacher = Teacher.objects.create(full_name='Иванов И.', sstu_id=100)
+        resolver = DimensionResolver()
+        resolver.teacher_ids([('Иванов И.И.', 100, 'https://rasp.sstu.ru/teachers/100-ivanov')])
+
+        teacher.refresh_from_db()
+        self.assertEqual(teacher.full_name, 'Иванов И.И.')
+        self.assertEqual(resolver.stats['teachers_updated'], 1)
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from schedule.models import Lesson, LessonChange
+
+URL = '/api/schedule/updates/import_group/'
+CHANGES_URL = '/api/schedule/lessons/changes/'
+
+
+def lesson(subject_name='Математика', additional_info=''):
+    return {
+        'subject_name': subject_name,
+        'teacher_name': 'Иванов И.И.',
+        'teacher_id': 100,
+        'lesson_type': 'лек',
+        'room': '1/101',
+        'weekday': 0,
+        'lesson_number': 1,
+        'start_time': '08:00:00',
+        'end_time': '09:30:00',
+        'specific_date': '2026-09-07',
+        'week_number': 2,
+        'additional_info': additional_info,
+    }
+
+
+class ImportTestCase(TestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='x', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def post(self, lessons):
+        payload = {
+            'institute': {'name': 'ИнПИТ', 'sstu_id': 1},
+            'group': {'name': 'б1-ИФСТ-11', 'sstu_id': 123},
+            'lessons': lessons,
+        }
+        response = self.client.post(URL, payload, format='json', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+
+class ImportGroupTests(ImportTestCase):
+    def test_additional_info_is_saved(self):
+        self.post([lesson(additional_info='Дистанционно')])
+
+        self.assertEqual(Lesson.objects.get().additional_info, 'Дистанционно')
+
+    def test_additional_info_change_updates_lesson(self):
+        self.post([lesson(additional_info='Дистанционно')])
+        result = self.post([lesson(additional_info='')])
+
+        self.assertFalse(result['unchanged'])
+        self.assertEqual(result['lessons_updated'], 1)
+        self.assertEqual(Lesson.objects.get().additional_info, '')
+
+    def test_same_payload_is_unchanged(self):
+        self.post([lesson(additional_info='Дистанционно')])
+        result = self.post([lesson(additional_info='Дистанционно')])
+
+        self.assertTrue(result['unchanged'])
+
+
+@override_settings(SSTU_SCHEDULE_CHANGES_RETENTION_DAYS=30)
+class ImportedChangesTests(ImportTestCase):
+    """Imported lessons reach the delta feed and age out of it like sync changes."""
+
+    def changes(self, since):
+        response = self.client.get(CHANGES_URL, {'since': since}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_import_in_delta_feed(self):
+        since = self.changes('latest')['cursor']
+        self.post([lesson()])
+
+        feed = self.changes(since)
+
+        self.assertEqual([(change['action'], change['update']) for change in feed['results']], [('added', None)])
+        self.assertFalse(feed['reset'])
+
+    def test_imported_changes_pruned(self):
+        self.post([lesson()])
+        cursor = self.changes(0)['cursor']
+        LessonChange.objects.update(created_at=timezone.now() - timedelta(days=31))
+
+        self.post([lesson(additional_info='Дистанционно')])
+
+        self.assertEqual(list(LessonChange.objects.values_list('action', flat=True)), ['modified'])
+        feed = self.changes(cursor)
+        self.assertEqual([change['action'] for change in feed['results']], ['modified'])
+        self.assertFalse(feed['reset'])
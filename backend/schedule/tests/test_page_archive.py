@@ -0,0 +1,45 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from schedule.models import Group, ScheduleUpdate
+from schedule.page_archive import ArchiveSnapshot, list_snapshots, update_snapshot_id
+from schedule.tasks import sync_chunk
+from schedule.worker_batch import make_standin_server
+
+from .utils import group_page, make_origin_server, running
+
+
+class UpdateSnapshotTests(TestCase):
+    """All chunk tasks of one update archive into one snapshot."""
+
+    def setUp(self):
+        for sstu_id in (1, 2):
+            Group.objects.create(name=f'б-ПИНЖ-1{sstu_id}', sstu_id=sstu_id)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        pages = {'/rasp/group/1': group_page(), '/rasp/group/2': group_page(week_number=3)}
+        origin_url = self.enterContext(running(make_origin_server(pages)))
+        worker_url = self.enterContext(running(make_standin_server(0, origin_url)))
+        settings = override_settings(
+            SSTU_SCHEDULE_ARCHIVE_DIR=self.directory.name,
+            SSTU_SCHEDULE_CACHE_DIR=None,
+            SSTU_CLOUDFLARE_WORKER_URL=worker_url,
+            SSTU_SCHEDULE_PARSE_PROCESSES=0,
+            SSTU_SCHEDULE_WORKER_BATCH_SIZE=1,
+            SSTU_SEMESTER_START=None,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_chunks_share_snapshot(self):
+        update = ScheduleUpdate.objects.create(status=ScheduleUpdate.Status.IN_PROGRESS, group_ids=[1, 2])
+
+        for chunk in ([1], [2]):
+            self.assertEqual(sync_chunk(chunk, update.id)['status'], 'success')
+
+        snapshot = update_snapshot_id(update.id, update.started_at)
+        self.assertEqual(list_snapshots(self.directory.name), [snapshot])
+        self.assertEqual(sorted(ArchiveSnapshot(self.directory.name, snapshot).urls), [
+            'https://rasp.sstu.ru/rasp/group/1', 'https://rasp.sstu.ru/rasp/group/2',
+        ])
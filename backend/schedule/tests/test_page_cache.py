@@ -0,0 +1,118 @@
+import tempfile
+from unittest import mock
+
+from celery.exceptions import SoftTimeLimitExceeded
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from schedule.models import Group, Lesson
+from schedule.page_cache import PageCache
+from schedule.parser import PageUnchanged, SSTUScheduleParser
+from schedule.services import ScheduleSyncService
+from schedule.worker_batch import make_standin_server
+
+from .utils import group_page, make_origin_server, running
+
+URL = 'https://rasp.sstu.ru/rasp/group/1'
+
+
+class PageCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = PageCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_staged_entry_is_not_stored(self):
+        self.cache.stage(URL, 'abc', '"etag"')
+        self.assertIsNone(self.cache.get(URL))
+        self.assertFalse(self.cache.is_unchanged(URL, 'abc'))
+        self.assertEqual(self.cache.conditional_headers(URL), {})
+
+    def test_commit_stores_staged_entry(self):
+        self.cache.stage(URL, 'abc', '"etag"')
+        self.cache.commit(URL)
+        self.assertTrue(self.cache.is_unchanged(URL, 'abc'))
+        self.assertEqual(self.cache.conditional_headers(URL), {'If-None-Match': '"etag"'})
+
+    def test_invalidate_drops_staged_entry(self):
+        self.cache.stage(URL, 'abc')
+        self.cache.invalidate(URL)
+        self.cache.commit(URL)
+        self.assertIsNone(self.cache.get(URL))
+
+    def test_failed_save_keeps_previous_entry(self):
+        self.cache.stage(URL, 'old', '"old"')
+        self.cache.commit(URL)
+        self.cache.stage(URL, 'new', '"new"')
+        self.assertTrue(self.cache.is_unchanged(URL, 'old'))
+        self.assertEqual(self.cache.conditional_headers(URL), {'If-None-Match': '"old"'})
+
+
+class UnchangedBodyTests(SimpleTestCase):
+    """A body equal to the cached one refreshes the entry instead of staging it."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = PageCache(self.directory.name, max_age=100)
+        self.parser = SSTUScheduleParser(page_cache=self.cache)
+
+    def test_unchanged_body_refreshes_entry(self):
+        body = group_page().encode('utf-8')
+        with mock.patch('schedule.page_cache.time.time', return_value=1000):
+            self.parser._accept_body(URL, body, {'ETag': '"old"'}, conditional=True)
+            self.cache.commit(URL)
+
+        with mock.patch('schedule.page_cache.time.time', return_value=1090):
+            with self.assertRaises(PageUnchanged):
+                self.parser._accept_body(URL, body, {'ETag': '"new"'}, conditional=True)
+
+        self.assertEqual(self.cache._pending, {})
+        with mock.patch('schedule.page_cache.time.time', return_value=1150):
+            self.assertEqual(self.cache.conditional_headers(URL), {'If-None-Match': '"new"'})
+
+
+class InterruptedSyncCacheTests(TestCase):
+    """Page cache must not report a page unchanged before its lessons are saved."""
+
+    def setUp(self):
+        self.group = Group.objects.create(name='б-ПИНЖ-11', sstu_id=1)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        origin = running(make_origin_server({'/rasp/group/1': group_page()}))
+        origin_url = self.enterContext(origin)
+        worker_url = self.enterContext(running(make_standin_server(0, origin_url)))
+        settings = override_settings(
+            SSTU_SCHEDULE_CACHE_DIR=self.directory.name,
+            SSTU_CLOUDFLARE_WORKER_URL=worker_url,
+            SSTU_SCHEDULE_PARSE_PROCESSES=0,
+            SSTU_SCHEDULE_WORKER_BATCH_SIZE=1,
+            SSTU_SEMESTER_START=None,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_resume_after_interrupted_save(self):
+        service = ScheduleSyncService()
+        with mock.patch.object(service, '_save_group_lessons', side_effect=SoftTimeLimitExceeded()):
+            with self.assertRaises(SoftTimeLimitExceeded):
+                service.sync_groups([1])
+        self.assertFalse(Lesson.objects.exists())
+
+        stats = ScheduleSyncService().sync_groups([1])
+        self.assertEqual(stats['groups_updated'], 1)
+        self.assertEqual(stats['groups_unchanged'], 0)
+        self.assertEqual(Lesson.objects.filter(group=self.group).count(), 2)
+
+        stats = ScheduleSyncService().sync_groups([1])
+        self.assertEqual(stats['groups_unchanged'], 1)
+
+    def test_failed_save_is_fetched_again(self):
+        service = ScheduleSyncService()
+        with mock.patch.object(service, '_save_group_lessons', side_effect=RuntimeError('db down')):
+            stats = service.sync_groups([1])
+        self.assertEqual(stats['groups_failed'], 1)
+
+        stats = ScheduleSyncService().sync_groups([1])
+        self.assertEqual(stats['groups_updated'], 1)
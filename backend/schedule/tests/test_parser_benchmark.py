@@ -0,0 +1,59 @@
+from django.test import SimpleTestCase
+
+from schedule.html_backends import compare_backends
+from schedule.parser_benchmark import DEFAULT_CORPUS_DIR, compare_with_baseline, load_report, run_benchmark
+
+
+class CommittedCorpusTests(SimpleTestCase):
+    """The committed corpus and baseline keep the offline benchmark usable."""
+
+    def setUp(self):
+        self.baseline = load_report(DEFAULT_CORPUS_DIR / 'baseline.json')
+
+    def test_records_match_baseline(self):
+        report = run_benchmark(DEFAULT_CORPUS_DIR, html_backend=self.baseline['html_backend'], repeat=1)
+
+        self.assertEqual(set(report['entry_points']), set(self.baseline['entry_points']))
+        for entry_point, expected in self.baseline['entry_points'].items():
+            current = report['entry_points'][entry_point]
+            self.assertEqual((current['pages'], current['records']), (expected['pages'], expected['records']),
+                             entry_point)
+            self.assertGreater(current['pages_per_calibration'], 0, entry_point)
+
+    def test_backends_agree(self):
+        self.assertEqual(compare_backends(DEFAULT_CORPUS_DIR)['mismatches'], [])
+
+
+class CompareWithBaselineTests(SimpleTestCase):
+    BASELINE = {
+        'html_backend': 'lxml',
+        'entry_points': {
+            'parse_group_html': {'pages': 3, 'records': 300, 'pages_per_sec': 100.0, 'pages_per_calibration': 2.0,
+                                 'records_per_sec': 10000.0, 'records_per_calibration': 200.0,
+                                 'peak_alloc_bytes_per_page': 1000},
+        },
+    }
+
+    def report(self, **metrics):
+        entry_point = dict(self.BASELINE['entry_points']['parse_group_html'], **metrics)
+        return {'html_backend': 'lxml', 'entry_points': {'parse_group_html': entry_point}}
+
+    def test_within_tolerance(self):
+        self.assertEqual(compare_with_baseline(self.report(pages_per_calibration=1.6), self.BASELINE), [])
+
+    def test_slower_host_not_a_regression(self):
+        # Half the pages per second, but the calibration loop slowed down as much
+        report = self.report(pages_per_sec=50.0, records_per_sec=5000.0)
+        self.assertEqual(compare_with_baseline(report, self.BASELINE), [])
+
+    def test_violations(self):
+        violations = compare_with_baseline(
+            self.report(records=299, pages_per_calibration=1.0, peak_alloc_bytes_per_page=2000), self.BASELINE,
+        )
+        self.assertEqual({violation['metric'] for violation in violations},
+                         {'records', 'pages_per_calibration', 'peak_alloc_bytes_per_page'})
+
+    def test_other_backend_not_compared(self):
+        report = dict(self.report(), html_backend='html.parser')
+        self.assertEqual([violation['metric'] for violation in compare_with_baseline(report, self.BASELINE)],
+                         ['html_backend'])
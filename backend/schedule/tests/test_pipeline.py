@@ -0,0 +1,57 @@
+from unittest import mock
+
+from billiard.pool import Pool
+from django.test import SimpleTestCase
+
+from schedule.parser import SSTUScheduleParser
+from schedule.pipeline import FetchParsePipeline, default_parse_workers
+
+from .utils import group_page
+
+
+def parse_in_daemonic_process(html):
+    """Parse stage started inside a daemonic pool process, like a Celery prefork worker."""
+    pipeline = FetchParsePipeline(SSTUScheduleParser(), parse_workers=2)
+    pipeline._reset_stats()
+    executor, parse_page = pipeline._make_parse_stage()
+    try:
+        lessons, _ = executor.submit(parse_page, html, 1).result(timeout=30)
+    finally:
+        executor.shutdown()
+    return pipeline.stats['parse_mode'], len(lessons)
+
+
+class FetchParsePipelineTests(SimpleTestCase):
+    def test_run_groups(self):
+        parser = SSTUScheduleParser()
+        pipeline = FetchParsePipeline(parser, fetch_workers=2, parse_workers=2)
+        with mock.patch.object(parser, 'fetch_group_html', return_value=group_page()):
+            results = sorted(pipeline.run_groups([1, 2, 3]), key=lambda result: result.group_id)
+
+        self.assertEqual([result.group_id for result in results], [1, 2, 3])
+        self.assertTrue(all(result.error is None and len(result.lessons) == 2 for result in results))
+        self.assertEqual(pipeline.stats['parse_mode'], '2 forkserver processes')
+
+    def test_process_pool_in_daemonic_worker(self):
+        with Pool(1) as pool:
+            parse_mode, lessons = pool.apply(parse_in_daemonic_process, (group_page(),))
+
+        self.assertEqual(parse_mode, '2 billiard processes')
+        self.assertEqual(lessons, 2)
+
+    def test_processes_started_with_parse_stage(self):
+        pipeline = FetchParsePipeline(SSTUScheduleParser(), parse_workers=2)
+        pipeline._reset_stats()
+        executor, _ = pipeline._make_parse_stage()
+        try:
+            # Before any fetch thread exists
+            self.assertEqual(len(executor._processes), 2)
+        finally:
+            executor.shutdown()
+
+    def test_default_workers_shared_by_parallel_runs(self):
+        with mock.patch('schedule.pipeline.os.cpu_count', return_value=9):
+            self.assertEqual(default_parse_workers(), 8)
+            self.assertEqual(default_parse_workers(4), 2)
+        with mock.patch('schedule.pipeline.os.cpu_count', return_value=2):
+            self.assertEqual(default_parse_workers(4), 1)
@@ -0,0 +1,83 @@
+from datetime import date, datetime
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from schedule.models import SemesterCalendar
+from schedule.parser import SSTUScheduleParser
+from schedule.semester import Semester, header_date_near, parse_semester_start
+
+
+class HeaderDateNearTests(SimpleTestCase):
+    def test_same_year(self):
+        self.assertEqual(header_date_near(12, 12, date(2026, 10, 17)), date(2026, 12, 12))
+
+    def test_january_in_december_is_next_year(self):
+        self.assertEqual(header_date_near(12, 1, date(2026, 12, 20)), date(2027, 1, 12))
+
+    def test_december_in_january_is_previous_year(self):
+        self.assertEqual(header_date_near(28, 12, date(2027, 1, 10)), date(2026, 12, 28))
+
+
+class SemesterTests(SimpleTestCase):
+    def setUp(self):
+        self.semester = Semester(date(2026, 9, 1), date(2027, 1, 31))
+
+    def test_start_is_monday_of_first_week(self):
+        self.assertEqual(self.semester.start, date(2026, 8, 31))
+        self.assertEqual(self.semester.week_number(date(2026, 9, 6)), 1)
+        self.assertEqual(self.semester.week_number(date(2026, 9, 7)), 2)
+        self.assertIsNone(self.semester.week_number(date(2027, 3, 1)))
+
+    def test_header_inside_semester_uses_semester_year(self):
+        # Heuristic would put January into 2026 in October
+        self.assertEqual(self.semester.header_date(15, 1, date(2026, 10, 17)), date(2027, 1, 15))
+
+    def test_stale_semester_falls_back_to_today(self):
+        stale = Semester(date(2026, 1, 12))
+        self.assertEqual(stale.header_date(12, 12, date(2026, 10, 17)), date(2026, 12, 12))
+        self.assertEqual(stale.header_date(20, 10, date(2026, 10, 17)), date(2026, 10, 20))
+
+    def test_impossible_date(self):
+        with self.assertRaises(ValueError):
+            self.semester.header_date(31, 2, date(2026, 10, 17))
+
+    def test_parse_semester_start(self):
+        self.assertIsNone(parse_semester_start(''))
+        self.assertIsNone(parse_semester_start(None))
+        self.assertEqual(parse_semester_start(' 2026-09-01 '), date(2026, 9, 1))
+
+
+class ParserHeaderDateTests(SimpleTestCase):
+    NOW = datetime(2026, 10, 17, 12, 0)
+
+    def test_without_semester(self):
+        parser = SSTUScheduleParser()
+        self.assertEqual(parser._header_date('суббота 12.12', self.NOW), date(2026, 12, 12))
+        self.assertEqual(parser._day_week_number(date(2026, 12, 12), 16), 16)
+
+    def test_with_semester(self):
+        parser = SSTUScheduleParser(semester=Semester(date(2026, 9, 1)))
+        self.assertEqual(parser._header_date('суббота 12.12', self.NOW), date(2026, 12, 12))
+        self.assertEqual(parser._day_week_number(date(2026, 12, 12), 99), 15)
+
+
+class SemesterCalendarCurrentTests(TestCase):
+    def setUp(self):
+        cache.delete(SemesterCalendar.CACHE_KEY)
+
+    def tearDown(self):
+        cache.delete(SemesterCalendar.CACHE_KEY)
+
+    @override_settings(SSTU_SEMESTER_START=None)
+    def test_nothing_configured(self):
+        self.assertIsNone(SemesterCalendar.current(date(2026, 10, 17)))
+
+    @override_settings(SSTU_SEMESTER_START='2026-09-01')
+    def test_settings_fallback(self):
+        self.assertEqual(SemesterCalendar.current(date(2026, 10, 17)), Semester(date(2026, 9, 1)))
+
+    def test_latest_started_semester(self):
+        SemesterCalendar.objects.create(name='Весна 2026', start_date=date(2026, 2, 9))
+        SemesterCalendar.objects.create(name='Осень 2026', start_date=date(2026, 8, 31), end_date=date(2027, 1, 31))
+        self.assertEqual(SemesterCalendar.current(date(2026, 10, 17)), Semester(date(2026, 8, 31), date(2027, 1, 31)))
@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from schedule import sync_lease
+from schedule.sync_lease import Lease, single_flight
+
+
+class FakeRedis:
+    """In-memory Redis with the commands used by sync_lease; ``now`` (ms) is advanced by tests."""
+
+    def __init__(self):
+        self.now = 0
+        self.values = {}
+        self.expires = {}
+
+    def advance(self, seconds):
+        self.now += seconds * 1000
+
+    def ttl(self, key):
+        """Seconds left, None if the key is gone."""
+        return (self.expires[key] - self.now) / 1000 if self.get(key) is not None else None
+
+    def get(self, key):
+        if key in self.values and self.expires[key] <= self.now:
+            del self.values[key], self.expires[key]
+        return self.values.get(key)
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and self.get(key) is not None:
+            return None
+        self.values[key], self.expires[key] = value, self.now + px
+        return True
+
+    def eval(self, script, numkeys, key, job_id, *args):
+        if self.get(key) != job_id:
+            return 0
+        if script == sync_lease.RENEW_SCRIPT:
+            self.expires[key] = self.now + int(args[0])
+        else:
+            del self.values[key], self.expires[key]
+        return 1
+
+
+class FakeTask:
+    def __init__(self):
+        self.enqueued = []
+
+    def apply_async(self, args=(), task_id=None):
+        self.enqueued.append(task_id)
+
+
+@override_settings(SSTU_SCHEDULE_LEASE_TTL=120, SSTU_SCHEDULE_LEASE_QUEUE_TTL=3600)
+class SyncLeaseTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = mock.patch.object(sync_lease, '_client', self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.key = sync_lease.KEY_PREFIX + 'group:1'
+
+    def test_queued_job_outlives_running_ttl(self):
+        task = FakeTask()
+        job_id, started = single_flight('group:1', task)
+
+        # Still in the queue well past the running TTL
+        self.redis.advance(600)
+        again, started_again = single_flight('group:1', task)
+
+        self.assertTrue(started)
+        self.assertEqual((again, started_again), (job_id, False))
+        self.assertEqual(task.enqueued, [job_id])
+
+    def test_task_adopts_lease_with_running_ttl(self):
+        job_id, _ = single_flight('group:1', FakeTask())
+        self.redis.advance(600)
+
+        with Lease('group:1', job_id).hold() as held:
+            self.assertTrue(held)
+            self.assertEqual(self.redis.ttl(self.key), 120)
+        self.assertIsNone(self.redis.get(self.key))
+
+    def test_hand_off_keeps_lease_for_queue_ttl(self):
+        with Lease('group:1', 'job').hold(release=False) as held:
+            self.assertTrue(held)
+        self.assertEqual(self.redis.ttl(self.key), 3600)
+
+    def test_other_job_is_not_taken_over(self):
+        job_id, _ = single_flight('group:1', FakeTask())
+
+        with Lease('group:1', 'other').hold() as held:
+            self.assertFalse(held)
+        self.assertEqual(self.redis.get(self.key), job_id)
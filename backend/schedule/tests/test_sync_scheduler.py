@@ -0,0 +1,47 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from schedule import tasks
+from schedule.models import Group, GroupSyncStat, ScheduleUpdate
+from schedule.sync_scheduler import hourly_budget_left
+
+
+@override_settings(SSTU_SCHEDULE_HOURLY_BUDGET=10)
+class HourlyBudgetTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        # Long full sync that started before the last hour
+        self.update = ScheduleUpdate.objects.create(status=ScheduleUpdate.Status.IN_PROGRESS)
+        ScheduleUpdate.objects.filter(pk=self.update.pk).update(started_at=self.now - timedelta(hours=3))
+        self.group = Group.objects.create(name='б-ПИНЖ-11', sstu_id=1)
+
+    def stat(self, minutes_ago, page_fetched=True, outcome=GroupSyncStat.Outcome.UPDATED):
+        GroupSyncStat.objects.create(update=self.update, group=self.group, outcome=outcome, page_fetched=page_fetched,
+                                     synced_at=self.now - timedelta(minutes=minutes_ago))
+
+    def test_counts_pages_fetched_in_last_hour(self):
+        self.stat(10)
+        self.stat(20, outcome=GroupSyncStat.Outcome.FAILED)
+        self.stat(120)
+
+        self.assertEqual(hourly_budget_left(self.now), 8)
+
+    def test_groups_without_own_page_are_free(self):
+        # Covered by teacher pages or unchanged in the page cache
+        self.stat(10, page_fetched=False)
+        self.stat(10, page_fetched=False, outcome=GroupSyncStat.Outcome.UNCHANGED)
+
+        self.assertEqual(hourly_budget_left(self.now), 10)
+
+
+class SyncTickTests(TestCase):
+    def test_tick_skipped_while_full_sync_holds_lease(self):
+        with mock.patch.object(tasks, 'current_holder', return_value='full-sync-job'), \
+                mock.patch.object(tasks, 'plan_tick') as plan_tick:
+            result = tasks.sync_due_groups()
+
+        self.assertEqual(result, {'status': 'skipped'})
+        plan_tick.assert_not_called()
@@ -0,0 +1,70 @@
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from schedule.parser import SSTUScheduleParser
+from schedule.transport import CircuitBreaker, CircuitOpenError, ScheduleTransport
+
+from .utils import make_origin_server, running
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure('host')
+        breaker.before_request('host')
+        breaker.record_failure('host')
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request('host')
+
+    def test_single_half_open_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure('host')
+        breaker.before_request('host')
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request('host')
+        breaker.record_success('host')
+        breaker.before_request('host')
+        self.assertFalse(breaker.is_open('host'))
+
+
+class ScheduleTransportTests(SimpleTestCase):
+    def test_trial_ended_by_unexpected_error(self):
+        transport = ScheduleTransport(failure_threshold=1, reset_timeout=0)
+        with mock.patch.object(transport.session, 'request', side_effect=requests.ConnectionError()):
+            with self.assertRaises(requests.ConnectionError):
+                transport.get('http://origin/')
+        with mock.patch.object(transport.session, 'request', side_effect=RuntimeError('time limit')):
+            with self.assertRaises(RuntimeError):
+                transport.get('http://origin/')
+
+        # Not stuck half-open: the next request is a new trial
+        with mock.patch.object(transport.session, 'request', side_effect=requests.ConnectionError()) as request:
+            with self.assertRaises(requests.ConnectionError):
+                transport.get('http://origin/')
+        request.assert_called_once()
+
+    def test_retry_after(self):
+        transport = ScheduleTransport(backoff_max=30)
+        response = requests.Response()
+        response.headers['Retry-After'] = '7'
+        self.assertEqual(transport.backoff_delay(0, requests.HTTPError(response=response)), 7)
+
+
+class FetchRetryTests(SimpleTestCase):
+    """Every retry is a request the origin sees: one retry layer, no retries on 4xx."""
+
+    def fetch(self, status: int, retries: int = 2):
+        server = make_origin_server({'/page': status})
+        transport = ScheduleTransport(retries=retries, backoff_factor=0, backoff_jitter=0, failure_threshold=0)
+        parser = SSTUScheduleParser(transport=transport)
+        with running(server) as origin:
+            self.assertIsNone(parser.fetch_html(f'{origin}/page'))
+        return server.requests
+
+    def test_server_error_retried_by_one_layer(self):
+        self.assertEqual(len(self.fetch(503)), 3)
+
+    def test_not_found_not_retried(self):
+        self.assertEqual(len(self.fetch(404)), 1)
@@ -0,0 +1,94 @@
+import urllib.parse
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from schedule.parser import SSTUScheduleParser
+from schedule.worker_batch import BatchProtocolError, encode_frame, iter_frames, make_standin_server
+
+from .utils import group_page, make_origin_server, running
+
+
+def split(data: bytes, size: int = 3):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+class FrameTests(SimpleTestCase):
+    def test_frames_split_across_chunks(self):
+        stream = encode_frame({'index': 0, 'status': 200}, 'Расписание'.encode('utf-8')) + encode_frame({'index': 1, 'status': 304})
+
+        frames = list(iter_frames(split(stream)))
+
+        self.assertEqual([meta['index'] for meta, _ in frames], [0, 1])
+        self.assertEqual(frames[0][1].decode('utf-8'), 'Расписание')
+        self.assertEqual(frames[1][1], b'')
+
+    def test_truncated_frame(self):
+        stream = encode_frame({'index': 0, 'status': 200}, b'<html></html>')
+
+        with self.assertRaises(BatchProtocolError):
+            list(iter_frames([stream[:-3]]))
+
+    def test_bad_frame_header(self):
+        with self.assertRaises(BatchProtocolError):
+            list(iter_frames([b'not json\n']))
+
+
+class BatchFetchTests(SimpleTestCase):
+    """fetch_pages_batch through the local Worker stand-in."""
+
+    def setUp(self):
+        self.pages = {'/rasp/group/1': group_page(), '/rasp/group/2': group_page(week_number=3)}
+        self.origin = make_origin_server(self.pages)
+        self.origin_url = self.enterContext(running(self.origin))
+        self.urls = [f'https://rasp.sstu.ru/rasp/group/{group_id}' for group_id in (1, 2, 3)]
+
+    def fetch(self, worker_url, parser=None):
+        parser = parser or SSTUScheduleParser(cloudflare_worker_url=worker_url, worker_batch_size=10)
+        return {page.url: page for page in parser.fetch_pages_batch(self.urls, retries=0)}
+
+    def assertPages(self, pages):
+        self.assertEqual(set(pages), set(self.urls))
+        self.assertEqual(pages[self.urls[0]].text, self.pages['/rasp/group/1'])
+        self.assertEqual(pages[self.urls[1]].text, self.pages['/rasp/group/2'])
+        self.assertIsNone(pages[self.urls[2]].text)
+        self.assertIsNotNone(pages[self.urls[2]].error)
+
+    def test_pages_arrive_in_frames(self):
+        worker_url = self.enterContext(running(make_standin_server(0, self.origin_url)))
+
+        pages = self.fetch(worker_url)
+
+        self.assertPages(pages)
+        # Every page fetched once by the batch, none again one by one
+        self.assertEqual(sorted(self.origin.requests), ['/rasp/group/1', '/rasp/group/2', '/rasp/group/3'])
+
+    def test_batch_uses_full_timeout_and_is_not_sampled(self):
+        worker_url = self.enterContext(running(make_standin_server(0, self.origin_url)))
+        parser = SSTUScheduleParser(timeout=60, cloudflare_worker_url=worker_url, worker_batch_size=10)
+
+        with mock.patch.object(parser.transport.session, 'request', wraps=parser.transport.session.request) as request:
+            self.assertPages(self.fetch(worker_url, parser))
+
+        self.assertEqual(request.call_args.kwargs['timeout'], (10, 60))
+        # Fast batch headers must not shrink the Worker's read timeout
+        self.assertEqual(parser.transport.timeouts.get(urllib.parse.urlsplit(worker_url).netloc), (10, 60))
+
+    def test_worker_without_batch_endpoint(self):
+        server = make_standin_server(0, self.origin_url)
+        posts = []
+
+        class SinglePageHandler(server.RequestHandlerClass):
+            # Worker deployed before the batch endpoint
+            def do_POST(self):
+                posts.append(self.path)
+                self.send_error(404)
+
+        server.RequestHandlerClass = SinglePageHandler
+        worker_url = self.enterContext(running(server))
+
+        pages = self.fetch(worker_url)
+
+        self.assertEqual(posts, ['/batch'])
+        self.assertPages(pages)
+        self.assertEqual(sorted(self.origin.requests), ['/rasp/group/1', '/rasp/group/2', '/rasp/group/3'])
@@ -0,0 +1,90 @@
+"""
+Helpers for schedule tests: small rasp.sstu.ru-like pages and a local origin
+server that serves them (with ETag / 304 support), so tests never hit the
+real site.
+"""
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Tuple, Union
+
+DAY_NAMES = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
+
+# (subject, lesson type, room, teacher SSTU ID, teacher name)
+DEFAULT_LESSONS = [
+    ('Математика', '(лек)', '1/101', 100, 'Иванов И.И.'),
+    ('Физика', '(пр)', '2/202', 101, 'Петров П.П.'),
+]
+
+
+def group_page(monday: date = date(2026, 9, 7), week_number: int = 2,
+               lessons: List[Tuple[str, str, str, int, str]] = DEFAULT_LESSONS) -> str:
+    """Group page of one week; ``lessons`` are put on Monday, one per lesson number."""
+    out = ['<html><body><div class="container"><div class="calendar"><div class="week">',
+           '<div class="day day-header-color-blue"><div class="day-header">Время</div></div>']
+    for weekday, day_name in enumerate(DAY_NAMES):
+        day = monday + timedelta(days=weekday)
+        out.append(f'<div class="day"><div class="day-header"><div><span>{day_name}</span>{day:%d.%m}</div></div>')
+        for number, (subject, lesson_type, room, teacher_id, teacher_name) in enumerate(lessons, start=1):
+            if weekday:
+                break
+            out.append(
+                f'<div class="day-lesson" data-lesson="w{week_number:02d}n{number}"><div>'
+                f'<div class="lesson-room">{room}</div><div class="lesson-name">{subject}</div>'
+                f'<div class="lesson-type">{lesson_type}</div>'
+                f'<a href="/teachers/{teacher_id}-teacher">{teacher_name}</a></div></div>'
+            )
+        out.append('</div>')
+    out.append('</div></div></div></body></html>')
+    return ''.join(out)
+
+
+def make_origin_server(pages: Dict[str, Union[str, int]]) -> ThreadingHTTPServer:
+    """
+    Server answering GET ``path`` with ``pages[path]``, ETag and 304 on
+    If-None-Match; an int value is sent as error status. Requested paths are
+    collected in ``server.requests``.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            self.server.requests.append(self.path)
+            page = pages.get(self.path, 404)
+            if isinstance(page, int):
+                self.send_error(page)
+                return
+            body = page.encode('utf-8')
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.requests = []
+    return server
+
+
+@contextmanager
+def running(server: ThreadingHTTPServer) -> Iterator[str]:
+    """Serve ``server`` in a thread, yield its base URL."""
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,283 @@
+"""
+HTTP transport for rasp.sstu.ru requests.
+
+Shared by the Django sync service and schedule_sync_client.py (through
+SSTUScheduleParser), so it must not depend on Django.
+
+- pooled keep-alive connections sized for concurrent fetching
+- retry policy (attempts, exponential backoff with jitter, Retry-After)
+  applied by the caller: the session itself does not retry, so every
+  attempt is seen by the circuit breaker and there is one retry layer
+- per-host circuit breaker that fails fast while the origin is down
+- per-host read timeout adapted to observed latency
+"""
+import importlib.util
+import logging
+import random
+import threading
+import time
+import urllib.parse
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# SOCKS proxies need PySocks (used by requests/urllib3 when installed)
+SOCKS_AVAILABLE = importlib.util.find_spec('socks') is not None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Statuses that mean the origin (or the Worker in front of it) is struggling
+RETRY_STATUSES = (429, 500, 502, 503, 504, 522, 524)
+
+
+class CircuitOpenError(Exception):
+    """Requests to host are suspended after repeated failures."""
+
+
+def _host(url: str) -> str:
+    return urllib.parse.urlsplit(url).netloc
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the host is "open" for
+    ``reset_timeout`` seconds and requests fail immediately. Then a single
+    trial request is let through ("half-open"): success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._trial_in_flight: Dict[str, bool] = {}
+
+    def before_request(self, host: str):
+        """Raise CircuitOpenError if requests to host are suspended."""
+        if self.failure_threshold <= 0:
+            return
+
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return
+
+            remaining = opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(f"Circuit for {host} is open, retry in {remaining:.0f}s")
+
+            if self._trial_in_flight.get(host):
+                raise CircuitOpenError(f"Circuit for {host} is half-open, trial request in progress")
+            self._trial_in_flight[host] = True
+
+    def record_success(self, host: str):
+        with self._lock:
+            if host in self._opened_at:
+                logger.info(f"Circuit for {host} closed")
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._trial_in_flight.pop(host, None)
+
+    def end_trial(self, host: str):
+        """Let another trial through if the half-open trial ended without an outcome (e.g. unexpected error)."""
+        with self._lock:
+            self._trial_in_flight.pop(host, None)
+
+    def record_failure(self, host: str):
+        if self.failure_threshold <= 0:
+            return
+
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            half_open = self._trial_in_flight.pop(host, False)
+            if half_open or failures >= self.failure_threshold:
+                if host not in self._opened_at or half_open:
+                    logger.warning(
+                        f"Circuit for {host} opened after {failures} failures, "
+                        f"pausing requests for {self.reset_timeout}s"
+                    )
+                self._opened_at[host] = time.monotonic()
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            return host in self._opened_at
+
+
+class AdaptiveTimeout:
+    """
+    Per-host read timeout derived from observed response latency.
+
+    Keeps an exponentially weighted moving average of time-to-headers and
+    uses ``multiplier`` times it, clamped to [min_timeout, max_timeout].
+    Until a host has samples the full ``max_timeout`` is used.
+    """
+
+    def __init__(self, max_timeout: float, min_timeout: float = 5, connect_timeout: float = 10,
+                 multiplier: float = 4, alpha: float = 0.2):
+        self.max_timeout = max_timeout
+        self.min_timeout = min(min_timeout, max_timeout)
+        self.connect_timeout = min(connect_timeout, max_timeout)
+        self.multiplier = multiplier
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._latency: Dict[str, float] = {}
+
+    def get(self, host: str) -> Tuple[float, float]:
+        """Return (connect, read) timeout for host."""
+        with self._lock:
+            latency = self._latency.get(host)
+        if latency is None:
+            return self.connect_timeout, self.max_timeout
+        read_timeout = min(self.max_timeout, max(self.min_timeout, latency * self.multiplier))
+        return self.connect_timeout, read_timeout
+
+    def observe(self, host: str, seconds: float):
+        """Record latency sample for host."""
+        with self._lock:
+            previous = self._latency.get(host)
+            if previous is None:
+                self._latency[host] = seconds
+            else:
+                self._latency[host] = previous + self.alpha * (seconds - previous)
+
+    def observe_timeout(self, host: str):
+        """A timed out request counts as a slow sample so the timeout grows back."""
+        _, read_timeout = self.get(host)
+        self.observe(host, read_timeout)
+
+
+class ScheduleTransport:
+    """Pooled, retrying, circuit-broken HTTP transport."""
+
+    def __init__(self, timeout: float = 30, proxy: Optional[str] = None, pool_size: int = 10,
+                 retries: int = 3, backoff_factor: float = 0.5, backoff_jitter: float = 0.5,
+                 backoff_max: float = 30, failure_threshold: int = 5, reset_timeout: float = 60,
+                 adaptive_timeout: bool = True, min_timeout: float = 5):
+        self.timeout = timeout
+        self.proxy = proxy
+        # Retries after the first attempt, made by the caller (see retryable / backoff_delay)
+        self.retries = max(0, retries)
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self.timeouts = AdaptiveTimeout(
+            max_timeout=timeout,
+            min_timeout=min_timeout if adaptive_timeout else timeout,
+            connect_timeout=min(10, timeout) if adaptive_timeout else timeout,
+        )
+        self.session = self._build_session(pool_size)
+
+    def _build_session(self, pool_size: int) -> requests.Session:
+        """Setup requests session with connection pool and proxy if needed (no retries: see retryable)."""
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(pool_size, 1))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        if self.proxy:
+            # Support both HTTP and SOCKS5 proxies
+            if self.proxy.startswith('socks5://') or self.proxy.startswith('socks4://'):
+                # SOCKS proxy - requires PySocks package
+                if not SOCKS_AVAILABLE:
+                    logger.error("SOCKS proxy requires 'PySocks' package. Install with: pip install PySocks")
+                    raise ImportError("PySocks is required for SOCKS proxy support")
+
+                # requests automatically detects SOCKS proxy format when PySocks is installed
+                session.proxies = {
+                    'http': self.proxy,
+                    'https': self.proxy
+                }
+                logger.info(f"Using SOCKS proxy: {self.proxy}")
+            else:
+                # HTTP proxy
+                session.proxies = {
+                    'http': self.proxy,
+                    'https': self.proxy
+                }
+                logger.info(f"Using HTTP proxy: {self.proxy}")
+
+        return session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET through the pool with circuit breaker and adaptive timeout.
+
+        Raises CircuitOpenError without touching the network while the host's
+        circuit is open.
+        """
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """POST with the same pool, circuit breaker and timeout as ``get``."""
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method: str, url: str, sample_latency: bool = True, **kwargs) -> requests.Response:
+        """
+        Request through the pool. With ``sample_latency=False`` the response
+        time does not feed the adaptive timeout (e.g. a streamed batch whose
+        headers come before the work is done).
+        """
+        host = _host(url)
+        self.breaker.before_request(host)
+        kwargs.setdefault('timeout', self.timeouts.get(host))
+
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.Timeout:
+            if sample_latency:
+                self.timeouts.observe_timeout(host)
+            self.breaker.record_failure(host)
+            raise
+        except requests.RequestException:
+            self.breaker.record_failure(host)
+            raise
+        except BaseException:
+            # Neither success nor failure of the host (e.g. a task time limit):
+            # don't leave a half-open circuit waiting for this trial forever
+            self.breaker.end_trial(host)
+            raise
+
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure(host)
+        else:
+            self.breaker.record_success(host)
+            if sample_latency:
+                self.timeouts.observe(host, response.elapsed.total_seconds())
+        return response
+
+    def report_failure(self, url: str, timed_out: bool = False):
+        """Record failure that happened after headers (e.g. while reading body)."""
+        host = _host(url)
+        if timed_out:
+            self.timeouts.observe_timeout(host)
+        self.breaker.record_failure(host)
+
+    @staticmethod
+    def retryable(error: Exception) -> bool:
+        """Whether a failed request is worth repeating (network errors, 429/5xx; not e.g. 404)."""
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code in RETRY_STATUSES
+        return isinstance(error, requests.RequestException)
+
+    def backoff_delay(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """
+        Delay before retry ``attempt`` (0-based): exponential with jitter, or
+        the response's Retry-After (in seconds, capped at ``backoff_max``).
+        """
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.strip().isdigit():
+            return min(self.backoff_max, float(retry_after))
+        delay = min(self.backoff_max, self.backoff_factor * (2 ** attempt))
+        return delay + random.uniform(0, self.backoff_jitter)
@@ -1,19 +1,27 @@
 """Views for schedule app."""
-from datetime import datetime, date as date_type, time as time_type
+from datetime import datetime, date as date_type, time as time_type, timedelta
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
 from accounts.permissions import IsAdmin
-from .models import Institute, Group, Teacher, Subject, Lesson, ScheduleUpdate
+from .models import Institute, Group, Teacher, Subject, Lesson, LessonChange, ScheduleUpdate, SemesterCalendar
 from .serializers import (
     InstituteSerializer, GroupListSerializer, GroupDetailSerializer,
     TeacherSerializer, SubjectSerializer, LessonSerializer,
-    LessonDetailSerializer, ScheduleUpdateSerializer
+    LessonDetailSerializer, LessonChangeSerializer, ScheduleUpdateSerializer,
+    GroupSyncStatSerializer
 )
 from .tasks import sync_all_schedules, sync_single_group
-from .services import ScheduleSyncService
+from .sync_lease import FULL_SYNC, current_holder, group_lease_name, single_flight
+from .services import ScheduleSyncService, prune_lesson_changes
+from .dimensions import DimensionResolver
+from .lesson_writer import GroupLessonWriter
+from .records import ParsedLesson, lesson_set_hash
+from .sync_scheduler import record_group_request
 
 
 class InstituteViewSet(viewsets.ReadOnlyModelViewSet):
@@ -47,7 +55,7 @@ class GroupViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=True, methods=['post'])
     def sync(self, request, pk=None):
-        """Trigger schedule sync for specific group."""
+        """Trigger schedule sync for specific group (returns the in-flight job if there is one)."""
         group = self.get_object()
         
         if not group.sstu_id:
@@ -56,12 +64,17 @@ class GroupViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Trigger async task
-        sync_single_group.delay(group.sstu_id)
+        # Trigger async task unless one is already queued or running
+        task_id, started = single_flight(group_lease_name(group.sstu_id), sync_single_group, args=(group.sstu_id,))
         
         return Response({
-            'message': f'Schedule sync started for group {group.name}',
-            'group_id': group.id
+            'message': (
+                f'Schedule sync started for group {group.name}' if started
+                else f'Schedule sync for group {group.name} is already in progress'
+            ),
+            'group_id': group.id,
+            'task_id': task_id,
+            'coalesced': not started
         })
     
     @action(detail=False, methods=['get'])
@@ -139,6 +152,12 @@ class LessonViewSet(viewsets.ReadOnlyModelViewSet):
             return LessonDetailSerializer
         return LessonSerializer
     
+    def list(self, request, *args, **kwargs):
+        group_id = request.query_params.get('group')
+        if group_id and group_id.isdigit():
+            record_group_request(int(group_id))
+        return super().list(request, *args, **kwargs)
+    
     def get_queryset(self):
         """Filter lessons based on query params."""
         queryset = super().get_queryset()
@@ -157,6 +176,37 @@ class LessonViewSet(viewsets.ReadOnlyModelViewSet):
                 Q(specific_date__lte=date_to) | Q(specific_date__isnull=True)
             )
         
+        # Filter by semester week: number or "current"
+        week = self.request.query_params.get('week')
+        if week:
+            semester = SemesterCalendar.current()
+            if week == 'current':
+                today = date_type.today()
+                if semester:
+                    week_number = semester.week_number(today)
+                else:
+                    # Без календаря семестра номер недели берём из занятий этой недели
+                    monday = today - timedelta(days=today.weekday())
+                    week_number = Lesson.objects.filter(
+                        specific_date__range=(monday, monday + timedelta(days=6)),
+                        week_number__isnull=False,
+                    ).values_list('week_number', flat=True).first()
+            else:
+                try:
+                    week_number = int(week)
+                except ValueError:
+                    week_number = None
+            if not week_number or week_number < 1:
+                return queryset.none()
+            if semester:
+                monday, sunday = semester.week_dates(week_number)
+                queryset = queryset.filter(
+                    Q(specific_date__range=(monday, sunday)) |
+                    Q(specific_date__isnull=True, week_number=week_number)
+                )
+            else:
+                queryset = queryset.filter(week_number=week_number)
+        
         # Filter by institute
         institute_id = self.request.query_params.get('institute')
         if institute_id:
@@ -175,6 +225,7 @@ class LessonViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        record_group_request(user.group_id)
         # Get lessons for user's group
         lessons = self.get_queryset().filter(group=user.group)
         
@@ -205,6 +256,7 @@ class LessonViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        record_group_request(group.id)
         # Get all lessons for the week, grouped by day
         lessons = self.get_queryset().filter(group=group).order_by('weekday', 'lesson_number')
         
@@ -220,6 +272,47 @@ class LessonViewSet(viewsets.ReadOnlyModelViewSet):
             'group': GroupListSerializer(group).data,
             'schedule': weekly_schedule
         })
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Lesson changes after cursor ``since`` (ID of the last change seen,
+        0 - from the oldest kept change, ``latest`` - only get the current
+        cursor, e.g. right after loading the full schedule), oldest first.
+        
+        ``reset`` is true if changes after the cursor were already deleted:
+        the client has to reload the full schedule.
+        """
+        changes = LessonChange.objects.all()
+        group_id = request.query_params.get('group')
+        try:
+            if group_id:
+                changes = changes.filter(group_id=int(group_id))
+                record_group_request(int(group_id))
+            limit = min(int(request.query_params.get('limit') or 500), 1000)
+            since = request.query_params.get('since') or 0
+            if since == 'latest':
+                since = changes.aggregate(latest=Max('id'))['latest'] or 0
+            since = int(since)
+        except ValueError:
+            return Response(
+                {'error': 'group, since and limit must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        page = list(changes.filter(id__gt=since).order_by('id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        
+        oldest = LessonChange.objects.aggregate(oldest=Min('id'))['oldest']
+        reset = bool(since and oldest and since < oldest - 1)
+        
+        return Response({
+            'results': LessonChangeSerializer(page, many=True).data,
+            'cursor': page[-1].id if page else since,
+            'has_more': has_more,
+            'reset': reset,
+        })
 
 
 class ScheduleUpdateViewSet(viewsets.ReadOnlyModelViewSet):
@@ -235,29 +328,45 @@ class ScheduleUpdateViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['post'], permission_classes=[IsAdmin])
     def trigger_sync(self, request):
-        """Trigger full schedule synchronization (admin only)."""
-        # Check if sync is already in progress
-        in_progress = ScheduleUpdate.objects.filter(status=ScheduleUpdate.Status.IN_PROGRESS).exists()
-        if in_progress:
-            return Response(
-                {'error': 'Schedule synchronization is already in progress'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        """
+        Trigger full schedule synchronization, or resume an interrupted one (admin only).
+        If a sync is already queued or running, its job is returned instead.
+        """
+        # Chord tasks of a running update may outlive the lease
+        running = ScheduleUpdate.running().first()
+        if running:
+            return Response({
+                'message': 'Schedule synchronization is already in progress',
+                'task_id': current_holder(FULL_SYNC),
+                'update_id': running.id,
+                'coalesced': True
+            })
+        interrupted = ScheduleUpdate.interrupted().last()
         
-        # Trigger async task
-        task = sync_all_schedules.delay()
+        # Trigger async task unless one is already queued
+        task_id, started = single_flight(FULL_SYNC, sync_all_schedules)
         
+        if not started:
+            return Response({
+                'message': 'Schedule synchronization is already in progress',
+                'task_id': task_id,
+                'coalesced': True
+            })
         return Response({
-            'message': 'Schedule synchronization started',
-            'task_id': task.id
+            'message': (
+                'Resuming interrupted schedule synchronization' if interrupted
+                else 'Schedule synchronization started'
+            ),
+            'task_id': task_id,
+            'update_id': interrupted.id if interrupted else None,
+            'coalesced': False
         })
     
     @action(detail=False, methods=['post'], permission_classes=[IsAdmin])
     def trigger_sync_sync(self, request):
         """Trigger full schedule synchronization synchronously (admin only)."""
         # Check if sync is already in progress
-        in_progress = ScheduleUpdate.objects.filter(status=ScheduleUpdate.Status.IN_PROGRESS).exists()
-        if in_progress:
+        if ScheduleUpdate.running().exists():
             return Response(
                 {'error': 'Schedule synchronization is already in progress'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -299,6 +408,42 @@ class ScheduleUpdateViewSet(viewsets.ReadOnlyModelViewSet):
         
         serializer = self.get_serializer(latest)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def slowest(self, request, pk=None):
+        """
+        Phase timings of an update and its N slowest groups.
+        Params: ``limit`` (default 10, max 100), ``by``: total, fetch, parse or db.
+        """
+        update = self.get_object()
+        order_by = {
+            'total': F('fetch_ms') + F('parse_ms') + F('db_ms'),
+            'fetch': F('fetch_ms'),
+            'parse': F('parse_ms'),
+            'db': F('db_ms'),
+        }.get(request.query_params.get('by') or 'total')
+        try:
+            limit = min(int(request.query_params.get('limit') or 10), 100)
+        except ValueError:
+            limit = None
+        if order_by is None or limit is None:
+            return Response(
+                {'error': 'by must be total, fetch, parse or db; limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        stats = update.group_stats.select_related('group')
+        slowest = stats.order_by(order_by.desc(), 'id')[:limit]
+        outcomes = dict(stats.values_list('outcome').annotate(count=Count('id')).order_by())
+        totals = stats.aggregate(fetch_ms=Sum('fetch_ms'), parse_ms=Sum('parse_ms'), db_ms=Sum('db_ms'))
+        
+        return Response({
+            'update': self.get_serializer(update).data,
+            'groups': sum(outcomes.values()),
+            'outcomes': outcomes,
+            'totals_ms': {key: value or 0 for key, value in totals.items()},
+            'slowest': GroupSyncStatSerializer(slowest, many=True).data,
+        })
 
     @action(detail=False, methods=['post'], permission_classes=[IsAdmin])
     def import_group(self, request):
@@ -398,11 +543,8 @@ class ScheduleUpdateViewSet(viewsets.ReadOnlyModelViewSet):
             if changed:
                 group.save()
 
-        # Mark old lessons inactive
-        Lesson.objects.filter(group=group, is_active=True).update(is_active=False)
-
-        created_count = 0
-        updated_count = 0
+        # Week numbers follow the server's semester calendar, not the client's
+        semester = SemesterCalendar.current()
 
         # De-dupe incoming lessons to reduce duplicates from parsing glitches
         seen = set()
@@ -423,88 +565,57 @@ class ScheduleUpdateViewSet(viewsets.ReadOnlyModelViewSet):
             seen.add(key)
             normalized_lessons.append(l)
 
+        lessons = []
         for lesson_data in normalized_lessons:
             try:
                 subject_name = (lesson_data.get('subject_name') or '').strip()
                 if not subject_name:
                     continue
 
-                subject, _ = Subject.objects.get_or_create(name=subject_name)
-
-                teacher = None
-                teacher_name = (lesson_data.get('teacher_name') or '').strip()
                 teacher_id = lesson_data.get('teacher_id')
-                teacher_url = lesson_data.get('teacher_url')
-                if teacher_name:
-                    teacher_defaults = {'full_name': teacher_name}
-                    if teacher_url:
-                        teacher_defaults['sstu_profile_url'] = teacher_url
-                    if teacher_id is not None:
-                        teacher, _ = Teacher.objects.get_or_create(
-                            sstu_id=teacher_id,
-                            defaults=teacher_defaults
-                        )
-                        # keep name/url in sync
-                        if teacher.full_name != teacher_name or (teacher_url and teacher.sstu_profile_url != teacher_url):
-                            teacher.full_name = teacher_name
-                            if teacher_url:
-                                teacher.sstu_profile_url = teacher_url
-                            teacher.save()
-                    else:
-                        teacher, _ = Teacher.objects.get_or_create(
-                            full_name=teacher_name,
-                            defaults=teacher_defaults
-                        )
-
                 specific_date = _parse_date(lesson_data.get('specific_date'))
                 start_time = _parse_time(lesson_data.get('start_time'))
                 end_time = _parse_time(lesson_data.get('end_time'))
-                weekday = int(lesson_data.get('weekday'))
-                lesson_number = int(lesson_data.get('lesson_number'))
-
-                lesson_defaults = {
-                    'group': group,
-                    'subject': subject,
-                    'teacher': teacher,
-                    'lesson_type': lesson_data.get('lesson_type') or Lesson.LessonType.OTHER,
-                    'room': lesson_data.get('room') or '',
-                    'weekday': weekday,
-                    'lesson_number': lesson_number,
-                    'start_time': start_time,
-                    'end_time': end_time,
-                    'specific_date': specific_date,
-                    'week_number': lesson_data.get('week_number'),
-                    'additional_info': lesson_data.get('additional_info') or '',
-                    'is_active': True,
-                }
-
-                lookup = {
-                    'group': group,
-                    'weekday': weekday,
-                    'lesson_number': lesson_number,
-                    'subject': subject,
-                }
-                if specific_date is not None:
-                    lookup['specific_date'] = specific_date
-                else:
-                    lookup['specific_date__isnull'] = True
-                if teacher:
-                    lookup['teacher'] = teacher
-
-                existing = Lesson.objects.filter(**lookup).first()
-                if existing:
-                    for k, v in lesson_defaults.items():
-                        setattr(existing, k, v)
-                    existing.save()
-                    updated_count += 1
-                else:
-                    Lesson.objects.create(**lesson_defaults)
-                    created_count += 1
+                if start_time is None or end_time is None:
+                    continue
+                lessons.append(ParsedLesson.create(
+                    subject_name=subject_name,
+                    teacher_name=(lesson_data.get('teacher_name') or '').strip() or None,
+                    teacher_id=int(teacher_id) if teacher_id not in (None, '') else None,
+                    teacher_url=lesson_data.get('teacher_url') or None,
+                    lesson_type=lesson_data.get('lesson_type') or Lesson.LessonType.OTHER,
+                    room=lesson_data.get('room') or '',
+                    weekday=int(lesson_data.get('weekday')),
+                    lesson_number=int(lesson_data.get('lesson_number')),
+                    start_time=start_time,
+                    end_time=end_time,
+                    specific_date=specific_date,
+                    week_number=(semester and semester.week_number(specific_date)) or lesson_data.get('week_number'),
+                    additional_info=(lesson_data.get('additional_info') or '').strip(),
+                ))
             except Exception:
                 # Skip bad lesson rows but keep import going
                 continue
 
-        removed_count = Lesson.objects.filter(group=group, is_active=False).delete()[0]
+        now = timezone.now()
+        schedule_hash = lesson_set_hash(lessons)
+        if lessons and schedule_hash == group.schedule_hash:
+            Group.objects.filter(pk=group.pk).update(last_synced_at=now)
+            return Response({
+                'message': 'Group schedule unchanged',
+                'group_id': group.id,
+                'group_name': group.name,
+                'lessons_received': len(lessons_data),
+                'lessons_deduped': len(normalized_lessons),
+                'unchanged': True,
+            })
+
+        # Same diff-and-apply writer and subject/teacher resolution as the server sync
+        with transaction.atomic():
+            result = GroupLessonWriter(DimensionResolver()).write(group, lessons)
+            Group.objects.filter(pk=group.pk).update(schedule_hash=schedule_hash, last_synced_at=now)
+        # Deployments fed only by client imports never finish a server sync
+        prune_lesson_changes()
 
         return Response({
             'message': 'Imported group schedule',
@@ -512,8 +623,10 @@ class ScheduleUpdateViewSet(viewsets.ReadOnlyModelViewSet):
             'group_name': group.name,
             'lessons_received': len(lessons_data),
             'lessons_deduped': len(normalized_lessons),
-            'lessons_created': created_count,
-            'lessons_updated': updated_count,
-            'lessons_removed': removed_count,
+            'lessons_created': result.created,
+            'lessons_updated': result.updated,
+            'lessons_unchanged': result.unchanged,
+            'lessons_removed': result.removed,
+            'unchanged': False,
         })
 
@@ -0,0 +1,158 @@
+"""
+Batch protocol of the Cloudflare Worker proxy (``cloudflare-worker-proxy.js``).
+
+Request: ``POST <worker>/batch`` with JSON
+``{"requests": [{"url": "...", "headers": {"If-None-Match": "..."}}]}``.
+
+Response (``application/x-sstu-batch``): one frame per requested URL, in the
+order pages become ready. A frame is a JSON metadata line
+(``index``, ``url``, ``status``, ``headers``, ``length``; ``status`` 0 and
+``error`` if the Worker could not fetch the page) followed by exactly
+``length`` bytes of page body.
+
+``python -m backend.schedule.worker_batch [PORT] [ORIGIN]`` runs a local
+stand-in of the Worker speaking the same protocol. Django-free.
+"""
+import json
+import logging
+import sys
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+BATCH_PATH = '/batch'
+BATCH_CONTENT_TYPE = 'application/x-sstu-batch'
+# Worker limit (Cloudflare free plan: 50 subrequests per invocation)
+MAX_BATCH_SIZE = 50
+FORWARDED_REQUEST_HEADERS = ('If-None-Match', 'If-Modified-Since')
+FORWARDED_RESPONSE_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class BatchProtocolError(Exception):
+    """Batch response stream is malformed or truncated."""
+
+
+def encode_batch_request(urls: Iterable[str], headers: Optional[Dict[str, Dict[str, str]]] = None) -> Dict:
+    """JSON body of a batch request; ``headers`` maps URL to its conditional headers."""
+    headers = headers or {}
+    return {'requests': [{'url': url, 'headers': headers.get(url) or {}} for url in urls]}
+
+
+def encode_frame(meta: Dict, body: bytes = b'') -> bytes:
+    """One response frame: metadata line and body."""
+    meta = dict(meta, length=len(body))
+    return json.dumps(meta, ensure_ascii=False).encode('utf-8') + b'\n' + body
+
+
+def iter_frames(chunks: Iterable[bytes]) -> Iterator[Tuple[Dict, bytes]]:
+    """
+    Split response byte chunks into ``(meta, body)`` frames as they arrive.
+    Raises BatchProtocolError if the stream ends inside a frame.
+    """
+    buffer = bytearray()
+    meta = None
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+        while True:
+            if meta is None:
+                newline = buffer.find(b'\n')
+                if newline < 0:
+                    break
+                try:
+                    meta = json.loads(bytes(buffer[:newline]))
+                    length = int(meta.get('length') or 0)
+                except (ValueError, TypeError, AttributeError) as e:
+                    raise BatchProtocolError(f"Bad frame header: {e}") from None
+                del buffer[:newline + 1]
+            if len(buffer) < length:
+                break
+            body = bytes(buffer[:length])
+            del buffer[:length]
+            yield meta, body
+            meta = None
+    if meta is not None or buffer.strip():
+        raise BatchProtocolError('Batch response ended inside a frame')
+
+
+def make_standin_server(port: int = 8787, origin: Optional[str] = None, concurrency: int = 6) -> ThreadingHTTPServer:
+    """
+    Local HTTP server behaving like the Worker: ``GET /?url=`` proxies one
+    page, ``POST /batch`` answers with frames. With ``origin`` set, the
+    scheme and host of every target URL are replaced by it (e.g. to serve
+    a recorded corpus instead of rasp.sstu.ru).
+    """
+    session = requests.Session()
+
+    def fetch(url: str, headers: Dict[str, str]) -> Tuple[Dict, bytes]:
+        if origin:
+            parts = urllib.parse.urlsplit(url)
+            url = origin.rstrip('/') + urllib.parse.urlunsplit(('', '', parts.path, parts.query, ''))
+        try:
+            response = session.get(url, headers=headers, timeout=28)
+        except requests.RequestException as e:
+            return {'status': 0, 'error': str(e)}, b''
+        response_headers = {
+            name: response.headers[name] for name in FORWARDED_RESPONSE_HEADERS if name in response.headers
+        }
+        return {'status': response.status_code, 'headers': response_headers}, response.content
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _forwarded_headers(self, source) -> Dict[str, str]:
+            return {name: source[name] for name in FORWARDED_REQUEST_HEADERS if source.get(name)}
+
+        def do_GET(self):
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            target = (query.get('url') or ['https://rasp.sstu.ru/'])[0]
+            meta, body = fetch(target, self._forwarded_headers(self.headers))
+            self.send_response(meta['status'] or 502)
+            for name, value in meta.get('headers', {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if urllib.parse.urlsplit(self.path).path != BATCH_PATH:
+                self.send_error(404)
+                return
+            try:
+                items: List[Dict] = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))['requests']
+            except (ValueError, KeyError, TypeError):
+                items = []
+            if not items or len(items) > MAX_BATCH_SIZE:
+                self.send_error(400, f"Expected 1-{MAX_BATCH_SIZE} requests")
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', BATCH_CONTENT_TYPE)
+            self.end_headers()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = {
+                    executor.submit(fetch, item.get('url', ''), self._forwarded_headers(item.get('headers') or {})): index
+                    for index, item in enumerate(items)
+                }
+                for future in futures:
+                    index = futures[future]
+                    meta, body = future.result()
+                    self.wfile.write(encode_frame(dict(meta, index=index, url=items[index].get('url')), body))
+                    self.wfile.flush()
+
+    return ThreadingHTTPServer(('127.0.0.1', port), Handler)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8787
+    server = make_standin_server(port, sys.argv[2] if len(sys.argv) > 2 else None)
+    logger.info(f"Worker stand-in listening on http://127.0.0.1:{port}")
+    server.serve_forever()
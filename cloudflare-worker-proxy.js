@@ -2,12 +2,123 @@
 // Разверните этот код в Cloudflare Workers (бесплатно)
 
 addEventListener('fetch', event => {
-  event.respondWith(handleRequest(event.request))
+  event.respondWith(handleRequest(event.request, event))
 })
 
-async function handleRequest(request) {
+// Пакетный режим: POST /batch с JSON {"requests": [{"url": "...", "headers": {...}}]}
+// Ответ - поток кадров в порядке готовности страниц: строка JSON с метаданными
+// ({"index", "url", "status", "headers", "length"} или {"index", "url", "status": 0, "error"}),
+// затем ровно length байт тела. Формат разбирает backend/schedule/worker_batch.py
+const BATCH_PATH = '/batch'
+const BATCH_CONTENT_TYPE = 'application/x-sstu-batch'
+// Бесплатный план: не больше 50 подзапросов на вызов и 6 одновременных соединений
+const MAX_BATCH_SIZE = 50
+const BATCH_CONCURRENCY = 6
+const ALLOWED_HOST = 'rasp.sstu.ru'
+
+const ORIGIN_HEADERS = {
+  'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+  'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+  'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+  'Cache-Control': 'no-cache',
+  'Referer': 'https://rasp.sstu.ru/',
+}
+
+async function fetchBatchItem(item) {
+  const controller = new AbortController()
+  const timeoutId = setTimeout(() => controller.abort(), 28000)
+  try {
+    const target = new URL(item.url)
+    if (target.hostname !== ALLOWED_HOST) {
+      return { meta: { status: 0, error: `Host ${target.hostname} is not allowed` }, body: new Uint8Array(0) }
+    }
+    const headers = { ...ORIGIN_HEADERS }
+    for (const name of ['If-None-Match', 'If-Modified-Since']) {
+      if (item.headers && item.headers[name]) {
+        headers[name] = item.headers[name]
+      }
+    }
+    const response = await fetch(target.toString(), { headers, redirect: 'follow', signal: controller.signal })
+    const body = response.status === 304 ? new Uint8Array(0) : new Uint8Array(await response.arrayBuffer())
+    const responseHeaders = {}
+    for (const name of ['Content-Type', 'ETag', 'Last-Modified']) {
+      const value = response.headers.get(name)
+      if (value) {
+        responseHeaders[name] = value
+      }
+    }
+    return { meta: { status: response.status, headers: responseHeaders }, body }
+  } catch (error) {
+    const message = error.name === 'AbortError' ? 'Request timeout' : (error.message || String(error))
+    return { meta: { status: 0, error: message }, body: new Uint8Array(0) }
+  } finally {
+    clearTimeout(timeoutId)
+  }
+}
+
+async function handleBatch(request, event) {
+  let items
+  try {
+    items = (await request.json()).requests
+  } catch (error) {
+    items = null
+  }
+  if (!Array.isArray(items) || items.length === 0 || items.length > MAX_BATCH_SIZE) {
+    return new Response(JSON.stringify({ error: `Expected 1-${MAX_BATCH_SIZE} requests` }), {
+      status: 400,
+      headers: { 'Content-Type': 'application/json' }
+    })
+  }
+
+  const { readable, writable } = new TransformStream()
+  const writer = writable.getWriter()
+  const encoder = new TextEncoder()
+  // Кадры пишутся по одному, страницы - по мере готовности
+  let writing = Promise.resolve()
+  const writeFrame = (index, url, result) => {
+    const meta = { index, url, ...result.meta, length: result.body.length }
+    writing = writing.then(async () => {
+      await writer.write(encoder.encode(JSON.stringify(meta) + '\n'))
+      if (result.body.length) {
+        await writer.write(result.body)
+      }
+    })
+    return writing
+  }
+
+  const run = async () => {
+    let next = 0
+    const worker = async () => {
+      while (next < items.length) {
+        const index = next++
+        const item = items[index] || {}
+        await writeFrame(index, item.url, await fetchBatchItem(item))
+      }
+    }
+    try {
+      await Promise.all(Array.from({ length: Math.min(BATCH_CONCURRENCY, items.length) }, worker))
+      await writing
+      await writer.close()
+    } catch (error) {
+      // Клиент увидит оборванный поток и дозагрузит недостающие страницы по одной
+      await writer.abort(error)
+    }
+  }
+
+  // Загрузка продолжается после отправки заголовков ответа
+  event.waitUntil(run())
+  return new Response(readable, {
+    status: 200,
+    headers: { 'Content-Type': BATCH_CONTENT_TYPE, 'Cache-Control': 'no-cache' },
+  })
+}
+
+async function handleRequest(request, event) {
   // Получаем URL из параметра запроса
   const url = new URL(request.url)
+  if (request.method === 'POST' && url.pathname === BATCH_PATH) {
+    return handleBatch(request, event)
+  }
   let targetUrl = url.searchParams.get('url')
   
   // Если URL не передан, используем путь из запроса
@@ -20,6 +131,16 @@ async function handleRequest(request) {
     }
   }
   
+  // Условные заголовки клиента (кэш страниц парсера) передаём на rasp.sstu.ru,
+  // чтобы неизменившиеся страницы возвращались как 304 без тела
+  const conditionalHeaders = {}
+  for (const name of ['If-None-Match', 'If-Modified-Since']) {
+    const value = request.headers.get(name)
+    if (value) {
+      conditionalHeaders[name] = value
+    }
+  }
+  
   // Создаем новый запрос к целевому сайту с увеличенным таймаутом
   const modifiedRequest = new Request(targetUrl, {
     method: request.method,
@@ -55,6 +176,7 @@ async function handleRequest(request) {
         'Upgrade-Insecure-Requests': '1',
         'Cache-Control': 'no-cache',
         'Referer': 'https://rasp.sstu.ru/',
+        ...conditionalHeaders,
       },
       // Cloudflare Workers автоматически проксируют через их сеть
       // Используем redirect: 'follow' для следования редиректам
@@ -66,16 +188,25 @@ async function handleRequest(request) {
     clearTimeout(timeoutId)
     
     // Создаем новый ответ с правильными заголовками
-    const modifiedResponse = new Response(response.body, {
+    const responseHeaders = {
+      'Content-Type': response.headers.get('Content-Type') || 'text/html; charset=utf-8',
+      'Access-Control-Allow-Origin': '*',
+      'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+      'Access-Control-Allow-Headers': 'Content-Type, If-None-Match, If-Modified-Since',
+      'Cache-Control': 'no-cache',
+    }
+    // Валидаторы нужны парсеру для условных запросов в следующий раз
+    for (const name of ['ETag', 'Last-Modified']) {
+      const value = response.headers.get(name)
+      if (value) {
+        responseHeaders[name] = value
+      }
+    }
+    
+    const modifiedResponse = new Response(response.status === 304 ? null : response.body, {
       status: response.status,
       statusText: response.statusText,
-      headers: {
-        'Content-Type': response.headers.get('Content-Type') || 'text/html; charset=utf-8',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type',
-        'Cache-Control': 'no-cache',
-      },
+      headers: responseHeaders,
     })
     
     return modifiedResponse
@@ -7,6 +7,7 @@
 1. Установите зависимости: pip install requests schedule python-dotenv
 2. Создайте файл .env с настройками (см. ниже)
 3. Запустите скрипт: python schedule_sync_client.py
+   Перепарсить снимок архива страниц без сети: python schedule_sync_client.py --replay [SNAPSHOT]
 
 Для автозапуска:
 - Windows: Добавьте в Планировщик заданий Windows
@@ -57,6 +58,21 @@ ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', '')
 # Настройки локального парсинга rasp.sstu.ru (на вашем ПК)
 SSTU_TIMEOUT = int(os.getenv('SSTU_TIMEOUT', '60'))
 SSTU_PROXY = os.getenv('SSTU_PROXY', '').strip() or None
+SSTU_HTML_BACKEND = os.getenv('SSTU_HTML_BACKEND', 'auto')  # auto / lxml / html.parser
+SSTU_CONCURRENCY = int(os.getenv('SSTU_CONCURRENCY', '4'))  # Сколько групп парсить параллельно
+# Кэш страниц (ETag/Last-Modified/хэш): неизменившиеся группы не парсятся и не отправляются
+SSTU_CACHE_DIR = os.getenv('SSTU_CACHE_DIR', '').strip() or None
+SSTU_CACHE_MAX_AGE = int(os.getenv('SSTU_CACHE_MAX_AGE', str(24 * 60 * 60)))  # секунды
+# Повторы с экспоненциальной задержкой и "предохранитель": после N ошибок подряд
+# запросы к rasp.sstu.ru не отправляются SSTU_CIRCUIT_RESET секунд
+SSTU_RETRIES = int(os.getenv('SSTU_RETRIES', '3'))
+SSTU_BACKOFF_FACTOR = float(os.getenv('SSTU_BACKOFF_FACTOR', '0.5'))
+SSTU_CIRCUIT_FAILURES = int(os.getenv('SSTU_CIRCUIT_FAILURES', '5'))
+SSTU_CIRCUIT_RESET = int(os.getenv('SSTU_CIRCUIT_RESET', '60'))
+# Архив сырых страниц: с ним можно перепарсить сохранённый снимок без запросов к сайту (--replay)
+SSTU_ARCHIVE_DIR = os.getenv('SSTU_ARCHIVE_DIR', '').strip() or None
+# Начало семестра (YYYY-MM-DD): год дат в заголовках дней и номера недель
+SSTU_SEMESTER_START = os.getenv('SSTU_SEMESTER_START', '').strip() or None
 
 SYNC_INTERVAL_HOURS = int(os.getenv('SYNC_INTERVAL_HOURS', '3'))  # Каждые 3 часа
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -190,10 +206,13 @@ def refresh_access_token():
         return False
 
 
-def sync_schedule():
+def sync_schedule(replay: str = None):
     """
     Локально парсит rasp.sstu.ru (на вашем ПК) и загружает данные на сервер через API.
     Сервер НЕ делает никаких запросов к rasp.sstu.ru.
+    
+    replay: снимок архива SSTU_ARCHIVE_DIR ('latest' или ID), который нужно
+    перепарсить вместо обращения к rasp.sstu.ru.
     """
     global _current_token, _current_refresh_token
     
@@ -238,6 +257,10 @@ def sync_schedule():
         
         # Импортируем парсер
         from backend.schedule.parser import SSTUScheduleParser  # type: ignore
+        from backend.schedule.page_cache import PageCache  # type: ignore
+        from backend.schedule.transport import ScheduleTransport  # type: ignore
+        from backend.schedule.page_archive import ArchiveSnapshot, PageArchive  # type: ignore
+        from backend.schedule.semester import Semester, parse_semester_start  # type: ignore
     except ImportError as e:
         logger.error(f"Не удалось импортировать парсер. Убедитесь, что папка 'backend/schedule' существует. Ошибка: {e}")
         logger.error(f"Текущий путь скрипта: {script_dir}")
@@ -247,33 +270,75 @@ def sync_schedule():
         logger.error(f"Неожиданная ошибка при импорте парсера: {e}", exc_info=True)
         return False
 
-    parser = SSTUScheduleParser(timeout=SSTU_TIMEOUT, proxy=SSTU_PROXY, cloudflare_worker_url=None)
-
-    logger.info("Начинаю локальный парсинг rasp.sstu.ru...")
+    transport = ScheduleTransport(
+        timeout=SSTU_TIMEOUT,
+        proxy=SSTU_PROXY,
+        pool_size=max(10, SSTU_CONCURRENCY),
+        retries=SSTU_RETRIES,
+        backoff_factor=SSTU_BACKOFF_FACTOR,
+        failure_threshold=SSTU_CIRCUIT_FAILURES,
+        reset_timeout=SSTU_CIRCUIT_RESET,
+    )
+    page_cache = PageCache(SSTU_CACHE_DIR, max_age=SSTU_CACHE_MAX_AGE) if SSTU_CACHE_DIR else None
+    archive = None
+    replay_snapshot = None
+    if replay:
+        if not SSTU_ARCHIVE_DIR:
+            logger.error("Для --replay нужно указать SSTU_ARCHIVE_DIR")
+            return False
+        try:
+            replay_snapshot = ArchiveSnapshot(SSTU_ARCHIVE_DIR, replay)
+        except ValueError as e:
+            logger.error(f"Не удалось открыть архив страниц: {e}")
+            return False
+        # Офлайн перепарсиваем всё: кэш страниц не используется
+        page_cache = None
+    elif SSTU_ARCHIVE_DIR:
+        archive = PageArchive(SSTU_ARCHIVE_DIR)
+
+    semester_start = parse_semester_start(SSTU_SEMESTER_START)
+
+    parser = SSTUScheduleParser(
+        timeout=SSTU_TIMEOUT,
+        proxy=SSTU_PROXY,
+        cloudflare_worker_url=None,
+        html_backend=SSTU_HTML_BACKEND,
+        max_connections_per_host=SSTU_CONCURRENCY,
+        page_cache=page_cache,
+        transport=transport,
+        archive=archive,
+        replay=replay_snapshot,
+        semester=Semester(semester_start) if semester_start else None,
+    )
+
+    if replay_snapshot:
+        logger.info(f"Перепарсиваю снимок архива {replay_snapshot.snapshot} (без запросов к rasp.sstu.ru)...")
+    else:
+        logger.info("Начинаю локальный парсинг rasp.sstu.ru...")
     institutes = parser.parse_main_page()
     if not institutes:
         logger.error("Не удалось распарсить главную страницу rasp.sstu.ru (institutes пустой)")
         return False
 
-    def _ser_time(t):
-        if t is None:
-            return None
-        return t.strftime('%H:%M:%S')
-
-    def _ser_date(d):
-        if d is None:
-            return None
-        return d.isoformat()
-
     total_groups = 0
     ok_groups = 0
     total_lessons = 0
+    unchanged_groups = 0
     failed_groups = []  # Список групп, которые не удалось отправить
 
     import_url = f"{API_BASE_URL}/schedule/updates/import_group/"
 
-    def _try_send_group(payload: dict, group_name: str, retries: int = 3) -> bool:
+    def _build_payload(parsed_group) -> dict:
+        inst_payload, group_payload, lessons = parsed_group
+        return {
+            'institute': inst_payload,
+            'group': group_payload,
+            'lessons': [lesson.to_payload() for lesson in lessons],
+        }
+
+    def _try_send_group(parsed_group, group_name: str, retries: int = 3) -> bool:
         """Пытается отправить группу на сервер с повторными попытками."""
+        payload = _build_payload(parsed_group)
         for attempt in range(retries):
             try:
                 # Добавляем небольшую задержку между попытками (кроме первой)
@@ -333,9 +398,10 @@ def sync_schedule():
         return False
 
     # Сначала парсим все группы и сохраняем их данные
-    logger.info("Этап 1: Парсинг всех групп...")
+    logger.info(f"Этап 1: Парсинг всех групп (параллельно: {SSTU_CONCURRENCY})...")
     parsed_groups = []
     
+    groups_to_parse = {}
     for inst in institutes:
         inst_payload = {'name': inst.get('name'), 'sstu_id': inst.get('sstu_id')}
         for grp in inst.get('groups', []) or []:
@@ -346,60 +412,56 @@ def sync_schedule():
                 continue
             
             total_groups += 1
-            logger.info(f"Парсинг расписания для группы: {group_name} (ID: {group_sstu_id})...")
+            groups_to_parse[group_sstu_id] = (inst_payload, grp)
+    
+    for result in parser.parse_many_groups(groups_to_parse.keys(), concurrency=SSTU_CONCURRENCY):
+        inst_payload, grp = groups_to_parse[result.group_id]
+        group_sstu_id = result.group_id
+        group_name = grp.get('name')
+        
+        if result.error:
+            logger.error(f"Ошибка при парсинге группы {group_name}: {result.error}")
+            continue
+        
+        if result.unchanged:
+            # Страница не изменилась с прошлого запуска — на сервере уже актуальные данные
+            logger.info(f"Без изменений: {group_name} (ID: {group_sstu_id})")
+            unchanged_groups += 1
+            continue
+        
+        logger.info(f"Распаршено расписание группы: {group_name} (ID: {group_sstu_id}), занятий: {len(result.lessons)}")
+        
+        try:
+            lessons = result.lessons or []
+            total_lessons += len(lessons)
             
-            try:
-                lessons = parser.parse_group_schedule(group_sstu_id) or []
-                total_lessons += len(lessons)
-                
-                lessons_payload = []
-                for l in lessons:
-                    lessons_payload.append({
-                        'subject_name': l.get('subject_name'),
-                        'teacher_name': l.get('teacher_name'),
-                        'teacher_id': l.get('teacher_id'),
-                        'teacher_url': l.get('teacher_url'),
-                        'lesson_type': l.get('lesson_type'),
-                        'room': l.get('room'),
-                        'weekday': l.get('weekday'),
-                        'lesson_number': l.get('lesson_number'),
-                        'start_time': _ser_time(l.get('start_time')),
-                        'end_time': _ser_time(l.get('end_time')),
-                        'specific_date': _ser_date(l.get('specific_date')),
-                        'week_number': l.get('week_number'),
-                        'additional_info': l.get('additional_info', ''),
-                    })
-                
-                group_payload = {
-                    'institute_name': inst_payload['name'],
-                    'institute_sstu_id': inst_payload['sstu_id'],
-                    'name': group_name,
-                    'sstu_id': group_sstu_id,
-                    'education_form': grp.get('education_form'),
-                    'degree_type': grp.get('degree_type'),
-                    'course_number': grp.get('course_number'),
-                }
-                
-                payload = {
-                    'institute': inst_payload,
-                    'group': group_payload,
-                    'lessons': lessons_payload,
-                }
-                
-                parsed_groups.append((payload, group_name))
-                
-            except Exception as e:
-                logger.error(f"Ошибка при парсинге группы {group_name}: {e}", exc_info=True)
-                continue
+            group_payload = {
+                'institute_name': inst_payload['name'],
+                'institute_sstu_id': inst_payload['sstu_id'],
+                'name': group_name,
+                'sstu_id': group_sstu_id,
+                'education_form': grp.get('education_form'),
+                'degree_type': grp.get('degree_type'),
+                'course_number': grp.get('course_number'),
+            }
+            
+            # Храним компактные записи ParsedLesson, JSON собирается только при отправке
+            parsed_groups.append(((inst_payload, group_payload, lessons), group_name))
+            
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге группы {group_name}: {e}", exc_info=True)
+            continue
     
     # Теперь отправляем все группы на сервер
     logger.info(f"Этап 2: Отправка {len(parsed_groups)} групп на сервер...")
     
-    for payload, group_name in parsed_groups:
-        if _try_send_group(payload, group_name, retries=3):
+    for parsed_group, group_name in parsed_groups:
+        if _try_send_group(parsed_group, group_name, retries=3):
             ok_groups += 1
+            # Кэш страницы сохраняем только после успешной отправки
+            parser.commit_group_page(parsed_group[1]['sstu_id'])
         else:
-            failed_groups.append((payload, group_name))
+            failed_groups.append((parsed_group, group_name))
         
         # Небольшая задержка между запросами, чтобы не перегружать сервер
         time.sleep(0.5)
@@ -412,33 +474,38 @@ def sync_schedule():
         retry_failed = failed_groups.copy()
         failed_groups.clear()
         
-        for payload, group_name in retry_failed:
-            if _try_send_group(payload, group_name, retries=5):  # Больше попыток для повторной отправки
+        for parsed_group, group_name in retry_failed:
+            if _try_send_group(parsed_group, group_name, retries=5):  # Больше попыток для повторной отправки
                 ok_groups += 1
+                parser.commit_group_page(parsed_group[1]['sstu_id'])
             else:
-                failed_groups.append((payload, group_name))
+                failed_groups.append((parsed_group, group_name))
             
             time.sleep(1)  # Больше задержка при повторной попытке
 
     # Финальный отчёт
     logger.info(f"Импорт завершен. Групп: {ok_groups}/{total_groups}, занятий распаршено: {total_lessons}")
+    if parser.page_cache:
+        logger.info(f"Без изменений (пропущено): {unchanged_groups}, кэш страниц: {parser.page_cache.stats}")
+    if parser.archive:
+        logger.info(f"Страницы сохранены в архив, снимок {parser.archive.snapshot}: {parser.archive.stats}")
     
     if failed_groups:
         logger.warning(f"Не удалось импортировать {len(failed_groups)} групп:")
         for _, group_name in failed_groups:
             logger.warning(f"  - {group_name}")
     
-    return ok_groups > 0
+    return ok_groups > 0 or (unchanged_groups > 0 and not failed_groups)
 
 
-def run_once():
+def run_once(replay: str = None):
     """Запускает синхронизацию один раз."""
     logger.info("=" * 60)
     logger.info("Запуск синхронизации расписания")
     logger.info(f"Время: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info("=" * 60)
     
-    success = sync_schedule()
+    success = sync_schedule(replay=replay)
     
     logger.info("=" * 60)
     if success:
@@ -503,11 +570,14 @@ def main():
     if len(sys.argv) > 1:
         if sys.argv[1] == '--once':
             run_once()
+        elif sys.argv[1] == '--replay':
+            # Перепарсить снимок архива: --replay [SNAPSHOT], по умолчанию последний
+            run_once(replay=sys.argv[2] if len(sys.argv) > 2 else 'latest')
         elif sys.argv[1] == '--help':
             print(__doc__)
         else:
             logger.error(f"Неизвестный аргумент: {sys.argv[1]}")
-            print("Использование: python schedule_sync_client.py [--once|--help]")
+            print("Использование: python schedule_sync_client.py [--once|--replay [SNAPSHOT]|--help]")
     else:
         # По умолчанию запускаем в режиме расписания
         if SCHEDULE_AVAILABLE: